@@ -9,7 +9,7 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from sqlalchemy.orm import Session
-from src.pm.db.models import SessionLocal
+from src.pm.db.models import SessionLocal, init_db
 
 def get_db():
     """Database session dependency"""
@@ -18,3 +18,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+if __name__ == "__main__":
+    # python api/database.py: 테이블 생성 (없을 경우, import 시에는 생성하지 않음)
+    init_db()
+    print("Database tables initialized.")
@@ -12,6 +12,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from routers import attribution, performance, portfolio, assets, position, asset, risk
+from src.pm.db.models import init_db
 
 # FastAPI 앱 생성
 app = FastAPI(
@@ -21,6 +22,11 @@ app = FastAPI(
     root_path="/api",
 )
 
+# 시작 시 한 번만 테이블 생성 확인 (모듈 import 시에는 DDL을 실행하지 않음)
+@app.on_event("startup")
+def create_tables():
+    init_db()
+
 # CORS 설정
 app.add_middleware(
     CORSMiddleware,
@@ -82,6 +82,7 @@ async def get_risk_analysis(
     period: TimePeriod = Query(TimePeriod.ALL, description="분석 기간"),
     asset_filter: AssetFilter = Query(AssetFilter.ALL, description="자산 필터"),
     confidence_level: float = Query(0.95, description="신뢰수준", ge=0.01, le=0.99),
+    include_all_contributions: bool = Query(True, description="전체 자산별 리스크 기여도 포함 여부 (False면 상위 5개만)"),
     db: Session = Depends(get_db)
 ):
     """
@@ -98,7 +99,8 @@ async def get_risk_analysis(
             portfolio_id=portfolio_id,
             period=period,
             asset_filter=asset_filter,
-            confidence_level=confidence_level
+            confidence_level=confidence_level,
+            include_all_contributions=include_all_contributions
         )
         return result
     except Exception as e:
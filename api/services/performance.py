@@ -1,11 +1,14 @@
 """
 Portfolio performance analysis services
 """
-from typing import List, Optional, Dict, Tuple
+import time
+from typing import List, Optional, Dict, Tuple, NamedTuple
 from datetime import date, timedelta
+import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy import and_, desc, func, type_coerce, Float
 from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
 
 from database import get_db
 from utils import safe_float, parse_custom_period
@@ -18,19 +21,49 @@ from src.pm.db.models import (
     MarketInstrument, MarketPriceDaily, MarketDataHelper
 )
 
+# 포트폴리오 통화별 벤치마크 심볼 (기본값은 KOSPI)
+BENCHMARK_SYMBOLS = {
+    'KRW': '^KS11',     # KOSPI
+    'USD': '^GSPC',     # S&P 500
+    'EUR': '^GDAXI',    # DAX (독일)
+    'JPY': '^N225',     # Nikkei 225
+    'GBP': '^FTSE',     # FTSE 100
+    'CNY': '^HSI',      # Hang Seng
+}
+
+class BenchmarkInstrument(NamedTuple):
+    """캐시용 벤치마크 인스트루먼트 정보 (세션과 무관한 값 객체)"""
+    id: int
+    name: str
+    symbol: str
+
+# 심볼 → (BenchmarkInstrument, 만료 시각) 캐시
+# 인스트루먼트는 API 프로세스 밖(시장 데이터 수집 스크립트)에서 추가/변경되므로 일정 시간 후 다시 조회
+BENCHMARK_CACHE_TTL_SECONDS = 600
+_benchmark_instrument_cache: Dict[str, Tuple[BenchmarkInstrument, float]] = {}
+
 def get_benchmark_symbol_by_currency(currency: str) -> str:
     """포트폴리오 통화에 따른 적절한 벤치마크 심볼 반환"""
-    benchmark_mapping = {
-        'KRW': '^KS11',     # KOSPI
-        'USD': '^GSPC',     # S&P 500
-        'EUR': '^GDAXI',    # DAX (독일)
-        'JPY': '^N225',     # Nikkei 225
-        'GBP': '^FTSE',     # FTSE 100
-        'CNY': '^HSI',      # Hang Seng
-    }
-    
-    # 기본값은 KOSPI (한국 시장)
-    return benchmark_mapping.get(currency, '^KS11')
+    return BENCHMARK_SYMBOLS.get(currency, '^KS11')
+
+def get_benchmark_instrument(benchmark_symbol: str, db: Session) -> Optional[BenchmarkInstrument]:
+    """활성 벤치마크 인스트루먼트 조회 (심볼별로 BENCHMARK_CACHE_TTL_SECONDS 동안 캐시)"""
+    now = time.monotonic()
+    cached = _benchmark_instrument_cache.get(benchmark_symbol)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+    
+    row = db.query(MarketInstrument.id, MarketInstrument.name).filter(
+        MarketInstrument.symbol == benchmark_symbol,
+        MarketInstrument.is_active.is_(True)
+    ).first()
+    if not row:
+        # 없는 경우는 캐시하지 않음 (이후 등록되면 바로 반영)
+        return None
+    
+    instrument = BenchmarkInstrument(id=row.id, name=row.name, symbol=benchmark_symbol)
+    _benchmark_instrument_cache[benchmark_symbol] = (instrument, now + BENCHMARK_CACHE_TTL_SECONDS)
+    return instrument
 
 def normalize_to_index(values: List[float], base_value: float = 100.0) -> List[float]:
     """값들을 지수화 (첫 번째 값을 기준으로 100으로 정규화)"""
@@ -48,37 +81,17 @@ def calculate_indexed_performance(
 ) -> Tuple[List[DailyReturnPoint], List[DailyReturnPoint]]:
     """포트폴리오와 벤치마크를 지수화하여 성과 비교 데이터 생성"""
     
-    # 공통 날짜 범위 찾기
-    portfolio_date_set = set(portfolio_dates)
-    benchmark_date_set = set(benchmark_dates)
-    common_dates = sorted(portfolio_date_set.intersection(benchmark_date_set))
-    
-    if not common_dates:
-        return [], []
+    # 공통 날짜 찾기: datetime64 배열의 교집합을 C 레벨에서 한 번에 계산
+    # (return_indices로 각 시계열에서의 위치를 함께 받아 값을 모음)
+    portfolio_day_arr = np.array(portfolio_dates, dtype='datetime64[D]')
+    benchmark_day_arr = np.array(benchmark_dates, dtype='datetime64[D]')
+    common_days, portfolio_idx, benchmark_idx = np.intersect1d(
+        portfolio_day_arr, benchmark_day_arr, return_indices=True
+    )
     
-    # 공통 날짜에 해당하는 데이터 추출
-    portfolio_aligned = []
-    benchmark_aligned = []
-    aligned_dates = []
-    
-    for target_date in common_dates:
-        # 포트폴리오 NAV 찾기
-        try:
-            portfolio_idx = portfolio_dates.index(target_date)
-            portfolio_nav = portfolio_navs[portfolio_idx]
-        except ValueError:
-            continue
-            
-        # 벤치마크 가격 찾기
-        try:
-            benchmark_idx = benchmark_dates.index(target_date)
-            benchmark_price = benchmark_prices[benchmark_idx]
-        except ValueError:
-            continue
-            
-        portfolio_aligned.append(portfolio_nav)
-        benchmark_aligned.append(benchmark_price)
-        aligned_dates.append(target_date)
+    aligned_dates = common_days.tolist()
+    portfolio_aligned = [portfolio_navs[k] for k in portfolio_idx.tolist()]
+    benchmark_aligned = [benchmark_prices[k] for k in benchmark_idx.tolist()]
     
     if not portfolio_aligned or not benchmark_aligned:
         return [], []
@@ -117,7 +130,7 @@ def calculate_indexed_performance(
 def parse_date_range(period: TimePeriod, portfolio_id: int, db: Session) -> tuple[date, date]:
     """기간 설정에 따른 시작일/종료일 계산"""
     # 최신 데이터 날짜 조회
-    latest_nav = db.query(PortfolioNavDaily).filter(
+    latest_nav = db.query(PortfolioNavDaily.as_of_date, PortfolioNavDaily.nav).filter(
         PortfolioNavDaily.portfolio_id == portfolio_id
     ).order_by(desc(PortfolioNavDaily.as_of_date)).first()
     
@@ -128,7 +141,7 @@ def parse_date_range(period: TimePeriod, portfolio_id: int, db: Session) -> tupl
     
     if period == TimePeriod.ALL or period == TimePeriod.INCEPTION:
         # 전체 기간: 가장 오래된 데이터부터
-        oldest_nav = db.query(PortfolioNavDaily).filter(
+        oldest_nav = db.query(PortfolioNavDaily.as_of_date, PortfolioNavDaily.nav).filter(
             PortfolioNavDaily.portfolio_id == portfolio_id
         ).order_by(PortfolioNavDaily.as_of_date).first()
         start_date = oldest_nav.as_of_date if oldest_nav else end_date
@@ -144,7 +157,7 @@ def parse_date_range(period: TimePeriod, portfolio_id: int, db: Session) -> tupl
         start_date = end_date - timedelta(days=7)
     else:
         # 기본값: 전체 기간
-        oldest_nav = db.query(PortfolioNavDaily).filter(
+        oldest_nav = db.query(PortfolioNavDaily.as_of_date, PortfolioNavDaily.nav).filter(
             PortfolioNavDaily.portfolio_id == portfolio_id
         ).order_by(PortfolioNavDaily.as_of_date).first()
         start_date = oldest_nav.as_of_date if oldest_nav else end_date
@@ -166,7 +179,7 @@ async def get_performance_custom_period(
     extended_start_date = start_date - timedelta(days=7 if period_type == "week" else 10)
     
     # 확장된 기간으로 NAV 데이터 조회
-    all_nav_data = db.query(PortfolioNavDaily).filter(
+    all_nav_data = db.query(PortfolioNavDaily.as_of_date, PortfolioNavDaily.nav).filter(
         and_(
             PortfolioNavDaily.portfolio_id == portfolio_id,
             PortfolioNavDaily.as_of_date >= extended_start_date,
@@ -285,16 +298,13 @@ async def calculate_benchmark_returns_custom_period(
         benchmark_symbol = get_benchmark_symbol_by_currency(portfolio.currency)
         
         # 벤치마크 인스트루먼트 조회
-        benchmark_instrument = db.query(MarketInstrument).filter(
-            MarketInstrument.symbol == benchmark_symbol,
-            MarketInstrument.is_active == 'Yes'
-        ).first()
+        benchmark_instrument = get_benchmark_instrument(benchmark_symbol, db)
         
         if not benchmark_instrument:
             return []
         
         # 벤치마크 가격 데이터 조회
-        benchmark_data = db.query(MarketPriceDaily).filter(
+        benchmark_data = db.query(MarketPriceDaily.date, MarketPriceDaily.close_price).filter(
             MarketPriceDaily.instrument_id == benchmark_instrument.id,
             MarketPriceDaily.date >= start_date,
             MarketPriceDaily.date <= end_date
@@ -306,7 +316,7 @@ async def calculate_benchmark_returns_custom_period(
         # 벤치마크 수익률 계산 (기간 시작 ~ 끝)
         start_price = benchmark_data[0].close_price
         end_price = benchmark_data[-1].close_price
-        benchmark_return = ((float(end_price) - float(start_price)) / float(start_price)) * 100
+        benchmark_return = ((end_price - start_price) / start_price) * 100
         
         # 벤치마크 대비 초과 수익률 계산
         excess_return = portfolio_return - benchmark_return
@@ -326,7 +336,7 @@ async def get_performance_all_time(portfolio_id: int, chart_period: str, db: Ses
     """All Time 성과 데이터 조회"""
     
     # 최신 NAV 데이터 조회
-    latest_nav = db.query(PortfolioNavDaily).filter(
+    latest_nav = db.query(PortfolioNavDaily.as_of_date, PortfolioNavDaily.nav).filter(
         PortfolioNavDaily.portfolio_id == portfolio_id
     ).order_by(desc(PortfolioNavDaily.as_of_date)).first()
     
@@ -337,7 +347,7 @@ async def get_performance_all_time(portfolio_id: int, chart_period: str, db: Ses
     
     # Recent Returns용 최근 30일 NAV 데이터 조회
     start_date_recent = end_date - timedelta(days=30)
-    recent_nav_data = db.query(PortfolioNavDaily).filter(
+    recent_nav_data = db.query(PortfolioNavDaily.as_of_date, PortfolioNavDaily.nav).filter(
         and_(
             PortfolioNavDaily.portfolio_id == portfolio_id,
             PortfolioNavDaily.as_of_date >= start_date_recent,
@@ -450,7 +460,7 @@ def calculate_chart_daily_returns(portfolio_id: int, chart_period: str, end_date
     extended_start_date = start_date - timedelta(days=1)
     
     # NAV 데이터 조회
-    nav_data = db.query(PortfolioNavDaily).filter(
+    nav_data = db.query(PortfolioNavDaily.as_of_date, PortfolioNavDaily.nav).filter(
         and_(
             PortfolioNavDaily.portfolio_id == portfolio_id,
             PortfolioNavDaily.as_of_date >= extended_start_date,
@@ -494,7 +504,7 @@ async def calculate_benchmark_returns_all_time(portfolio_id: int, db: Session) -
             return []
         
         # 포트폴리오 전체 기간의 NAV 데이터 조회
-        portfolio_navs = db.query(PortfolioNavDaily).filter(
+        portfolio_navs = db.query(PortfolioNavDaily.as_of_date, PortfolioNavDaily.nav).filter(
             PortfolioNavDaily.portfolio_id == portfolio_id
         ).order_by(PortfolioNavDaily.as_of_date).all()
         
@@ -508,16 +518,13 @@ async def calculate_benchmark_returns_all_time(portfolio_id: int, db: Session) -
         benchmark_symbol = get_benchmark_symbol_by_currency(portfolio.currency)
         
         # 벤치마크 인스트루먼트 조회
-        benchmark_instrument = db.query(MarketInstrument).filter(
-            MarketInstrument.symbol == benchmark_symbol,
-            MarketInstrument.is_active == 'Yes'
-        ).first()
+        benchmark_instrument = get_benchmark_instrument(benchmark_symbol, db)
         
         if not benchmark_instrument:
             return []
         
         # 벤치마크 가격 데이터 조회
-        benchmark_data = db.query(MarketPriceDaily).filter(
+        benchmark_data = db.query(MarketPriceDaily.date, MarketPriceDaily.close_price).filter(
             MarketPriceDaily.instrument_id == benchmark_instrument.id,
             MarketPriceDaily.date >= start_date,
             MarketPriceDaily.date <= end_date
@@ -527,13 +534,13 @@ async def calculate_benchmark_returns_all_time(portfolio_id: int, db: Session) -
             return []
         
         # 포트폴리오 수익률 계산 (전체 기간)
-        start_nav = float(portfolio_navs[0].nav)
-        end_nav = float(portfolio_navs[-1].nav)
+        start_nav = portfolio_navs[0].nav
+        end_nav = portfolio_navs[-1].nav
         portfolio_return = ((end_nav - start_nav) / start_nav) * 100
         
         # 벤치마크 수익률 계산 (전체 기간)
-        start_price = float(benchmark_data[0].close_price)
-        end_price = float(benchmark_data[-1].close_price)
+        start_price = benchmark_data[0].close_price
+        end_price = benchmark_data[-1].close_price
         benchmark_return = ((end_price - start_price) / start_price) * 100
         
         # 벤치마크 대비 초과 수익률 계산
@@ -551,7 +558,14 @@ async def calculate_benchmark_returns_all_time(portfolio_id: int, db: Session) -
         return []
  
 async def get_benchmark_comparison_chart(portfolio_id: int, period: str, db: Session):
-    """포트폴리오 vs 벤치마크 비교 차트 데이터 조회"""
+    """포트폴리오 vs 벤치마크 비교 차트 데이터 조회
+
+    동기 SQLAlchemy 조회가 이벤트 루프를 막지 않도록 스레드풀에서 실행합니다.
+    """
+    return await run_in_threadpool(_build_benchmark_comparison_chart, portfolio_id, period, db)
+
+def _build_benchmark_comparison_chart(portfolio_id: int, period: str, db: Session):
+    """포트폴리오 vs 벤치마크 비교 차트 데이터 생성 (동기)"""
     try:
         # 포트폴리오 정보 조회
         portfolio = db.query(Portfolio).filter(Portfolio.id == portfolio_id).first()
@@ -567,29 +581,9 @@ async def get_benchmark_comparison_chart(portfolio_id: int, period: str, db: Ses
         else:  # "all"
             start_date = None  # 전체 기간
         
-        # 포트폴리오 NAV 데이터 조회
-        nav_query = db.query(PortfolioNavDaily).filter(
-            PortfolioNavDaily.portfolio_id == portfolio_id
-        )
-        if start_date:
-            nav_query = nav_query.filter(PortfolioNavDaily.as_of_date >= start_date)
-        
-        portfolio_navs = nav_query.order_by(PortfolioNavDaily.as_of_date).all()
-        
-        if not portfolio_navs:
-            return {
-                "period": period,
-                "portfolio_data": [],
-                "benchmark_data": [],
-                "message": "No data available"
-            }
-        
         # 벤치마크 선택
         benchmark_symbol = get_benchmark_symbol_by_currency(portfolio.currency)
-        benchmark_instrument = db.query(MarketInstrument).filter(
-            MarketInstrument.symbol == benchmark_symbol,
-            MarketInstrument.is_active == 'Yes'
-        ).first()
+        benchmark_instrument = get_benchmark_instrument(benchmark_symbol, db)
         
         if not benchmark_instrument:
             return {
@@ -599,27 +593,34 @@ async def get_benchmark_comparison_chart(portfolio_id: int, period: str, db: Ses
                 "message": f"Benchmark {benchmark_symbol} not found"
             }
         
-        # 벤치마크 가격 데이터 조회
-        benchmark_query = db.query(MarketPriceDaily).filter(
-            MarketPriceDaily.instrument_id == benchmark_instrument.id
+        # 포트폴리오 NAV와 벤치마크 가격을 날짜 기준으로 조인하여 한 번에 조회
+        # (공통 날짜만, 날짜순 정렬된 상태로 반환)
+        # 지수화(첫 공통일 = 100)도 FIRST_VALUE 윈도우 함수로 DB에서 계산
+        chart_query = db.query(
+            PortfolioNavDaily.as_of_date,
+            type_coerce(
+                PortfolioNavDaily.nav / func.first_value(PortfolioNavDaily.nav).over(order_by=PortfolioNavDaily.as_of_date) * 100,
+                Float
+            ).label('portfolio_index'),
+            type_coerce(
+                MarketPriceDaily.close_price / func.first_value(MarketPriceDaily.close_price).over(order_by=PortfolioNavDaily.as_of_date) * 100,
+                Float
+            ).label('benchmark_index')
+        ).join(
+            MarketPriceDaily,
+            and_(
+                MarketPriceDaily.date == PortfolioNavDaily.as_of_date,
+                MarketPriceDaily.instrument_id == benchmark_instrument.id
+            )
+        ).filter(
+            PortfolioNavDaily.portfolio_id == portfolio_id
         )
         if start_date:
-            benchmark_query = benchmark_query.filter(MarketPriceDaily.date >= start_date)
-        
-        benchmark_prices = benchmark_query.order_by(MarketPriceDaily.date).all()
-        
-        # 공통 날짜 범위에서 데이터 정렬
-        portfolio_data = []
-        benchmark_data = []
-        
-        # 포트폴리오 NAV를 딕셔너리로 변환 (빠른 조회)
-        nav_dict = {nav.as_of_date: float(nav.nav) for nav in portfolio_navs}
-        benchmark_dict = {price.date: float(price.close_price) for price in benchmark_prices}
+            chart_query = chart_query.filter(PortfolioNavDaily.as_of_date >= start_date)
         
-        # 공통 날짜 찾기
-        common_dates = sorted(set(nav_dict.keys()) & set(benchmark_dict.keys()))
+        chart_rows = chart_query.order_by(PortfolioNavDaily.as_of_date).all()
         
-        if not common_dates:
+        if not chart_rows:
             return {
                 "period": period,
                 "portfolio_data": [],
@@ -627,27 +628,14 @@ async def get_benchmark_comparison_chart(portfolio_id: int, period: str, db: Ses
                 "message": "No overlapping data between portfolio and benchmark"
             }
         
-        # 지수화를 위한 기준값 (첫 번째 날의 값)
-        base_nav = nav_dict[common_dates[0]]
-        base_benchmark = benchmark_dict[common_dates[0]]
-        
-        # 지수화된 데이터 생성
-        for date_val in common_dates:
-            nav_value = nav_dict[date_val]
-            benchmark_value = benchmark_dict[date_val]
-            
-            # 100을 기준으로 지수화
-            indexed_nav = (nav_value / base_nav) * 100
-            indexed_benchmark = (benchmark_value / base_benchmark) * 100
-            
-            portfolio_data.append({
-                "date": date_val.isoformat(),
-                "value": indexed_nav
-            })
-            
+        portfolio_data = []
+        benchmark_data = []
+        for row in chart_rows:
+            date_str = row.as_of_date.isoformat()
+            portfolio_data.append({"date": date_str, "value": row.portfolio_index})
             benchmark_data.append({
-                "date": date_val.isoformat(),
-                "value": indexed_benchmark,
+                "date": date_str,
+                "value": row.benchmark_index,
                 "name": benchmark_instrument.name
             })
         
@@ -658,8 +646,8 @@ async def get_benchmark_comparison_chart(portfolio_id: int, period: str, db: Ses
             "benchmark_symbol": benchmark_symbol,
             "portfolio_data": portfolio_data,
             "benchmark_data": benchmark_data,
-            "start_date": common_dates[0].isoformat() if common_dates else None,
-            "end_date": common_dates[-1].isoformat() if common_dates else None
+            "start_date": chart_rows[0].as_of_date.isoformat(),
+            "end_date": chart_rows[-1].as_of_date.isoformat()
         }
         
     except Exception as e:
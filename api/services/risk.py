@@ -2,7 +2,7 @@
 Risk analysis service
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, text, desc
+from sqlalchemy import and_, func, text, desc, select, bindparam
 from datetime import date as Date, datetime, timedelta
 from typing import Optional, List, Dict, Any
 import numpy as np
@@ -30,6 +30,232 @@ from schemas.risk import (
     AssetClassDetailItem
 )
 
+# 요청마다 text()를 새로 만들지 않도록 SQL 문은 모듈 로드 시 한 번만 생성
+_MAX_DATE_SQL = text("""
+    SELECT MAX(as_of_date) 
+    FROM portfolio_positions_daily 
+    WHERE portfolio_id = :portfolio_id
+""")
+
+_ALLOCATION_SQL = text("""
+    WITH portfolio_positions AS (
+        SELECT 
+            ppd.asset_id,
+            ppd.quantity,
+            ppd.market_value,
+            ppd.market_value / SUM(ppd.market_value) OVER() * 100 as weight
+        FROM portfolio_positions_daily ppd
+        WHERE ppd.portfolio_id = :portfolio_id 
+            AND ppd.as_of_date = :as_of_date
+            AND ppd.quantity > 0
+    )
+    SELECT 
+        a.id as asset_id,
+        a.ticker,
+        a.name,
+        a.asset_class,
+        pp.quantity,
+        pp.market_value,
+        pp.weight,
+        SUM(pp.market_value) OVER() as total_portfolio_value
+    FROM portfolio_positions pp
+    JOIN assets a ON pp.asset_id = a.id
+    ORDER BY a.asset_class, pp.market_value DESC
+""")
+
+_DAILY_RETURNS_SQL = text("""
+    SELECT 
+        nav_date as date,
+        daily_return
+    FROM portfolio_nav_daily 
+    WHERE portfolio_id = :portfolio_id
+        AND nav_date BETWEEN :start_date AND :end_date
+        AND daily_return IS NOT NULL
+    ORDER BY nav_date
+""")
+
+_LATEST_POSITIONS_CTE = """
+    WITH latest_positions AS (
+        SELECT 
+            p.asset_id,
+            p.market_value,
+            a.ticker,
+            a.name,
+            a.asset_class,
+            pt.total_value
+        FROM portfolio_positions_daily p
+        JOIN assets a ON p.asset_id = a.id
+        CROSS JOIN (
+            SELECT SUM(market_value) as total_value
+            FROM portfolio_positions_daily
+            WHERE portfolio_id = :portfolio_id
+                AND as_of_date = (
+                    SELECT MAX(as_of_date) 
+                    FROM portfolio_positions_daily 
+                    WHERE portfolio_id = :portfolio_id
+                )
+        ) pt
+        WHERE p.portfolio_id = :portfolio_id
+            AND p.as_of_date = (
+                SELECT MAX(as_of_date) 
+                FROM portfolio_positions_daily 
+                WHERE portfolio_id = :portfolio_id
+            )
+            AND p.quantity > 0
+    )
+"""
+
+_POSITIONS_SQL = text(_LATEST_POSITIONS_CTE + """
+    SELECT *,
+           (market_value / total_value * 100) as current_weight
+    FROM latest_positions
+    ORDER BY market_value DESC
+""")
+
+# 상위 리스크 기여 자산만 DB에서 선별 (_risk_contribution_from_row와 같은 식으로 정렬)
+_TOP_RISK_CONTRIBUTORS_SQL = text(_LATEST_POSITIONS_CTE + """
+    SELECT *,
+           (market_value / total_value * 100) as current_weight
+    FROM latest_positions
+    ORDER BY (market_value / total_value * 100)
+             * GREATEST(10.0, market_value / total_value * 100 * 0.5) DESC
+    LIMIT :limit
+""")
+
+_ASSET_CLASS_DETAILS_SQL = text("""
+    WITH portfolio_positions AS (
+        SELECT 
+            ppd.asset_id,
+            ppd.quantity,
+            ppd.market_value,
+            ppd.market_value / SUM(ppd.market_value) OVER() * 100 as weight
+        FROM portfolio_positions_daily ppd
+        WHERE ppd.portfolio_id = :portfolio_id 
+            AND ppd.as_of_date = :as_of_date
+            AND ppd.quantity > 0
+    )
+    SELECT 
+        a.id as asset_id,
+        a.ticker,
+        a.name,
+        a.asset_class,
+        pp.quantity,
+        pp.market_value,
+        pp.weight,
+        COALESCE(ap.price, 0) as current_price
+    FROM portfolio_positions pp
+    JOIN assets a ON pp.asset_id = a.id
+    LEFT JOIN asset_prices ap ON a.id = ap.asset_id 
+        AND ap.date = (
+            SELECT MAX(date) 
+            FROM asset_prices 
+            WHERE asset_id = a.id 
+            AND date <= :as_of_date
+        )
+    WHERE a.asset_class = :asset_class
+    ORDER BY pp.market_value DESC
+""")
+
+# get_asset_class_details_new용 쿼리: 식 트리를 요청마다 만들지 않도록 한 번만 구성하고
+# 값은 bindparam으로 실행 시점에 바인딩 (컴파일 결과는 SQLAlchemy 캐시에서 재사용)
+def _build_asset_class_details_stmt():
+    portfolio_id = bindparam('portfolio_id')
+    as_of_date = bindparam('as_of_date')
+    asset_class = bindparam('asset_class')
+
+    # 서브쿼리: 포트폴리오 포지션 정보
+    positions_query = (
+        select(
+            PortfolioPositionDaily.asset_id,
+            PortfolioPositionDaily.quantity,
+            PortfolioPositionDaily.avg_price,
+            PortfolioPositionDaily.market_value,
+            (PortfolioPositionDaily.market_value / 
+             func.sum(PortfolioPositionDaily.market_value).over() * 100).label('weight')
+        )
+        .where(
+            PortfolioPositionDaily.portfolio_id == portfolio_id,
+            PortfolioPositionDaily.as_of_date == as_of_date,
+            PortfolioPositionDaily.quantity > 0
+        )
+        .subquery()
+    )
+
+    # 서브쿼리: 최신 가격 정보
+    latest_prices_query = (
+        select(
+            Price.asset_id,
+            Price.close.label('current_price'),
+            Price.date.label('price_date'),
+            func.row_number().over(
+                partition_by=Price.asset_id,
+                order_by=desc(Price.date)
+            ).label('rn')
+        )
+        .where(Price.date <= as_of_date)
+        .subquery()
+    )
+
+    # 서브쿼리: 전일 가격 정보
+    prev_day_prices_query = (
+        select(
+            Price.asset_id,
+            Price.close.label('prev_price'),
+            func.row_number().over(
+                partition_by=Price.asset_id,
+                order_by=desc(Price.date)
+            ).label('rn')
+        )
+        .where(Price.date < as_of_date)
+        .subquery()
+    )
+
+    # 메인 쿼리: 자산군에 속한 자산들의 상세 정보
+    return (
+        select(
+            Asset.id.label('asset_id'),
+            Asset.ticker,
+            Asset.name,
+            Asset.asset_class,
+            Asset.currency,
+            positions_query.c.quantity,
+            positions_query.c.avg_price,
+            positions_query.c.market_value,
+            positions_query.c.weight,
+            func.coalesce(
+                latest_prices_query.c.current_price,
+                positions_query.c.avg_price
+            ).label('current_price'),
+            func.coalesce(
+                prev_day_prices_query.c.prev_price,
+                positions_query.c.avg_price
+            ).label('prev_price'),
+            func.sum(positions_query.c.market_value).over().label('total_portfolio_value')
+        )
+        .join(positions_query, Asset.id == positions_query.c.asset_id)
+        .outerjoin(
+            latest_prices_query,
+            and_(
+                Asset.id == latest_prices_query.c.asset_id,
+                latest_prices_query.c.rn == 1
+            )
+        )
+        .outerjoin(
+            prev_day_prices_query,
+            and_(
+                Asset.id == prev_day_prices_query.c.asset_id,
+                prev_day_prices_query.c.rn == 1
+            )
+        )
+        .where(Asset.asset_class == asset_class)
+        .order_by(desc(positions_query.c.market_value))
+    )
+
+_ASSET_CLASS_DETAILS_STMT = _build_asset_class_details_stmt()
+
+# 리스크 분석 기본 조회 기간 (1년)
+_RISK_LOOKBACK = timedelta(days=365)
+
 class RiskService:
     def __init__(self, db: Session):
         self.db = db
@@ -43,45 +269,15 @@ class RiskService:
         """
         자산군별 배분 현황을 조회합니다.
         """
+        today = datetime.now().date()
         try:
             # 기준일 설정
             if as_of_date is None:
-                as_of_date_query = text("""
-                    SELECT MAX(as_of_date) 
-                    FROM portfolio_positions_daily 
-                    WHERE portfolio_id = :portfolio_id
-                """)
-                result = self.db.execute(as_of_date_query, {"portfolio_id": portfolio_id}).scalar()
-                as_of_date = result or datetime.now().date()
+                result = self.db.execute(_MAX_DATE_SQL, {"portfolio_id": portfolio_id}).scalar()
+                as_of_date = result or today
 
             # 자산별 포지션과 자산 정보 조회
-            query = text("""
-                WITH portfolio_positions AS (
-                    SELECT 
-                        ppd.asset_id,
-                        ppd.quantity,
-                        ppd.market_value,
-                        ppd.market_value / SUM(ppd.market_value) OVER() * 100 as weight
-                    FROM portfolio_positions_daily ppd
-                    WHERE ppd.portfolio_id = :portfolio_id 
-                        AND ppd.as_of_date = :as_of_date
-                        AND ppd.quantity > 0
-                )
-                SELECT 
-                    a.id as asset_id,
-                    a.ticker,
-                    a.name,
-                    a.asset_class,
-                    pp.quantity,
-                    pp.market_value,
-                    pp.weight,
-                    SUM(pp.market_value) OVER() as total_portfolio_value
-                FROM portfolio_positions pp
-                JOIN assets a ON pp.asset_id = a.id
-                ORDER BY a.asset_class, pp.market_value DESC
-            """)
-            
-            result = self.db.execute(query, {
+            result = self.db.execute(_ALLOCATION_SQL, {
                 "portfolio_id": portfolio_id,
                 "as_of_date": as_of_date
             }).fetchall()
@@ -102,8 +298,9 @@ class RiskService:
                 asset_class = row.asset_class
                 total_portfolio_value = float(row.total_portfolio_value)
                 
-                if asset_class not in asset_class_groups:
-                    asset_class_groups[asset_class] = {
+                group = asset_class_groups.get(asset_class)
+                if group is None:
+                    group = asset_class_groups[asset_class] = {
                         "asset_class": asset_class,
                         "total_value": 0.0,
                         "total_weight": 0.0,
@@ -121,10 +318,10 @@ class RiskService:
                     "weight": float(row.weight)
                 }
                 
-                asset_class_groups[asset_class]["assets"].append(asset_info)
-                asset_class_groups[asset_class]["total_value"] += asset_info["market_value"]
-                asset_class_groups[asset_class]["total_weight"] += asset_info["weight"]
-                asset_class_groups[asset_class]["asset_count"] += 1
+                group["assets"].append(asset_info)
+                group["total_value"] += asset_info["market_value"]
+                group["total_weight"] += asset_info["weight"]
+                group["asset_count"] += 1
 
             allocations = list(asset_class_groups.values())
             
@@ -139,7 +336,7 @@ class RiskService:
             print(f"자산 배분 조회 오류: {str(e)}")
             return {
                 "total_portfolio_value": 0.0,
-                "as_of_date": as_of_date.isoformat() if as_of_date else datetime.now().date().isoformat(),
+                "as_of_date": (as_of_date or today).isoformat(),
                 "allocations": [],
                 "asset_filter": asset_filter.value,
                 "error": str(e)
@@ -150,29 +347,20 @@ class RiskService:
         portfolio_id: int,
         period: TimePeriod = TimePeriod.ALL,
         asset_filter: AssetFilter = AssetFilter.ALL,
-        confidence_level: float = 0.95
+        confidence_level: float = 0.95,
+        include_all_contributions: bool = True
     ) -> RiskAnalysisResponse:
         """
         포트폴리오 리스크 분석을 수행합니다.
+        include_all_contributions=False이면 상위 기여 자산만 조회합니다.
         """
+        # 분석 기간 설정 (더미 구현)
+        end_date = datetime.now().date()
+        start_date = end_date - _RISK_LOOKBACK
+
         try:
-            # 분석 기간 설정 (더미 구현)
-            end_date = datetime.now().date()
-            start_date = end_date - timedelta(days=365)  # 1년
-            
             # 일별 포트폴리오 수익률 조회
-            daily_returns_query = text("""
-                SELECT 
-                    nav_date as date,
-                    daily_return
-                FROM portfolio_nav_daily 
-                WHERE portfolio_id = :portfolio_id
-                    AND nav_date BETWEEN :start_date AND :end_date
-                    AND daily_return IS NOT NULL
-                ORDER BY nav_date
-            """)
-            
-            returns_data = self.db.execute(daily_returns_query, {
+            returns_data = self.db.execute(_DAILY_RETURNS_SQL, {
                 "portfolio_id": portfolio_id,
                 "start_date": start_date,
                 "end_date": end_date
@@ -182,22 +370,33 @@ class RiskService:
                 raise Exception("리스크 분석을 위한 충분한 데이터가 없습니다")
 
             # 포트폴리오 리스크 지표 계산
-            daily_returns = [float(row.daily_return) for row in returns_data]
+            daily_returns = np.fromiter(
+                (row.daily_return for row in returns_data),
+                dtype=np.float64,
+                count=len(returns_data)
+            )
             portfolio_metrics = self._calculate_portfolio_risk_metrics(
                 daily_returns, start_date, end_date, confidence_level
             )
 
-            # 자산별 리스크 기여도 계산 (간소화된 버전)
-            asset_contributions = await self._calculate_asset_risk_contributions(
-                portfolio_id, start_date, end_date, asset_filter
-            )
+            if include_all_contributions:
+                # 자산별 리스크 기여도 계산 (간소화된 버전)
+                asset_contributions = await self._calculate_asset_risk_contributions(
+                    portfolio_id, start_date, end_date, asset_filter
+                )
 
-            # 상위 리스크 기여 자산 (상위 5개)
-            top_contributors = sorted(
-                asset_contributions, 
-                key=lambda x: x.risk_contribution, 
-                reverse=True
-            )[:5]
+                # 상위 리스크 기여 자산 (상위 5개)
+                top_contributors = sorted(
+                    asset_contributions, 
+                    key=lambda x: x.risk_contribution, 
+                    reverse=True
+                )[:5]
+                total_risk_contribution = sum(a.risk_contribution for a in asset_contributions)
+            else:
+                # 상위 기여 자산만 필요한 경우 DB에서 LIMIT으로 선별
+                top_contributors = await self._top_n_risk_contributors(portfolio_id, n=5)
+                asset_contributions = []
+                total_risk_contribution = None
 
             return RiskAnalysisResponse(
                 portfolio_metrics=portfolio_metrics,
@@ -206,7 +405,7 @@ class RiskService:
                 asset_filter=asset_filter,
                 period=period,
                 confidence_level=confidence_level,
-                total_risk_contribution_check=sum(a.risk_contribution for a in asset_contributions)
+                total_risk_contribution_check=total_risk_contribution
             )
 
         except Exception as e:
@@ -214,14 +413,14 @@ class RiskService:
 
     def _calculate_portfolio_risk_metrics(
         self, 
-        daily_returns: List[float], 
+        daily_returns: np.ndarray, 
         start_date: Date, 
         end_date: Date, 
         confidence_level: float
     ) -> PortfolioRiskMetrics:
         """포트폴리오 리스크 지표를 계산합니다."""
         
-        returns_array = np.array(daily_returns)
+        returns_array = np.asarray(daily_returns, dtype=np.float64)
         
         # 연환산 변동성 (252 거래일 기준)
         volatility = np.std(returns_array) * np.sqrt(252) * 100
@@ -230,11 +429,10 @@ class RiskService:
         excess_returns = returns_array - (0.025 / 252)  # 일일 무위험수익률
         sharpe_ratio = np.mean(excess_returns) / np.std(returns_array) * np.sqrt(252) if np.std(returns_array) > 0 else 0
         
-        # 최대 낙폭 계산
-        cumulative_returns = np.cumprod(1 + returns_array / 100)
-        running_max = np.maximum.accumulate(cumulative_returns)
-        drawdowns = (cumulative_returns - running_max) / running_max * 100
-        max_drawdown = np.min(drawdowns)
+        # 최대 낙폭 계산 (로그 공간에서 누적 → 중간 배열 최소화)
+        cum_logs = np.cumsum(np.log1p(returns_array / 100))
+        min_log_drawdown = np.min(cum_logs - np.maximum.accumulate(cum_logs))
+        max_drawdown = np.expm1(min_log_drawdown) * 100
         
         # VaR 계산
         var_95 = np.percentile(returns_array, (1 - 0.95) * 100)
@@ -263,70 +461,48 @@ class RiskService:
         """자산별 리스크 기여도를 계산합니다 (간소화된 버전)."""
         
         # 최신 포지션 정보 조회
-        positions_query = text("""
-            WITH latest_positions AS (
-                SELECT 
-                    p.asset_id,
-                    p.market_value,
-                    a.ticker,
-                    a.name,
-                    a.asset_class,
-                    pt.total_value
-                FROM portfolio_positions_daily p
-                JOIN assets a ON p.asset_id = a.id
-                CROSS JOIN (
-                    SELECT SUM(market_value) as total_value
-                    FROM portfolio_positions_daily
-                    WHERE portfolio_id = :portfolio_id
-                        AND as_of_date = (
-                            SELECT MAX(as_of_date) 
-                            FROM portfolio_positions_daily 
-                            WHERE portfolio_id = :portfolio_id
-                        )
-                ) pt
-                WHERE p.portfolio_id = :portfolio_id
-                    AND p.as_of_date = (
-                        SELECT MAX(as_of_date) 
-                        FROM portfolio_positions_daily 
-                        WHERE portfolio_id = :portfolio_id
-                    )
-                    AND p.quantity > 0
-            )
-            SELECT *,
-                   (market_value / total_value * 100) as current_weight
-            FROM latest_positions
-            ORDER BY market_value DESC
-        """)
-        
-        positions = self.db.execute(positions_query, {
+        positions = self.db.execute(_POSITIONS_SQL, {
             "portfolio_id": portfolio_id
         }).fetchall()
 
-        asset_contributions = []
+        return [self._risk_contribution_from_row(pos) for pos in positions]
+
+    async def _top_n_risk_contributors(
+        self,
+        portfolio_id: int,
+        n: int = 5
+    ) -> List[AssetRiskContribution]:
+        """리스크 기여도 상위 n개 자산만 조회합니다."""
+        positions = self.db.execute(_TOP_RISK_CONTRIBUTORS_SQL, {
+            "portfolio_id": portfolio_id,
+            "limit": n
+        }).fetchall()
+
+        return [self._risk_contribution_from_row(pos) for pos in positions]
+
+    @staticmethod
+    def _risk_contribution_from_row(pos) -> AssetRiskContribution:
+        """포지션 행으로부터 리스크 기여도를 계산합니다."""
+        # 간소화된 리스크 기여도 계산 (실제로는 더 복잡한 계산이 필요)
+        weight = pos.current_weight
         
-        for pos in positions:
-            # 간소화된 리스크 기여도 계산 (실제로는 더 복잡한 계산이 필요)
-            weight = pos.current_weight
-            
-            # 자산 변동성 추정 (간소화)
-            volatility = max(10.0, weight * 0.5)  # 최소 10%, 비중에 비례한 변동성
-            
-            # 리스크 기여도 = 비중 * 변동성 비율
-            risk_contribution = weight * (volatility / 100)
-            
-            asset_contributions.append(AssetRiskContribution(
-                asset_id=pos.asset_id,
-                ticker=pos.ticker,
-                name=pos.name or pos.ticker,
-                asset_class=pos.asset_class or 'Unknown',
-                current_weight=weight,
-                volatility=volatility,
-                beta=1.0,  # 베타는 1.0으로 가정
-                risk_contribution=risk_contribution,
-                marginal_var=risk_contribution * 0.1  # 간소화된 한계 VaR
-            ))
+        # 자산 변동성 추정 (간소화)
+        volatility = max(10.0, weight * 0.5)  # 최소 10%, 비중에 비례한 변동성
         
-        return asset_contributions
+        # 리스크 기여도 = 비중 * 변동성 비율
+        risk_contribution = weight * (volatility / 100)
+        
+        return AssetRiskContribution(
+            asset_id=pos.asset_id,
+            ticker=pos.ticker,
+            name=pos.name or pos.ticker,
+            asset_class=pos.asset_class or 'Unknown',
+            current_weight=weight,
+            volatility=volatility,
+            beta=1.0,  # 베타는 1.0으로 가정
+            risk_contribution=risk_contribution,
+            marginal_var=risk_contribution * 0.1  # 간소화된 한계 VaR
+        )
 
     async def analyze_asset_correlation(
         self,
@@ -338,7 +514,7 @@ class RiskService:
         
         # 분석 기간 설정 (더미 구현)
         end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=365)  # 1년
+        start_date = end_date - _RISK_LOOKBACK
         
         # 현재는 더미 데이터 반환 (실제 구현시 자산별 수익률 데이터 필요)
         correlations = [
@@ -405,50 +581,11 @@ class RiskService:
         try:
             # 기준일 설정
             if as_of_date is None:
-                as_of_date_query = text("""
-                    SELECT MAX(as_of_date) 
-                    FROM portfolio_positions_daily 
-                    WHERE portfolio_id = :portfolio_id
-                """)
-                result = self.db.execute(as_of_date_query, {"portfolio_id": portfolio_id}).scalar()
+                result = self.db.execute(_MAX_DATE_SQL, {"portfolio_id": portfolio_id}).scalar()
                 as_of_date = result or datetime.now().date()
 
             # 특정 자산군의 자산들 조회
-            query = text("""
-                WITH portfolio_positions AS (
-                    SELECT 
-                        ppd.asset_id,
-                        ppd.quantity,
-                        ppd.market_value,
-                        ppd.market_value / SUM(ppd.market_value) OVER() * 100 as weight
-                    FROM portfolio_positions_daily ppd
-                    WHERE ppd.portfolio_id = :portfolio_id 
-                        AND ppd.as_of_date = :as_of_date
-                        AND ppd.quantity > 0
-                )
-                SELECT 
-                    a.id as asset_id,
-                    a.ticker,
-                    a.name,
-                    a.asset_class,
-                    pp.quantity,
-                    pp.market_value,
-                    pp.weight,
-                    COALESCE(ap.price, 0) as current_price
-                FROM portfolio_positions pp
-                JOIN assets a ON pp.asset_id = a.id
-                LEFT JOIN asset_prices ap ON a.id = ap.asset_id 
-                    AND ap.date = (
-                        SELECT MAX(date) 
-                        FROM asset_prices 
-                        WHERE asset_id = a.id 
-                        AND date <= :as_of_date
-                    )
-                WHERE a.asset_class = :asset_class
-                ORDER BY pp.market_value DESC
-            """)
-            
-            result = self.db.execute(query, {
+            result = self.db.execute(_ASSET_CLASS_DETAILS_SQL, {
                 "portfolio_id": portfolio_id,
                 "as_of_date": as_of_date,
                 "asset_class": asset_class
@@ -513,110 +650,21 @@ class RiskService:
         asset_filter: AssetFilter = AssetFilter.ALL
     ) -> AssetClassDetailsResponse:
         """
-        특정 자산군의 상세 정보를 조회합니다. (ORM 방식)
+        특정 자산군의 상세 정보를 조회합니다. (미리 구성된 Core 쿼리 사용)
         Assets 페이지 형식과 동일한 상세 정보를 제공합니다.
         """
         try:
             # 기준일 설정
             if as_of_date is None:
-                latest_date_result = (
-                    self.db.query(PortfolioPositionDaily.as_of_date)
-                    .filter(PortfolioPositionDaily.portfolio_id == portfolio_id)
-                    .order_by(desc(PortfolioPositionDaily.as_of_date))
-                    .first()
-                )
-                as_of_date = latest_date_result[0] if latest_date_result else datetime.now().date()
-
-            # 포지션 정보와 자산 정보 조회
-            # 서브쿼리: 포트폴리오 포지션 정보
-            positions_query = (
-                self.db.query(
-                    PortfolioPositionDaily.asset_id,
-                    PortfolioPositionDaily.quantity,
-                    PortfolioPositionDaily.avg_price,
-                    PortfolioPositionDaily.market_value,
-                    (PortfolioPositionDaily.market_value / 
-                     func.sum(PortfolioPositionDaily.market_value).over() * 100).label('weight')
-                )
-                .filter(
-                    PortfolioPositionDaily.portfolio_id == portfolio_id,
-                    PortfolioPositionDaily.as_of_date == as_of_date,
-                    PortfolioPositionDaily.quantity > 0
-                )
-                .subquery()
-            )
-
-            # 서브쿼리: 최신 가격 정보
-            latest_prices_query = (
-                self.db.query(
-                    Price.asset_id,
-                    Price.close.label('current_price'),
-                    Price.date.label('price_date'),
-                    func.row_number().over(
-                        partition_by=Price.asset_id,
-                        order_by=desc(Price.date)
-                    ).label('rn')
-                )
-                .filter(Price.date <= as_of_date)
-                .subquery()
-            )
-
-            # 서브쿼리: 전일 가격 정보
-            prev_day_prices_query = (
-                self.db.query(
-                    Price.asset_id,
-                    Price.close.label('prev_price'),
-                    func.row_number().over(
-                        partition_by=Price.asset_id,
-                        order_by=desc(Price.date)
-                    ).label('rn')
-                )
-                .filter(Price.date < as_of_date)
-                .subquery()
-            )
-
-            # 메인 쿼리: 자산군에 속한 자산들의 상세 정보
-            main_query = (
-                self.db.query(
-                    Asset.id.label('asset_id'),
-                    Asset.ticker,
-                    Asset.name,
-                    Asset.asset_class,
-                    Asset.currency,
-                    positions_query.c.quantity,
-                    positions_query.c.avg_price,
-                    positions_query.c.market_value,
-                    positions_query.c.weight,
-                    func.coalesce(
-                        latest_prices_query.c.current_price,
-                        positions_query.c.avg_price
-                    ).label('current_price'),
-                    func.coalesce(
-                        prev_day_prices_query.c.prev_price,
-                        positions_query.c.avg_price
-                    ).label('prev_price'),
-                    func.sum(positions_query.c.market_value).over().label('total_portfolio_value')
-                )
-                .join(positions_query, Asset.id == positions_query.c.asset_id)
-                .outerjoin(
-                    latest_prices_query,
-                    and_(
-                        Asset.id == latest_prices_query.c.asset_id,
-                        latest_prices_query.c.rn == 1
-                    )
-                )
-                .outerjoin(
-                    prev_day_prices_query,
-                    and_(
-                        Asset.id == prev_day_prices_query.c.asset_id,
-                        prev_day_prices_query.c.rn == 1
-                    )
-                )
-                .filter(Asset.asset_class == asset_class)
-                .order_by(desc(positions_query.c.market_value))
-            )
+                result = self.db.execute(_MAX_DATE_SQL, {"portfolio_id": portfolio_id}).scalar()
+                as_of_date = result or datetime.now().date()
 
-            result = main_query.all()
+            # 포지션 정보와 자산 정보 조회 (모듈 로드 시 구성된 문장 재사용)
+            result = self.db.execute(_ASSET_CLASS_DETAILS_STMT, {
+                "portfolio_id": portfolio_id,
+                "as_of_date": as_of_date,
+                "asset_class": asset_class
+            }).fetchall()
 
             if not result:
                 return AssetClassDetailsResponse(
@@ -636,8 +684,10 @@ class RiskService:
             total_value = 0.0
             total_weight = 0.0
             total_unrealized_pnl = 0.0
+            return_values = np.empty(len(result), dtype=np.float64)
+            weight_values = np.empty(len(result), dtype=np.float64)
             
-            for row in result:
+            for i, row in enumerate(result):
                 current_price = float(row.current_price)
                 avg_price = float(row.avg_price)
                 prev_price = float(row.prev_price)
@@ -672,9 +722,11 @@ class RiskService:
                 total_value += market_value
                 total_weight += float(row.weight)
                 total_unrealized_pnl += unrealized_pnl
+                return_values[i] = total_return_percent
+                weight_values[i] = asset_detail.weight
 
             # 평균 수익률 계산 (가중평균)
-            avg_return = sum(asset.total_return_percent * asset.weight for asset in assets) / total_weight if total_weight > 0 else None
+            avg_return = float(np.dot(return_values, weight_values) / total_weight) if total_weight > 0 else None
 
             return AssetClassDetailsResponse(
                 asset_class=asset_class,
@@ -3,49 +3,55 @@ from sqlalchemy import text
 import time  # 추가: 재시도 로직을 위해 time 모듈 임포트
 
 
-def get_duplicate_ids(session):
-    """asset_id와 date 기준으로 중복인 경우, 가장 작은 id를 유지하고 나머지 id들을 수집합니다."""
-    sql = text("""
-        SELECT asset_id, date, MIN(id) AS keep_id, GROUP_CONCAT(id) AS all_ids, COUNT(*) AS cnt
+# asset_id와 date 기준으로 중복인 경우, 가장 작은 id만 남기고 나머지를 DB 안에서 바로 삭제합니다.
+DELETE_DUPLICATES_SQL = text("""
+    DELETE p
+    FROM prices p
+    JOIN (
+        SELECT asset_id, date, MIN(id) AS keep_id
         FROM prices
         GROUP BY asset_id, date
         HAVING COUNT(*) > 1
-    """)
-    result = session.execute(sql)
-    duplicate_ids = []
-    for row in result:
-        ids = row.all_ids.split(',')
-        keep_id = str(row.keep_id)
-        # 가장 낮은 id(keep_id)를 제외한 나머지를 삭제 대상으로 추가합니다.
-        for id in ids:
-            if id != keep_id:
-                duplicate_ids.append(int(id))
-    return duplicate_ids
+    ) k ON p.asset_id = k.asset_id AND p.date = k.date
+    WHERE p.id <> k.keep_id
+""")
 
 
-def delete_duplicate(session, dup_id, max_retries=3):
-    """단일 중복 레코드를 삭제 시도하며, 실패 시 재시도 로직을 적용합니다."""
+def delete_duplicates(session, max_retries=3):
+    """중복 레코드를 단일 트랜잭션 안에서 한 번의 DELETE 문으로 삭제하며, 실패 시 재시도 로직을 적용합니다.
+
+    전체 삭제가 하나의 트랜잭션(COMMIT 1회)으로 처리되므로 중간에 실패해도 부분 삭제 상태가 남지 않습니다.
+    대신 삭제되는 행 전체가 InnoDB undo log에 기록되므로, 대략 (삭제 건수 × prices 행 크기)만큼의
+    undo 공간이 필요합니다 (prices 한 행은 인덱스 포함 약 100바이트 내외).
+    """
     for attempt in range(max_retries):
         try:
-            session.execute(text("DELETE FROM prices WHERE id = :id"), {"id": dup_id})
-            session.commit()
-            return True
+            with session.begin():
+                result = session.execute(DELETE_DUPLICATES_SQL)
+            return result.rowcount
         except Exception as e:
-            session.rollback()
             if attempt < max_retries - 1:
-                print(f"ID {dup_id} 삭제 중 오류 발생 (시도 {attempt+1}). 재시도 중...")
-                time.sleep(2)  # 대기 후 재시도
+                wait = 2 ** (attempt + 1)
+                print(f"중복 레코드 삭제 중 오류 발생 (시도 {attempt+1}). {wait}초 후 재시도 중...")
+                time.sleep(wait)  # 지수 백오프 후 재시도
             else:
-                print(f"중복 레코드 ID {dup_id}를 삭제하는 데 실패했습니다: {e}")
-                return False
+                print(f"중복 레코드를 삭제하는 데 실패했습니다: {e}")
+                return 0
+
+
+# 세션 설정용 SQL 문 (모듈 로드 시 한 번만 생성)
+SESSION_SETTINGS_SQL = (
+    # 중복 삭제는 단일 대량 DELETE이므로 잠금 대기 시간을 넉넉히 설정
+    text("SET SESSION innodb_lock_wait_timeout = 120"),
+    text("SET SESSION transaction_isolation = 'READ-COMMITTED'"),
+)
 
 
 def optimize_mysql_settings(session):
     """Optimize MySQL session settings to reduce lock wait timeouts and improve performance."""
     try:
-        session.execute(text("SET SESSION innodb_lock_wait_timeout = 50"))
-        session.execute(text("SET SESSION transaction_isolation = 'READ-COMMITTED'"))
-        session.execute(text("SET SESSION group_concat_max_len = 1000000"))
+        for stmt in SESSION_SETTINGS_SQL:
+            session.execute(stmt)
         session.commit()
     except Exception as e:
         session.rollback()
@@ -56,14 +62,9 @@ def main():
     session = SessionLocal()
     try:
         optimize_mysql_settings(session)  # DB 설정 최적화 호출
-        duplicate_ids = get_duplicate_ids(session)
-        print(f"총 {len(duplicate_ids)}건의 중복 레코드가 발견되었습니다.")
-        if duplicate_ids:
-            success_count = 0
-            for dup_id in duplicate_ids:
-                if delete_duplicate(session, dup_id):
-                    success_count += 1
-            print(f"총 {len(duplicate_ids)}건 중 {success_count}건 삭제되었습니다.")
+        deleted_count = delete_duplicates(session)
+        if deleted_count:
+            print(f"총 {deleted_count}건의 중복 레코드가 삭제되었습니다.")
         else:
             print("삭제할 중복 레코드가 없습니다.")
     finally:
@@ -0,0 +1,51 @@
+import csv
+import io
+import pandas as pd
+
+# pyarrow가 설치되어 있으면 Arrow의 C++ CSV writer 사용 (GIL 해제, pandas csv 모듈 경로보다 빠름)
+# pyarrow는 requirements에 없는 선택 의존성이며, 미설치 환경에서는 pandas to_csv로 동작
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.csv as pa_csv  # type: ignore
+except ImportError:
+    pa = None
+
+UTF8_BOM = "\ufeff"
+
+
+def _arrow_csv_body(df: pd.DataFrame):
+    """Arrow로 헤더 없는 CSV 본문 생성, 따옴표가 필요한 값(구분자/따옴표/줄바꿈 포함)이 있으면 None
+
+    Arrow는 헤더와 모든 문자열 값을 따옴표로 감싸므로(quoting_style='needed'도 동일)
+    따옴표 없이(quoting_style='none') 본문만 쓰고 헤더는 csv 모듈로 따로 씁니다.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    buf = io.BytesIO()
+    try:
+        pa_csv.write_csv(
+            table, buf, pa_csv.WriteOptions(include_header=False, quoting_style="none")
+        )
+    except pa.ArrowInvalid:
+        return None
+    return buf.getvalue()
+
+
+def write_csv(df: pd.DataFrame, path, bom: bool = True) -> None:
+    """DataFrame을 CSV로 저장 (index 제외, bom=True면 엑셀 호환용 UTF-8 BOM 포함)
+
+    pyarrow 경로는 헤더/문자열을 to_csv처럼 따옴표 없이 쓰고, 따옴표가 필요한 값이 있으면 to_csv로 저장합니다.
+    문자열 컬럼만 있는 티커 목록은 to_csv(줄바꿈 '\\n')와 같은 내용이지만,
+    실수/날짜 표기는 Arrow 형식을 따르므로(예: 1.0 → 1) to_csv 출력과 바이트 단위로 같지 않을 수 있습니다.
+    """
+    body = _arrow_csv_body(df) if pa is not None else None
+    if body is None:
+        df.to_csv(path, index=False, encoding="utf-8-sig" if bom else "utf-8")
+        return
+
+    header = io.StringIO()
+    csv.writer(header, lineterminator="\n").writerow([str(c) for c in df.columns])
+    with open(path, "wb") as f:
+        if bom:
+            f.write(UTF8_BOM.encode("utf-8"))
+        f.write(header.getvalue().encode("utf-8"))
+        f.write(body)
@@ -0,0 +1,15 @@
+import pandas as pd
+
+# python-calamine(Rust 기반 XLSX 파서)이 설치되어 있으면 사용
+# 미설치 환경에서는 pandas 기본 엔진(openpyxl, read_only 모드)으로 동작
+try:
+    import python_calamine  # type: ignore  # noqa: F401
+    EXCEL_ENGINE = 'calamine'
+except ImportError:
+    EXCEL_ENGINE = None
+
+
+def read_excel(path, **kwargs) -> pd.DataFrame:
+    """pd.read_excel 래퍼 (가능하면 calamine 엔진으로 워크북 전체 객체 트리 생성 없이 읽음)"""
+    kwargs.setdefault('engine', EXCEL_ENGINE)
+    return pd.read_excel(path, **kwargs)
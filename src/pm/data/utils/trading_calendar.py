@@ -1,296 +1,223 @@
 from datetime import datetime, date, timedelta
+import numpy as np
 import pandas as pd
 from pandas.tseries.offsets import BDay
 import pandas_market_calendars as mcal
 
-class TradingCalendar_KRX:
-    """한국 거래소(KRX) 거래일 관리 클래스"""
-    
-    def __init__(self):
-        self.krx = mcal.get_calendar('XKRX')
-    
-    def get_trading_dates(self, start_date: date, end_date: date) -> list:
-        """주어진 기간의 거래일 목록 반환"""
-        schedule = self.krx.schedule(start_date=start_date, end_date=end_date)
-        return [d.date() for d in schedule.index]
-    
-    def is_trading_day(self, check_date: date) -> bool:
-        """해당 날짜가 거래일인지 확인"""
-        return len(self.krx.valid_days(start_date=check_date, end_date=check_date)) > 0
-    
-    def get_last_trading_day(self, ref_date: date) -> date:
-        """주어진 날짜 이전의 가장 최근 거래일 반환"""
-        schedule = self.krx.schedule(start_date=ref_date - timedelta(days=10), 
-                                   end_date=ref_date)
-        if len(schedule) == 0:
-            return None
-        return schedule.index[-1].date()
-    
-    def get_next_trading_day(self, ref_date: date) -> date:
-        """주어진 날짜 이후의 가장 빠른 거래일 반환"""
-        schedule = self.krx.schedule(start_date=ref_date, 
-                                   end_date=ref_date + timedelta(days=10))
-        if len(schedule) == 0:
-            return None
-        return schedule.index[0].date()
-    
-    def get_week_bounds(self, ref_date: date) -> tuple:
-        """해당 주의 첫 거래일과 마지막 거래일 반환
-        
-        Returns:
-            tuple: (week_start_date, week_end_date)
-        """
-        # 월요일로 조정
-        monday = ref_date - timedelta(days=ref_date.weekday())
-        friday = monday + timedelta(days=4)
-        
-        # 실제 거래일 찾기
-        week_start = self.get_next_trading_day(monday)
-        week_end = self.get_last_trading_day(friday)
-        
-        return week_start, week_end
-    
-    def get_week_ranges(self, start_date: date, end_date: date) -> list:
-        """주어진 기간의 주간 범위 목록 반환
-        
-        Returns:
-            list of tuple: [(week1_start, week1_end), (week2_start, week2_end), ...]
-        """
-        # 첫 주 월요일로 조정
-        current = start_date - timedelta(days=start_date.weekday())
-        
-        ranges = []
-        while current <= end_date:
-            week_start, week_end = self.get_week_bounds(current)
-            if week_start and week_end and week_end <= end_date:
-                ranges.append((week_start, week_end))
-            current += timedelta(days=7)
-            
-        return ranges
-    
-    def get_month_bounds(self, ref_date: date) -> tuple:
-        """해당 월의 첫 거래일과 마지막 거래일 반환
-        
-        Returns:
-            tuple: (month_start_date, month_end_date)
-        """
-        month_start = date(ref_date.year, ref_date.month, 1)
-        if ref_date.month == 12:
-            month_end = date(ref_date.year + 1, 1, 1) - timedelta(days=1)
-        else:
-            month_end = date(ref_date.year, ref_date.month + 1, 1) - timedelta(days=1)
-        
-        # 실제 거래일 찾기
-        first_trading_day = self.get_next_trading_day(month_start)
-        last_trading_day = self.get_last_trading_day(month_end)
-        
-        return first_trading_day, last_trading_day
-    
-    def get_month_ranges(self, start_date: date, end_date: date) -> list:
-        """주어진 기간의 월간 범위 목록 반환
-        
-        Returns:
-            list of tuple: [(month1_start, month1_end), (month2_start, month2_end), ...]
-        """
-        ranges = []
-        current = date(start_date.year, start_date.month, 1)
-        
-        while current <= end_date:
-            month_start, month_end = self.get_month_bounds(current)
-            if month_start and month_end and month_end <= end_date:
-                ranges.append((month_start, month_end))
-            
-            # 다음 달로 이동
-            if current.month == 12:
-                current = date(current.year + 1, 1, 1)
-            else:
-                current = date(current.year, current.month + 1, 1)
-        
-        return ranges
-    
-    def get_quarter_bounds(self, ref_date: date) -> tuple:
-        """해당 분기의 첫 거래일과 마지막 거래일 반환
-        
-        Returns:
-            tuple: (quarter_start_date, quarter_end_date)
+class _CachedTradingCalendar:
+    """거래일 캐시 공통 구현 (KRX/NYSE 캘린더가 함께 사용)
+
+    schedule()은 호출할 때마다 휴장일 규칙과 DatetimeIndex를 새로 만들기 때문에,
+    요청된 구간을 포함하는 연 단위 범위로 한 번만 조회해 정렬된 거래일 배열과
+    집합으로 보관하고 이후 조회는 배열/집합 연산으로 처리합니다.
+    """
+
+    # 전후 거래일 탐색 시 확인하는 최대 일수
+    _LOOKUP_DAYS = 10
+
+    @staticmethod
+    def _to_date(value) -> date:
+        """date/datetime/pd.Timestamp/문자열을 date로 맞춤
+
+        datetime/pd.Timestamp는 date 하위 클래스지만 date와 크기 비교가 안 되고 해시도 달라
+        캐시 범위 비교와 거래일 집합 조회 전에 일 단위 date로 변환합니다.
         """
-        quarter = (ref_date.month - 1) // 3
-        quarter_start = date(ref_date.year, quarter * 3 + 1, 1)
-        if quarter == 3:  # Q4
-            quarter_end = date(ref_date.year + 1, 1, 1) - timedelta(days=1)
-        else:
-            quarter_end = date(ref_date.year, (quarter + 1) * 3 + 1, 1) - timedelta(days=1)
-        
-        # 실제 거래일 찾기
-        first_trading_day = self.get_next_trading_day(quarter_start)
-        last_trading_day = self.get_last_trading_day(quarter_end)
-        
-        return first_trading_day, last_trading_day
-    
-    def get_quarter_ranges(self, start_date: date, end_date: date) -> list:
-        """주어진 기간의 분기 범위 목록 반환
-        
-        Returns:
-            list of tuple: [(quarter1_start, quarter1_end), (quarter2_start, quarter2_end), ...]
+        return pd.Timestamp(value).date()
+
+    def _init_cache(self, calendar):
+        self._calendar = calendar
+        self._trading_days = None   # np.ndarray[datetime64[D]], 정렬됨
+        self._trading_set = None    # frozenset[date]
+        self._cache_start = None
+        self._cache_end = None
+
+    def _ensure_range(self, start_date: date, end_date: date):
+        """[start_date, end_date] 구간이 캐시에 포함되도록 확장"""
+        start_date, end_date = self._to_date(start_date), self._to_date(end_date)
+        if (self._trading_days is not None
+                and self._cache_start <= start_date and end_date <= self._cache_end):
+            return
+
+        # 전후 탐색 여유분을 포함해 연 단위로 확장
+        margin = timedelta(days=self._LOOKUP_DAYS)
+        new_start = date((start_date - margin).year, 1, 1)
+        new_end = date((end_date + margin).year, 12, 31)
+        if self._trading_days is not None:
+            new_start = min(new_start, self._cache_start)
+            new_end = max(new_end, self._cache_end)
+
+        schedule = self._calendar.schedule(start_date=new_start, end_date=new_end)
+        self._trading_days = schedule.index.values.astype('datetime64[D]')
+        self._trading_set = frozenset(self._trading_days.tolist())
+        self._cache_start = new_start
+        self._cache_end = new_end
+
+    def _trading_days_between(self, start_date: date, end_date: date) -> np.ndarray:
+        """[start_date, end_date] 구간의 거래일 배열 (datetime64[D]) 반환"""
+        start_date, end_date = self._to_date(start_date), self._to_date(end_date)
+        self._ensure_range(start_date, end_date)
+        lo = np.searchsorted(self._trading_days, np.datetime64(start_date, 'D'), side='left')
+        hi = np.searchsorted(self._trading_days, np.datetime64(end_date, 'D'), side='right')
+        return self._trading_days[lo:hi]
+
+    def _period_ranges(self, start_date: date, end_date: date, freq: str) -> list:
+        """기간(freq) 단위로 거래일을 묶어 (첫 거래일, 마지막 거래일) 목록 반환
+
+        start_date가 속한 기간부터 시작하며, 마지막 거래일이 end_date 이후인 기간은 제외합니다.
         """
-        ranges = []
-        current = date(start_date.year, ((start_date.month - 1) // 3) * 3 + 1, 1)
-        
-        while current <= end_date:
-            quarter_start, quarter_end = self.get_quarter_bounds(current)
-            if quarter_start and quarter_end and quarter_end <= end_date:
-                ranges.append((quarter_start, quarter_end))
-            
-            # 다음 분기로 이동
-            if current.month == 10:  # Q4
-                current = date(current.year + 1, 1, 1)
-            else:
-                current = date(current.year, current.month + 3, 1)
-        
-        return ranges
-
-class TradingCalendar_NYSE:
-    """뉴욕 증권거래소(NYSE) 거래일 관리 클래스"""
-    
-    def __init__(self):
-        self.nyse = mcal.get_calendar('XNYS')
-    
+        range_start = pd.Period(start_date, freq=freq).start_time.date()
+        range_end = pd.Period(end_date, freq=freq).end_time.date()
+        trading_days = pd.DatetimeIndex(self._trading_days_between(range_start, range_end))
+        if len(trading_days) == 0:
+            return []
+
+        bounds = pd.Series(trading_days, index=trading_days).groupby(
+            trading_days.to_period(freq)
+        ).agg(['min', 'max'])
+        bounds = bounds[bounds['max'] <= pd.Timestamp(end_date)]
+        return list(zip(bounds['min'].dt.date, bounds['max'].dt.date))
+
+    def _period_bounds(self, period_start: date, period_end: date) -> tuple:
+        """[period_start, period_end] 구간의 첫 거래일과 마지막 거래일 반환 (거래일이 없으면 (None, None))"""
+        trading_days = self._trading_days_between(period_start, period_end)
+        if len(trading_days) == 0:
+            return None, None
+        return trading_days[0].item(), trading_days[-1].item()
+
     def get_trading_dates(self, start_date: date, end_date: date) -> list:
         """주어진 기간의 거래일 목록 반환"""
-        schedule = self.nyse.schedule(start_date=start_date, end_date=end_date)
-        return [d.date() for d in schedule.index]
-    
+        return self._trading_days_between(start_date, end_date).tolist()
+
     def is_trading_day(self, check_date: date) -> bool:
         """해당 날짜가 거래일인지 확인"""
-        return len(self.nyse.valid_days(start_date=check_date, end_date=check_date)) > 0
-    
+        check_date = self._to_date(check_date)
+        # 주말은 캘린더 조회 없이 바로 제외 (KRX/NYSE 모두 주말 휴장)
+        if check_date.weekday() >= 5:
+            return False
+        self._ensure_range(check_date, check_date)
+        return check_date in self._trading_set
+
     def get_last_trading_day(self, ref_date: date) -> date:
         """주어진 날짜 이전의 가장 최근 거래일 반환"""
-        schedule = self.nyse.schedule(start_date=ref_date - timedelta(days=10), 
-                                   end_date=ref_date)
-        if len(schedule) == 0:
+        ref_date = self._to_date(ref_date)
+        window_start = ref_date - timedelta(days=self._LOOKUP_DAYS)
+        self._ensure_range(window_start, ref_date)
+        idx = np.searchsorted(self._trading_days, np.datetime64(ref_date, 'D'), side='right') - 1
+        if idx < 0:
             return None
-        return schedule.index[-1].date()
-    
+        last_day = self._trading_days[idx].item()
+        return last_day if last_day >= window_start else None
+
     def get_next_trading_day(self, ref_date: date) -> date:
         """주어진 날짜 이후의 가장 빠른 거래일 반환"""
-        schedule = self.nyse.schedule(start_date=ref_date, 
-                                   end_date=ref_date + timedelta(days=10))
-        if len(schedule) == 0:
+        ref_date = self._to_date(ref_date)
+        window_end = ref_date + timedelta(days=self._LOOKUP_DAYS)
+        self._ensure_range(ref_date, window_end)
+        idx = np.searchsorted(self._trading_days, np.datetime64(ref_date, 'D'), side='left')
+        if idx >= len(self._trading_days):
             return None
-        return schedule.index[0].date()
-    
+        next_day = self._trading_days[idx].item()
+        return next_day if next_day <= window_end else None
+
     def get_week_bounds(self, ref_date: date) -> tuple:
         """해당 주의 첫 거래일과 마지막 거래일 반환
-        
+
         Returns:
             tuple: (week_start_date, week_end_date)
         """
+        ref_date = self._to_date(ref_date)
         # 월요일로 조정
         monday = ref_date - timedelta(days=ref_date.weekday())
         friday = monday + timedelta(days=4)
-        
-        # 실제 거래일 찾기
-        week_start = self.get_next_trading_day(monday)
-        week_end = self.get_last_trading_day(friday)
-        
-        return week_start, week_end
-    
+
+        # 실제 거래일 찾기 (캐시된 거래일 배열에서 이진 탐색 한 쌍으로 처리)
+        return self._period_bounds(monday, friday)
+
     def get_week_ranges(self, start_date: date, end_date: date) -> list:
         """주어진 기간의 주간 범위 목록 반환
-        
+
         Returns:
             list of tuple: [(week1_start, week1_end), (week2_start, week2_end), ...]
         """
-        # 첫 주 월요일로 조정
-        current = start_date - timedelta(days=start_date.weekday())
-        
-        ranges = []
-        while current <= end_date:
-            week_start, week_end = self.get_week_bounds(current)
-            if week_start and week_end and week_end <= end_date:
-                ranges.append((week_start, week_end))
-            current += timedelta(days=7)
-            
-        return ranges
-    
+        return self._period_ranges(start_date, end_date, 'W-SUN')
+
     def get_month_bounds(self, ref_date: date) -> tuple:
         """해당 월의 첫 거래일과 마지막 거래일 반환
-        
+
         Returns:
             tuple: (month_start_date, month_end_date)
         """
+        ref_date = self._to_date(ref_date)
         month_start = date(ref_date.year, ref_date.month, 1)
         if ref_date.month == 12:
             month_end = date(ref_date.year + 1, 1, 1) - timedelta(days=1)
         else:
             month_end = date(ref_date.year, ref_date.month + 1, 1) - timedelta(days=1)
-        
-        # 실제 거래일 찾기
-        first_trading_day = self.get_next_trading_day(month_start)
-        last_trading_day = self.get_last_trading_day(month_end)
-        
-        return first_trading_day, last_trading_day
-    
+
+        # 실제 거래일 찾기 (캐시된 거래일 배열에서 이진 탐색 한 쌍으로 처리)
+        return self._period_bounds(month_start, month_end)
+
     def get_month_ranges(self, start_date: date, end_date: date) -> list:
         """주어진 기간의 월간 범위 목록 반환
-        
+
         Returns:
             list of tuple: [(month1_start, month1_end), (month2_start, month2_end), ...]
         """
-        ranges = []
-        current = date(start_date.year, start_date.month, 1)
-        
-        while current <= end_date:
-            month_start, month_end = self.get_month_bounds(current)
-            if month_start and month_end and month_end <= end_date:
-                ranges.append((month_start, month_end))
-            
-            # 다음 달로 이동
-            if current.month == 12:
-                current = date(current.year + 1, 1, 1)
-            else:
-                current = date(current.year, current.month + 1, 1)
-        
-        return ranges
-    
+        return self._period_ranges(start_date, end_date, 'M')
+
     def get_quarter_bounds(self, ref_date: date) -> tuple:
         """해당 분기의 첫 거래일과 마지막 거래일 반환
-        
+
         Returns:
             tuple: (quarter_start_date, quarter_end_date)
         """
+        ref_date = self._to_date(ref_date)
         quarter = (ref_date.month - 1) // 3
         quarter_start = date(ref_date.year, quarter * 3 + 1, 1)
         if quarter == 3:  # Q4
             quarter_end = date(ref_date.year + 1, 1, 1) - timedelta(days=1)
         else:
             quarter_end = date(ref_date.year, (quarter + 1) * 3 + 1, 1) - timedelta(days=1)
-        
-        # 실제 거래일 찾기
-        first_trading_day = self.get_next_trading_day(quarter_start)
-        last_trading_day = self.get_last_trading_day(quarter_end)
-        
-        return first_trading_day, last_trading_day
-    
+
+        # 실제 거래일 찾기 (캐시된 거래일 배열에서 이진 탐색 한 쌍으로 처리)
+        return self._period_bounds(quarter_start, quarter_end)
+
     def get_quarter_ranges(self, start_date: date, end_date: date) -> list:
         """주어진 기간의 분기 범위 목록 반환
-        
+
         Returns:
             list of tuple: [(quarter1_start, quarter1_end), (quarter2_start, quarter2_end), ...]
         """
-        ranges = []
-        current = date(start_date.year, ((start_date.month - 1) // 3) * 3 + 1, 1)
-        
-        while current <= end_date:
-            quarter_start, quarter_end = self.get_quarter_bounds(current)
-            if quarter_start and quarter_end and quarter_end <= end_date:
-                ranges.append((quarter_start, quarter_end))
-            
-            # 다음 분기로 이동
-            if current.month == 10:  # Q4
-                current = date(current.year + 1, 1, 1)
-            else:
-                current = date(current.year, current.month + 3, 1)
-        
-        return ranges
\ No newline at end of file
+        return self._period_ranges(start_date, end_date, 'Q')
+
+class TradingCalendar_KRX(_CachedTradingCalendar):
+    """한국 거래소(KRX) 거래일 관리 클래스
+
+    캘린더 생성(휴장일 규칙 로드)과 거래일 캐시를 재사용하도록 프로세스 내 단일 인스턴스로 동작합니다.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            instance = super().__new__(cls)
+            instance.krx = mcal.get_calendar('XKRX')
+            instance._init_cache(instance.krx)
+            cls._instance = instance
+        return cls._instance
+
+class TradingCalendar_NYSE(_CachedTradingCalendar):
+    """뉴욕 증권거래소(NYSE) 거래일 관리 클래스
+
+    캘린더 생성(휴장일 규칙 로드)과 거래일 캐시를 재사용하도록 프로세스 내 단일 인스턴스로 동작합니다.
+    """
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            instance = super().__new__(cls)
+            instance.nyse = mcal.get_calendar('XNYS')
+            instance._init_cache(instance.nyse)
+            cls._instance = instance
+        return cls._instance
@@ -1,9 +1,19 @@
 import os
+import io
+import functools
+import csv
+import tempfile
+import contextlib
 from pathlib import Path
 from sqlalchemy import (
-    create_engine, Column, Integer, String, Float, Date, DateTime, Enum, ForeignKey, UniqueConstraint, Numeric, Text, Boolean
+    create_engine, insert, select, update, delete, lambda_stmt, type_coerce, text, true, Column, Integer, String, Float, Double, Date, DateTime, Enum, ForeignKey, UniqueConstraint, Numeric, Text, Boolean, LargeBinary, Index
 )
-from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import declarative_base, sessionmaker, relationship, selectinload, raiseload
 from datetime import datetime
 
 # 환경 변수(.env) 로드 시도
@@ -26,6 +36,20 @@ except Exception:
     # dotenv 미설치 또는 로드 실패 시 무시하고 OS 환경변수만 사용
     pass
 
+# 외부에서 사용하는 공개 이름 (모델/세션/적재 헬퍼)
+__all__ = [
+    'Base', 'engine', 'SessionLocal', 'session_scope', 'init_db',
+    'ASSET_CLASS_ENUM', 'MARKET_TYPES', 'COUNTRIES', 'RATE_TYPES',
+    'Portfolio', 'Asset', 'Price', 'PriceStaging', 'Transaction',
+    'PortfolioPositionDaily', 'PortfolioPositionSnapshot', 'PortfolioNavDaily',
+    'AssetClassReturnDaily', 'MarketInstrument', 'MarketPriceDaily', 'RiskFreeRateDaily',
+    'MarketDataHelper',
+    'BULK_INSERT_BATCH_SIZE', 'bulk_insert_prices', 'bulk_insert_market_prices', 'bulk_insert_risk_free_rates',
+    'bulk_insert_transactions', 'bulk_insert_positions', 'bulk_insert_navs', 'bulk_insert_asset_class_returns',
+    'upsert_prices', 'upsert_positions', 'upsert_asset_class_returns', 'upsert_from_select', 'copy_prices', 'copy_market_prices', 'merge_price_staging',
+    'POSITION_SNAPSHOT_COLUMNS', 'write_position_snapshot', 'read_position_snapshot',
+]
+
 # Base 선언: SQLAlchemy ORM 모델의 공통 부모 클래스
 Base = declarative_base()
 
@@ -34,7 +58,7 @@ ASSET_CLASS_ENUM = (
     'SP50', 'FXCOM', 'GL_INDEX', 'GL_SECTOR', 'KR_INDEX', 'KR_SECTOR', 'MONEY_ULTRA_SHORT', 'GL_BOND_CORP', 'GL_BOND_AGG', 'KR_BOND_CORP', 'KR_BOND_AGG'
     )
 
-# 시장 데이터용 상수 정의 (ENUM 대신 사용)
+# 시장 데이터용 상수 정의 (키 목록은 MarketInstrument/RiskFreeRateDaily의 ENUM 값으로도 사용)
 MARKET_TYPES = {
     'STOCK_INDEX': '주식 지수',
     'BOND_INDEX': '채권 지수', 
@@ -55,6 +79,11 @@ RATE_TYPES = {
     'CORPORATE_BOND_RATE': '회사채 금리'
 }
 
+# 유효성 검사용 키 집합 (불변이라 스레드 간 공유 가능)
+_MARKET_TYPE_KEYS = frozenset(MARKET_TYPES)
+_COUNTRY_KEYS = frozenset(COUNTRIES)
+_RATE_TYPE_KEYS = frozenset(RATE_TYPES)
+
 
 # Portfolio 테이블 모델
 class Portfolio(Base):
@@ -66,21 +95,25 @@ class Portfolio(Base):
     initial_cash   = Column(Numeric(20,4), nullable=False, default=1000000000.0)
     cash_balance   = Column(Numeric(20,4), nullable=False, default=1000000000.0)
     # 관련 관계
+    # 일별 이력 컬렉션은 lazy='raise': 암묵적 지연 로딩(N+1) 대신 쿼리에서 selectinload로 명시적으로 로드
     transactions = relationship("Transaction", back_populates="portfolio")
     positions_daily = relationship(
         "PortfolioPositionDaily",
         back_populates="portfolio",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        lazy='raise'
     )
     navs_daily = relationship(
         "PortfolioNavDaily",
         back_populates="portfolio",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        lazy='raise'
     )
     asset_class_returns = relationship(
         "AssetClassReturnDaily",
         back_populates="portfolio",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        lazy='raise'
     )
 # Asset 테이블 모델
 class Asset(Base):
@@ -91,13 +124,14 @@ class Asset(Base):
     currency = Column(String(3), nullable=False, default='KRW')
     asset_class = Column(Enum(*ASSET_CLASS_ENUM, name='asset_class_enum'), nullable=True)  # 새 컬럼
 
-    # 관련 관계
-    prices = relationship("Price", back_populates="asset", cascade="all, delete-orphan")
+    # 관련 관계 (가격/포지션 이력은 lazy='raise', 필요 시 selectinload(Asset.prices) 등으로 로드)
+    prices = relationship("Price", back_populates="asset", cascade="all, delete-orphan", lazy='raise')
     transactions = relationship("Transaction", back_populates="asset")
     positions_daily = relationship(
         "PortfolioPositionDaily",
         back_populates="asset",
-        cascade="all, delete-orphan"
+        cascade="all, delete-orphan",
+        lazy='raise'
     )
 # Price 테이블 모델
 class Price(Base):
@@ -105,14 +139,44 @@ class Price(Base):
     id = Column(Integer, primary_key=True)
     asset_id = Column(Integer, ForeignKey('assets.id', ondelete="CASCADE"), nullable=False)
     date = Column(Date, nullable=False)
-    close = Column(Numeric(20,8), nullable=False)
+    close = Column(Double(asdecimal=False), nullable=False)  # 분석용 시세: DOUBLE(배정밀도)로 저장해 Decimal 변환 없이 float 사용 (MySQL FLOAT는 단정밀도라 사용하지 않음)
 
     asset = relationship("Asset", back_populates="prices")
     __table_args__ = (
         UniqueConstraint('asset_id', 'date', name='uq_price_asset_date'),
+        # 특정 날짜의 전 종목 가격 조회 (asset_id 선두 UNIQUE 키로는 범위 스캔 불가)
+        Index('ix_price_date', 'date'),
+        # 자산별 최신 종가 조회용 커버링 인덱스 (UNIQUE 키에 조회 컬럼 close만 추가)
+        Index('ix_price_asset_date_close', 'asset_id', 'date', 'close'),
+        {'mysql_engine': 'InnoDB', 'mysql_row_format': 'DYNAMIC'},
     )
 
 
+# 과거 이력 일괄 적재(backfill)용 스테이징 테이블
+class PriceStaging(Base):
+    """prices 적재 전 임시 보관 테이블
+
+    PostgreSQL에서는 UNLOGGED로 생성해 적재 중 WAL 기록을 생략하고,
+    적재가 끝나면 merge_price_staging()으로 prices에 한 번에 옮깁니다.
+    """
+    __tablename__ = 'prices_staging'
+    id = Column(Integer, primary_key=True)
+    asset_id = Column(Integer, nullable=False)
+    date = Column(Date, nullable=False)
+    close = Column(Double(asdecimal=False), nullable=False)
+
+    __table_args__ = {'mysql_engine': 'InnoDB', 'info': {'unlogged': True}}
+
+
+@compiles(CreateTable, 'postgresql')
+def _create_unlogged_table(element, compiler, **kw):
+    """info['unlogged']가 지정된 테이블은 PostgreSQL에서 CREATE UNLOGGED TABLE로 생성"""
+    ddl = compiler.visit_create_table(element, **kw)
+    if element.element.info.get('unlogged'):
+        ddl = ddl.replace('CREATE TABLE', 'CREATE UNLOGGED TABLE', 1)
+    return ddl
+
+
 # Transaction 테이블 모델
 class Transaction(Base):
     __tablename__ = 'transactions'
@@ -126,6 +190,13 @@ class Transaction(Base):
     tax = Column(Numeric(20,8),   nullable=False, default=0)
     type = Column(Enum('BUY', 'SELL',"DEPOSIT", "WITHDRAW", "DIVIDEND", name='transaction_type'), nullable=False)
 
+    __table_args__ = (
+        # 스냅샷 집계(포트폴리오·기준일 이전·거래유형 필터)용 인덱스
+        # PostgreSQL은 집계 컬럼을 INCLUDE해 테이블 접근 없이 인덱스만으로 처리
+        Index('ix_tx_pf_date_type', 'portfolio_id', 'trans_date', 'type',
+              postgresql_include=['asset_id', 'quantity', 'price', 'fee', 'tax']),
+    )
+
     # 관계 설정
     portfolio = relationship("Portfolio", back_populates="transactions")
     asset = relationship("Asset", back_populates="transactions")
@@ -146,6 +217,23 @@ class PortfolioPositionDaily(Base):
     portfolio = relationship("Portfolio", back_populates="positions_daily")
     asset     = relationship("Asset",     back_populates="positions_daily")
 
+class PortfolioPositionSnapshot(Base):
+    """일별 포지션 스냅샷의 컬럼형(Arrow IPC) 저장 테이블
+
+    portfolio_positions_daily(포트폴리오 × 날짜 × 자산 행)의 읽기 전용 보조 테이블로,
+    하루치 [asset_id, quantity, avg_price, market_value]를 zstd 압축 Arrow 스트림 한 건으로 보관합니다.
+    감사/리포트용 원본은 계속 portfolio_positions_daily를 사용합니다.
+    """
+    __tablename__ = 'portfolio_position_snapshots'
+    id           = Column(Integer, primary_key=True)
+    portfolio_id = Column(Integer, ForeignKey('portfolios.id'), nullable=False)
+    as_of_date   = Column(Date, nullable=False)
+    payload      = Column(LargeBinary(length=2**24), nullable=False)  # MySQL: MEDIUMBLOB
+
+    __table_args__ = (
+        UniqueConstraint('portfolio_id', 'as_of_date', name='uq_possnap_port_date'),
+    )
+
 class PortfolioNavDaily(Base):
     __tablename__ = 'portfolio_nav_daily'
     id                  = Column(Integer, primary_key=True)
@@ -153,9 +241,11 @@ class PortfolioNavDaily(Base):
     as_of_date          = Column(Date, nullable=False)
     cash_balance        = Column(Numeric(20,4), nullable=False)
     total_market_value  = Column(Numeric(20,4), nullable=False)
-    nav                 = Column(Numeric(20,4), nullable=False)
+    nav                 = Column(Numeric(20,4, asdecimal=False), nullable=False)  # 조회 시 Decimal 대신 float 반환
     __table_args__ = (
         UniqueConstraint('portfolio_id','as_of_date', name='uq_navdaily_port_date'),
+        # 벤치마크 비교 차트용 커버링 인덱스 (날짜 범위 스캔 + nav 조회를 인덱스만으로 처리)
+        Index('ix_navdaily_port_date_nav', 'portfolio_id', 'as_of_date', 'nav'),
     )
 
     portfolio = relationship("Portfolio", back_populates="navs_daily")
@@ -165,7 +255,7 @@ class AssetClassReturnDaily(Base):
     """자산군별 일일 수익률 저장 테이블
     - TWR 방식으로 계산된 일일 수익률
     - 전일 자산군 가중치 × 당일 개별자산 수익률의 합
-    - 수익률은 DECIMAL(10,6)으로 저장 (±9999.999999 범위)
+    - 수익률은 DECIMAL(10,6)으로 저장 (±9999.999999 범위), 조회 시에는 float로 반환
     """
     __tablename__ = 'asset_class_returns_daily'
     
@@ -173,10 +263,10 @@ class AssetClassReturnDaily(Base):
     portfolio_id = Column(Integer, ForeignKey('portfolios.id'), nullable=False)
     date = Column(Date, nullable=False)
     asset_class = Column(Enum(*ASSET_CLASS_ENUM, name='asset_class_enum'), nullable=False)
-    daily_return = Column(Numeric(10, 6), nullable=False)
+    daily_return = Column(Numeric(10, 6, asdecimal=False), nullable=False)  # 조회 시 Decimal 대신 float 반환
     
     # 관계 설정
-    portfolio = relationship("Portfolio")
+    portfolio = relationship("Portfolio", back_populates="asset_class_returns")
     
     __table_args__ = (
         UniqueConstraint('portfolio_id', 'date', 'asset_class',
@@ -185,21 +275,27 @@ class AssetClassReturnDaily(Base):
 
 
 class MarketInstrument(Base):
-    """시장 상품 마스터 테이블 (정규화) - ENUM 없는 버전"""
+    """시장 상품 마스터 테이블 (정규화)"""
     __tablename__ = 'market_instruments'
     
     id = Column(Integer, primary_key=True)
     symbol = Column(String(20), unique=True, nullable=False)  # ^GSPC, USDKRW=X
     name = Column(String(100), nullable=False)  # S&P 500, USD/KRW
-    market_type = Column(String(20), nullable=False)  # STOCK_INDEX, CURRENCY, RATE 등
-    country = Column(String(10), nullable=False)  # US, KR, GLOBAL 등
+    market_type = Column(Enum(*MARKET_TYPES, name='market_type_enum'), nullable=False)  # STOCK_INDEX, CURRENCY, RATE 등
+    country = Column(Enum(*COUNTRIES, name='country_enum'), nullable=False)  # US, KR, GLOBAL 등
     currency = Column(String(3), nullable=False)  # USD, KRW
     description = Column(String(200))
-    is_active = Column(String(10), default='Yes')
+    is_active = Column(Boolean, nullable=False, default=True, server_default=true())
     
     # 관계 설정
-    price_data = relationship("MarketPriceDaily", back_populates="instrument", cascade="all, delete-orphan")
-    rate_data = relationship("RiskFreeRateDaily", back_populates="instrument", cascade="all, delete-orphan")
+    price_data = relationship("MarketPriceDaily", back_populates="instrument", cascade="all, delete-orphan", lazy='raise')
+    rate_data = relationship("RiskFreeRateDaily", back_populates="instrument", cascade="all, delete-orphan", lazy='raise')
+
+    __table_args__ = (
+        # MarketDataHelper의 market_type/is_active 필터용 (PostgreSQL에서는 활성 상품만 담는 부분 인덱스)
+        Index('ix_mi_active_type', 'market_type', 'is_active',
+              postgresql_where=text("is_active")),
+    )
 
 
 class MarketPriceDaily(Base):
@@ -214,18 +310,23 @@ class MarketPriceDaily(Base):
     open_price = Column(Numeric(20, 8))
     high_price = Column(Numeric(20, 8))
     low_price = Column(Numeric(20, 8))
-    close_price = Column(Numeric(20, 8), nullable=False)
+    close_price = Column(Numeric(20, 8, asdecimal=False), nullable=False)  # 조회 시 Decimal 대신 float 반환
     volume = Column(Numeric(20, 0))
     
     # 계산된 필드
-    daily_return = Column(Numeric(10, 6))  # %
+    daily_return = Column(Numeric(10, 6, asdecimal=False))  # %, 조회 시 Decimal 대신 float 반환
     
     # 관계 설정
     instrument = relationship("MarketInstrument", back_populates="price_data")
     
     # 제약조건
     __table_args__ = (
+        # (instrument_id, date) 범위 조회도 이 UNIQUE 키로 처리
+        # (DATE는 MySQL에서 3바이트 정수로 비교되므로 별도의 epoch 정수 컬럼/인덱스는 두지 않음)
         UniqueConstraint('instrument_id', 'date', name='unique_instrument_date'),
+        # 벤치마크 비교 차트용 커버링 인덱스 (날짜 범위 스캔 + 종가 조회를 인덱스만으로 처리)
+        Index('ix_mpd_instr_date_close', 'instrument_id', 'date', 'close_price'),
+        {'mysql_engine': 'InnoDB', 'mysql_row_format': 'DYNAMIC'},
     )
 
 
@@ -237,7 +338,7 @@ class RiskFreeRateDaily(Base):
     instrument_id = Column(Integer, ForeignKey('market_instruments.id'), nullable=False)
     date = Column(Date, nullable=False)
     rate = Column(Numeric(8, 4), nullable=False)  # 이자율 (%)
-    rate_type = Column(String(30), nullable=False)  # CENTRAL_BANK_RATE, TREASURY_RATE 등
+    rate_type = Column(Enum(*RATE_TYPES, name='rate_type_enum'), nullable=False)  # CENTRAL_BANK_RATE, TREASURY_RATE 등
     
     # 관계 설정
     instrument = relationship("MarketInstrument", back_populates="rate_data")
@@ -258,32 +359,54 @@ class MarketDataHelper:
     @staticmethod
     def validate_market_type(market_type: str) -> bool:
         """마켓 타입 유효성 검사"""
-        return market_type in MARKET_TYPES
+        return market_type in _MARKET_TYPE_KEYS
     
     @staticmethod
     def validate_country(country: str) -> bool:
         """국가 코드 유효성 검사"""
-        return country in COUNTRIES
+        return country in _COUNTRY_KEYS
     
     @staticmethod
     def validate_rate_type(rate_type: str) -> bool:
         """금리 타입 유효성 검사"""
-        return rate_type in RATE_TYPES
+        return rate_type in _RATE_TYPE_KEYS
     
     @staticmethod
+    @functools.lru_cache(maxsize=32)  # 리포트 출력 시 행마다 호출되므로 결과를 캐시
     def get_market_type_name(market_type: str) -> str:
         """마켓 타입의 한국어 이름 반환"""
         return MARKET_TYPES.get(market_type, market_type)
     
     @staticmethod
+    @functools.lru_cache(maxsize=32)  # 리포트 출력 시 행마다 호출되므로 결과를 캐시
     def get_country_name(country: str) -> str:
         """국가 코드의 한국어 이름 반환"""
         return COUNTRIES.get(country, country)
     
     @staticmethod
-    def get_benchmark_data(session, start_date=None, end_date=None, symbols=None):
-        """벤치마크 지수 데이터 조회 (기존 BenchmarkIndex 테이블 대체)"""
-        query = session.query(
+    def _fetch(session, stmt, as_dataframe):
+        """쿼리 실행 결과를 Row 목록 또는 DataFrame(as_dataframe=True)으로 반환
+
+        DataFrame은 컬럼 단위로 구성되어 수익률/가중치 계산을 행 반복 없이 벡터 연산으로 처리할 수 있습니다.
+        """
+        result = session.execute(stmt)
+        if not as_dataframe:
+            return result.all()
+
+        import pandas as pd
+        df = pd.DataFrame(result.all(), columns=list(result.keys()))
+        df['date'] = pd.to_datetime(df['date'])
+        return df
+
+    @staticmethod
+    def _benchmark_stmt(start_date=None, end_date=None, symbols=None):
+        """벤치마크 지수 조회 쿼리 구성
+
+        lambda_stmt로 구성해 SQL 컴파일 결과를 캐시하고 호출마다 파라미터만 바인딩합니다.
+        가격/수익률 컬럼은 Numeric(asdecimal=False)라 SQL CAST 없이 float로 반환됩니다.
+        (MySQL의 CAST(... AS FLOAT)는 단정밀도라 유효숫자 약 7자리로 잘리므로 사용하지 않음)
+        """
+        stmt = lambda_stmt(lambda: select(
             MarketPriceDaily.id,
             MarketInstrument.symbol,
             MarketInstrument.name,
@@ -292,68 +415,144 @@ class MarketDataHelper:
             MarketPriceDaily.close_price,
             MarketInstrument.currency,
             MarketPriceDaily.daily_return
-        ).join(MarketInstrument).filter(
+        ).join(MarketInstrument).where(
             MarketInstrument.market_type == 'STOCK_INDEX',
-            MarketInstrument.is_active == 'Yes'
+            MarketInstrument.is_active.is_(True)
+        ))
+
+        if start_date:
+            stmt += lambda s: s.where(MarketPriceDaily.date >= start_date)
+        if end_date:
+            stmt += lambda s: s.where(MarketPriceDaily.date <= end_date)
+        if symbols:
+            stmt += lambda s: s.where(MarketInstrument.symbol.in_(symbols))
+
+        stmt += lambda s: s.order_by(MarketInstrument.symbol, MarketPriceDaily.date)
+        return stmt
+
+    @staticmethod
+    def get_benchmark_data(session, start_date=None, end_date=None, symbols=None, as_dataframe=False):
+        """벤치마크 지수 데이터 조회 (기존 BenchmarkIndex 테이블 대체)"""
+        stmt = MarketDataHelper._benchmark_stmt(start_date, end_date, symbols)
+        return MarketDataHelper._fetch(session, stmt, as_dataframe)
+
+    @staticmethod
+    def iter_benchmark_data(session, start_date=None, end_date=None, symbols=None, chunk_size=10_000):
+        """벤치마크 지수 데이터를 chunk_size 행 단위로 스트리밍 조회
+
+        서버 사이드 커서(yield_per → stream_results)로 읽어 전체 결과를 메모리에 올리지 않으므로
+        수년 × 다수 심볼 범위의 백테스트에 사용합니다. 반복 중에는 같은 세션으로 다른 쿼리를 실행하지 마세요.
+        """
+        stmt = MarketDataHelper._benchmark_stmt(start_date, end_date, symbols)
+        result = session.execute(stmt, execution_options={'yield_per': chunk_size})
+        for partition in result.partitions():
+            yield from partition
+    
+    @staticmethod
+    def get_benchmark_objects(session, start_date=None, end_date=None, symbols=None):
+        """벤치마크 지수 데이터를 ORM 객체(MarketPriceDaily)로 조회
+
+        instrument는 selectinload로 한 번에 미리 로드하고, 그 외 관계는 raiseload로 막아
+        행마다 지연 로딩 SELECT가 발생하지 않도록 합니다. (집계/리포트용은 get_benchmark_data 사용)
+        """
+        query = session.query(MarketPriceDaily).join(MarketPriceDaily.instrument).options(
+            selectinload(MarketPriceDaily.instrument),
+            raiseload('*')
+        ).filter(
+            MarketInstrument.market_type == 'STOCK_INDEX',
+            MarketInstrument.is_active.is_(True)
         )
-        
+
         if start_date:
             query = query.filter(MarketPriceDaily.date >= start_date)
         if end_date:
             query = query.filter(MarketPriceDaily.date <= end_date)
         if symbols:
             query = query.filter(MarketInstrument.symbol.in_(symbols))
-            
+
         return query.order_by(MarketInstrument.symbol, MarketPriceDaily.date).all()
     
     @staticmethod
-    def get_exchange_rate_data(session, start_date=None, end_date=None, pairs=None):
+    def get_exchange_rate_data(session, start_date=None, end_date=None, pairs=None, as_dataframe=False):
         """환율 데이터 조회 (기존 ExchangeRate 테이블 대체)"""
-        query = session.query(
+        stmt = lambda_stmt(lambda: select(
             MarketPriceDaily.id,
             MarketInstrument.symbol.label('currency_pair'),
             MarketPriceDaily.date,
             MarketPriceDaily.close_price.label('close_rate'),
             MarketPriceDaily.daily_return
-        ).join(MarketInstrument).filter(
+        ).join(MarketInstrument).where(
             MarketInstrument.market_type == 'CURRENCY',
-            MarketInstrument.is_active == 'Yes'
-        )
-        
+            MarketInstrument.is_active.is_(True)
+        ))
+
         if start_date:
-            query = query.filter(MarketPriceDaily.date >= start_date)
+            stmt += lambda s: s.where(MarketPriceDaily.date >= start_date)
         if end_date:
-            query = query.filter(MarketPriceDaily.date <= end_date)
+            stmt += lambda s: s.where(MarketPriceDaily.date <= end_date)
         if pairs:
-            query = query.filter(MarketInstrument.symbol.in_(pairs))
-            
-        return query.order_by(MarketInstrument.symbol, MarketPriceDaily.date).all()
+            stmt += lambda s: s.where(MarketInstrument.symbol.in_(pairs))
+
+        stmt += lambda s: s.order_by(MarketInstrument.symbol, MarketPriceDaily.date)
+        return MarketDataHelper._fetch(session, stmt, as_dataframe)
     
     @staticmethod
-    def get_risk_free_rate_data(session, start_date=None, end_date=None, countries=None):
+    def get_risk_free_rate_data(session, start_date=None, end_date=None, countries=None, as_dataframe=False):
         """무위험 이자율 데이터 조회 (기존 RiskFreeRate 테이블 대체)"""
-        query = session.query(
+        stmt = lambda_stmt(lambda: select(
             RiskFreeRateDaily.id,
             MarketInstrument.country,
             RiskFreeRateDaily.rate_type,
             MarketInstrument.name,
             MarketInstrument.symbol,
             RiskFreeRateDaily.date,
-            RiskFreeRateDaily.rate,
+            type_coerce(RiskFreeRateDaily.rate, Float).label('rate'),
             MarketInstrument.currency
-        ).join(MarketInstrument).filter(
+        ).join(MarketInstrument).where(
             MarketInstrument.market_type == 'RATE',
-            MarketInstrument.is_active == 'Yes'
-        )
-        
+            MarketInstrument.is_active.is_(True)
+        ))
+
         if start_date:
-            query = query.filter(RiskFreeRateDaily.date >= start_date)
+            stmt += lambda s: s.where(RiskFreeRateDaily.date >= start_date)
         if end_date:
-            query = query.filter(RiskFreeRateDaily.date <= end_date)
+            stmt += lambda s: s.where(RiskFreeRateDaily.date <= end_date)
         if countries:
-            query = query.filter(MarketInstrument.country.in_(countries))
-            
-        return query.order_by(MarketInstrument.country, RiskFreeRateDaily.date).all()
+            stmt += lambda s: s.where(MarketInstrument.country.in_(countries))
+
+        stmt += lambda s: s.order_by(MarketInstrument.country, RiskFreeRateDaily.date)
+        return MarketDataHelper._fetch(session, stmt, as_dataframe)
+
+    @staticmethod
+    def recompute_daily_returns(session, instrument_ids=None):
+        """market_price_daily.daily_return(%)을 전일 종가 기준으로 일괄 재계산
+
+        (id, instrument_id, close_price)를 한 번에 읽어 pandas groupby + pct_change로 벡터 계산하고,
+        기본키 기준 ORM bulk UPDATE(executemany)로 배치 단위 기록합니다.
+        """
+        import pandas as pd
+
+        stmt = select(MarketPriceDaily.id, MarketPriceDaily.instrument_id, MarketPriceDaily.close_price)
+        if instrument_ids:
+            stmt = stmt.where(MarketPriceDaily.instrument_id.in_(instrument_ids))
+        stmt = stmt.order_by(MarketPriceDaily.instrument_id, MarketPriceDaily.date)
+
+        df = pd.DataFrame(session.execute(stmt).all(), columns=['id', 'instrument_id', 'close_price'])
+        if df.empty:
+            return 0
+
+        returns = df.groupby('instrument_id', sort=False)['close_price'].pct_change(fill_method=None) * 100
+        # 첫 거래일(전일 없음)과 전일 종가 0(inf)은 NULL로 저장
+        returns = returns.replace([float('inf'), float('-inf')], float('nan')).round(6)
+        mappings = [
+            {'id': row_id, 'daily_return': None if pd.isna(value) else value}
+            for row_id, value in zip(df['id'].tolist(), returns.tolist())
+        ]
+
+        for start in range(0, len(mappings), BULK_INSERT_BATCH_SIZE):
+            session.execute(update(MarketPriceDaily), mappings[start:start + BULK_INSERT_BATCH_SIZE])
+        session.commit()
+        return len(mappings)
 
     @staticmethod
     def initialize_instruments(session):
@@ -375,19 +574,277 @@ class MarketDataHelper:
             {'symbol': 'KOR_BASE_RATE', 'name': '한국은행 기준금리', 'market_type': 'RATE', 'country': 'KR', 'currency': 'KRW'},
         ]
         
-        for instrument_data in instruments:
-            existing = session.query(MarketInstrument).filter(
-                MarketInstrument.symbol == instrument_data['symbol']
-            ).first()
-            
-            if not existing:
-                instrument = MarketInstrument(**instrument_data)
-                session.add(instrument)
-        
+        # 존재 여부를 종목별로 조회하지 않고, symbol UNIQUE 키 충돌은 건너뛰는 INSERT 한 번으로 저장
+        session.execute(_insert_ignore(session, MarketInstrument, ['symbol']).values(instruments))
         session.commit()
         return len(instruments)
 
 
+# =============================================================================
+# 대량 적재(bulk insert) 헬퍼
+# =============================================================================
+
+# 한 번의 INSERT에 묶을 행 수 (5천~1만 행 구간이 왕복 횟수와 패킷 크기의 균형점)
+BULK_INSERT_BATCH_SIZE = 5000
+
+
+def _bulk_insert(session, model, mappings, batch_size=BULK_INSERT_BATCH_SIZE, commit=True):
+    """dict 목록을 batch_size 단위의 executemany INSERT로 적재하고 마지막에 한 번만 커밋
+
+    ORM 인스턴스를 한 건씩 add/flush하는 대신 배치당 한 번의 왕복으로 처리합니다.
+    commit=False면 호출 측 트랜잭션에 포함시키고 커밋은 호출 측에서 합니다.
+    """
+    mappings = list(mappings)
+    for start in range(0, len(mappings), batch_size):
+        session.execute(insert(model), mappings[start:start + batch_size])
+    if commit:
+        session.commit()
+    return len(mappings)
+
+
+def bulk_insert_prices(session, mappings, batch_size=BULK_INSERT_BATCH_SIZE):
+    """Price 대량 적재 (mappings: {'asset_id', 'date', 'close'} dict 목록)"""
+    return _bulk_insert(session, Price, mappings, batch_size)
+
+
+def bulk_insert_market_prices(session, mappings, batch_size=BULK_INSERT_BATCH_SIZE):
+    """MarketPriceDaily 대량 적재 (mappings: {'instrument_id', 'date', 'close_price', ...} dict 목록)"""
+    return _bulk_insert(session, MarketPriceDaily, mappings, batch_size)
+
+
+def bulk_insert_risk_free_rates(session, mappings, batch_size=BULK_INSERT_BATCH_SIZE):
+    """RiskFreeRateDaily 대량 적재 (mappings: {'instrument_id', 'date', 'rate', 'rate_type'} dict 목록)"""
+    return _bulk_insert(session, RiskFreeRateDaily, mappings, batch_size)
+
+
+def bulk_insert_transactions(session, mappings, batch_size=BULK_INSERT_BATCH_SIZE, commit=True):
+    """Transaction 대량 적재 (mappings: {'portfolio_id', 'asset_id', 'trans_date', 'quantity', 'price', 'fee', 'tax', 'type'} dict 목록)"""
+    return _bulk_insert(session, Transaction, mappings, batch_size, commit=commit)
+
+
+def bulk_insert_positions(session, mappings, batch_size=BULK_INSERT_BATCH_SIZE):
+    """PortfolioPositionDaily 대량 적재"""
+    return _bulk_insert(session, PortfolioPositionDaily, mappings, batch_size)
+
+
+def bulk_insert_navs(session, mappings, batch_size=BULK_INSERT_BATCH_SIZE):
+    """PortfolioNavDaily 대량 적재"""
+    return _bulk_insert(session, PortfolioNavDaily, mappings, batch_size)
+
+
+def bulk_insert_asset_class_returns(session, mappings, batch_size=BULK_INSERT_BATCH_SIZE):
+    """AssetClassReturnDaily 대량 적재"""
+    return _bulk_insert(session, AssetClassReturnDaily, mappings, batch_size)
+
+
+def _copy_rows(session, model, columns, mappings):
+    """DB 고유의 대량 적재 경로(COPY / LOAD DATA)로 적재, 지원하지 않으면 _bulk_insert로 대체
+
+    - PostgreSQL: COPY ... FROM STDIN (psycopg2 copy_expert)
+    - MySQL: LOAD DATA LOCAL INFILE (PM_MYSQL_LOCAL_INFILE=1로 실행한 프로세스에서만 사용, 서버의 local_infile도 ON이어야 함)
+      꺼져 있으면 bulk insert로 적재
+    """
+    mappings = list(mappings)
+    if not mappings:
+        return 0
+
+    table = model.__tablename__
+    column_list = ", ".join(columns)
+    dialect = session.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        buf = io.StringIO()
+        writer = csv.writer(buf, delimiter='\t', lineterminator='\n')
+        # CSV 형식에서 따옴표 없는 빈 값은 NULL로 해석됨
+        writer.writerows([m.get(c) for c in columns] for m in mappings)
+        buf.seek(0)
+        raw = session.connection().connection.driver_connection
+        with raw.cursor() as cur:
+            cur.copy_expert(
+                f"COPY {table} ({column_list}) FROM STDIN WITH (FORMAT csv, DELIMITER E'\\t')", buf
+            )
+        session.commit()
+        return len(mappings)
+
+    if dialect == 'mysql' and MYSQL_LOCAL_INFILE:
+        path = None
+        try:
+            with tempfile.NamedTemporaryFile('w', newline='', suffix='.tsv', delete=False) as f:
+                writer = csv.writer(f, delimiter='\t', lineterminator='\n')
+                writer.writerows(
+                    [r'\N' if m.get(c) is None else m.get(c) for c in columns] for m in mappings
+                )
+                path = f.name
+            session.execute(
+                text(
+                    f"LOAD DATA LOCAL INFILE :path INTO TABLE {table} "
+                    f"FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' ({column_list})"
+                ),
+                {"path": path.replace('\\', '/')}
+            )
+            session.commit()
+            return len(mappings)
+        except Exception as e:
+            session.rollback()
+            print(f"LOAD DATA LOCAL INFILE 실패, bulk insert로 대체합니다: {e}")
+        finally:
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    return _bulk_insert(session, model, mappings)
+
+
+def _insert_ignore(session, model, index_elements):
+    """UNIQUE 키(index_elements)가 충돌하는 행은 건너뛰는 INSERT 문 생성
+
+    PostgreSQL은 ON CONFLICT DO NOTHING, MySQL은 INSERT IGNORE, SQLite는 INSERT OR IGNORE를 사용합니다.
+    """
+    if session.get_bind().dialect.name == 'postgresql':
+        return pg_insert(model).on_conflict_do_nothing(index_elements=index_elements)
+    return (
+        insert(model)
+        .prefix_with('IGNORE', dialect='mysql')
+        .prefix_with('OR IGNORE', dialect='sqlite')
+    )
+
+
+def _upsert_stmt(session, model, index_elements, update_columns, columns=None, select_stmt=None):
+    """DB 종류에 맞는 UPSERT 문 생성 (select_stmt가 주어지면 INSERT ... SELECT)"""
+    # ORM 엔티티 대신 Table로 Core INSERT를 만들어 identity map/속성 추적 없이 드라이버로 전달
+    table = model.__table__
+    if session.get_bind().dialect.name == 'postgresql':
+        stmt = pg_insert(table)
+        if select_stmt is not None:
+            stmt = stmt.from_select(columns, select_stmt)
+        return stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={col: stmt.excluded[col] for col in update_columns}
+        )
+
+    stmt = mysql_insert(table)
+    if select_stmt is not None:
+        stmt = stmt.from_select(columns, select_stmt)
+    return stmt.on_duplicate_key_update({col: stmt.inserted[col] for col in update_columns})
+
+
+def _upsert(session, model, index_elements, update_columns, mappings, batch_size=BULK_INSERT_BATCH_SIZE, commit=True):
+    """UNIQUE 키(index_elements) 충돌 시 update_columns만 갱신하는 배치 UPSERT
+
+    행마다 SELECT 후 INSERT/UPDATE(session.merge)하지 않고 배치당 한 번의 executemany로 처리합니다.
+    PostgreSQL은 ON CONFLICT DO UPDATE, MySQL은 ON DUPLICATE KEY UPDATE를 사용합니다.
+    commit=False면 호출 측 트랜잭션에 포함시키고 커밋은 호출 측에서 합니다.
+    """
+    mappings = list(mappings)
+    if not mappings:
+        return 0
+
+    stmt = _upsert_stmt(session, model, index_elements, update_columns)
+    for start in range(0, len(mappings), batch_size):
+        session.execute(stmt, mappings[start:start + batch_size])
+    if commit:
+        session.commit()
+    return len(mappings)
+
+
+def upsert_from_select(session, model, index_elements, update_columns, columns, select_stmt):
+    """select_stmt 결과를 INSERT ... SELECT로 UPSERT (행을 Python으로 가져오지 않고 DB 안에서 계산/적재)
+
+    커밋은 호출 측에서 합니다.
+    """
+    stmt = _upsert_stmt(session, model, index_elements, update_columns, columns, select_stmt)
+    return session.execute(stmt).rowcount
+
+
+def upsert_prices(session, mappings, batch_size=BULK_INSERT_BATCH_SIZE):
+    """Price UPSERT ((asset_id, date) 중복 시 종가 갱신)"""
+    return _upsert(session, Price, ['asset_id', 'date'], ['close'], mappings, batch_size)
+
+
+def upsert_positions(session, mappings, batch_size=BULK_INSERT_BATCH_SIZE, commit=True):
+    """PortfolioPositionDaily UPSERT ((portfolio_id, as_of_date, asset_id) 중복 시 수량/단가/평가액 갱신)"""
+    return _upsert(
+        session, PortfolioPositionDaily,
+        ['portfolio_id', 'as_of_date', 'asset_id'],
+        ['quantity', 'avg_price', 'market_value'],
+        mappings, batch_size, commit=commit
+    )
+
+
+def upsert_asset_class_returns(session, mappings, batch_size=BULK_INSERT_BATCH_SIZE):
+    """AssetClassReturnDaily UPSERT ((portfolio_id, date, asset_class) 중복 시 수익률 갱신)"""
+    return _upsert(
+        session, AssetClassReturnDaily,
+        ['portfolio_id', 'date', 'asset_class'],
+        ['daily_return'],
+        mappings, batch_size
+    )
+
+
+def merge_price_staging(session):
+    """prices_staging의 행을 prices로 옮기고(중복 (asset_id, date)는 건너뜀) 스테이징을 비움"""
+    columns = ['asset_id', 'date', 'close']
+    source = select(PriceStaging.asset_id, PriceStaging.date, PriceStaging.close)
+
+    stmt = _insert_ignore(session, Price, ['asset_id', 'date']).from_select(columns, source)
+    result = session.execute(stmt)
+    session.execute(delete(PriceStaging))
+    session.commit()
+    return result.rowcount
+
+
+# 포지션 스냅샷 컬럼 순서
+POSITION_SNAPSHOT_COLUMNS = ['asset_id', 'quantity', 'avg_price', 'market_value']
+
+
+def write_position_snapshot(session, portfolio_id, as_of_date, df):
+    """하루치 포지션 DataFrame을 Arrow IPC(zstd) 스트림으로 직렬화해 저장 (pyarrow 필요)"""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df[POSITION_SNAPSHOT_COLUMNS], preserve_index=False)
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression='zstd')
+    with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    payload = sink.getvalue().to_pybytes()
+
+    snapshot = session.query(PortfolioPositionSnapshot).filter(
+        PortfolioPositionSnapshot.portfolio_id == portfolio_id,
+        PortfolioPositionSnapshot.as_of_date == as_of_date
+    ).first()
+    if snapshot:
+        snapshot.payload = payload
+    else:
+        session.add(PortfolioPositionSnapshot(
+            portfolio_id=portfolio_id, as_of_date=as_of_date, payload=payload
+        ))
+    session.commit()
+
+
+def read_position_snapshot(session, portfolio_id, as_of_date):
+    """저장된 포지션 스냅샷을 DataFrame으로 복원 (없으면 None)"""
+    import pyarrow as pa
+
+    payload = session.query(PortfolioPositionSnapshot.payload).filter(
+        PortfolioPositionSnapshot.portfolio_id == portfolio_id,
+        PortfolioPositionSnapshot.as_of_date == as_of_date
+    ).scalar()
+    if payload is None:
+        return None
+    return pa.ipc.open_stream(pa.py_buffer(payload)).read_all().to_pandas()
+
+
+def copy_prices(session, mappings):
+    """Price 대량 적재 (COPY / LOAD DATA 경로 우선)"""
+    return _copy_rows(session, Price, ('asset_id', 'date', 'close'), mappings)
+
+
+def copy_market_prices(session, mappings):
+    """MarketPriceDaily 대량 적재 (COPY / LOAD DATA 경로 우선)"""
+    columns = ('instrument_id', 'date', 'open_price', 'high_price', 'low_price',
+               'close_price', 'volume', 'daily_return')
+    return _copy_rows(session, MarketPriceDaily, columns, mappings)
+
+
 """데이터베이스 연결 설정
 민감정보는 환경변수(.env)로 분리합니다.
 다음 두 가지 방식 중 하나를 사용하세요.
@@ -413,10 +870,81 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 # SQLAlchemy 로그 출력 제어 (기본 False)
 SQLALCHEMY_ECHO = os.getenv("SQLALCHEMY_ECHO", "false").lower() == "true"
 
-engine = create_engine(DATABASE_URL, echo=SQLALCHEMY_ECHO)
+# MySQL 클라이언트 local_infile 허용 여부 (기본 꺼짐)
+# 켜면 서버가 클라이언트의 로컬 파일을 요청할 수 있으므로 API 서버에서는 켜지 않고,
+# LOAD DATA LOCAL INFILE(_copy_rows)로 적재하는 배치 스크립트 실행 시에만 PM_MYSQL_LOCAL_INFILE=1로 켬
+MYSQL_LOCAL_INFILE = os.getenv("PM_MYSQL_LOCAL_INFILE") == "1"
+
+
+def _dialect_engine_options(url):
+    """DB 종류별 create_engine 추가 옵션
+
+    - MySQL: PM_MYSQL_LOCAL_INFILE=1일 때만 LOAD DATA LOCAL INFILE(_copy_rows)용 클라이언트 local_infile 허용
+    - MSSQL(pyodbc): executemany를 배열 바인딩으로 한 번에 전송(fast_executemany)
+    - PostgreSQL(psycopg 3): 첫 실행부터 서버 측 prepared statement 사용(prepare_threshold=1)
+      (스냅샷 백필처럼 같은 SQL을 날짜만 바꿔 반복 실행할 때 파싱/플래닝 생략)
+    """
+    if not url:
+        return {}
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == 'mysql':
+        return {'connect_args': {'local_infile': True}} if MYSQL_LOCAL_INFILE else {}
+    if backend == 'mssql':
+        return {'fast_executemany': True}
+    if backend == 'postgresql' and parsed.get_driver_name() == 'psycopg':
+        return {'connect_args': {'prepare_threshold': 1}}
+    return {}
+
+
+# create_engine은 실제 연결을 만들지 않으므로 모듈 로드 시 생성해도 비용이 없음
+# 풀에서 커넥션을 재사용해 요청마다 TCP 연결/인증 왕복이 생기지 않도록 하고,
+# 끊어진 커넥션은 사용 전 ping으로 걸러냄
+engine = create_engine(
+    DATABASE_URL,
+    echo=SQLALCHEMY_ECHO,
+    pool_pre_ping=True,
+    pool_size=10,
+    max_overflow=20,
+    # MySQL wait_timeout 등으로 서버가 끊기 전에 1시간마다 커넥션을 새로 맺음
+    pool_recycle=3600,
+    # 컴파일된 SQL 캐시 크기 (기본 500은 조회 헬퍼/서비스 쿼리 조합이 늘면 교체가 잦음)
+    query_cache_size=1200,
+    **_dialect_engine_options(DATABASE_URL),
+)
 
 # 세션 클래스 생성
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# expire_on_commit=False: 커밋 후에도 로드된 객체를 만료시키지 않아 속성 접근 시 재조회(SELECT)가 없음
+# (쓰기 후 서버 기본값 등 DB에서 바뀐 값이 필요하면 session.refresh()로 다시 읽어야 함)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+@contextlib.contextmanager
+def session_scope(session=None):
+    """작업 단위 세션 컨텍스트
+
+    session이 주어지면 그대로 사용하고 커밋/롤백은 호출 측에 맡깁니다
+    (스크립트에서 여러 작업을 한 세션·커넥션으로 묶을 때).
+    없으면 새 세션을 열어 정상 종료 시 커밋, 예외 시 롤백 후 닫습니다.
+    """
+    if session is not None:
+        yield session
+        return
+    with SessionLocal.begin() as new_session:
+        yield new_session
+
+
+@functools.lru_cache(maxsize=1)
+def init_db():
+    """테이블 생성 (없을 경우)
+
+    create_all은 테이블마다 존재 여부를 조회하므로 import 시점이 아니라
+    엔트리포인트(API 시작, 적재 스크립트)에서 명시적으로 한 번만 호출합니다.
+    """
+    Base.metadata.create_all(bind=engine)
+    return engine
+
 
-# 테이블 생성 (없을 경우)
-Base.metadata.create_all(bind=engine)
+# 기존처럼 import 시 테이블 생성이 필요한 환경은 PM_INIT_DB=1로 활성화
+if os.getenv("PM_INIT_DB") == "1":
+    init_db()
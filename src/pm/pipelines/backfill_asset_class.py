@@ -6,18 +6,33 @@ Backfill asset_class field in assets table using:
 순서는 두 파일이 1:1로 대응한다고 가정.
 """
 
+import logging
 import pandas as pd
 from pathlib import Path
-from sqlalchemy import select
+from sqlalchemy import select, update, bindparam
+from pm.data.utils.excel import read_excel
 from pm.db.models import SessionLocal, Asset, ASSET_CLASS_ENUM
 
+# 티커별 상세 로그는 DEBUG 레벨 (요약은 print)
+logger = logging.getLogger(__name__)
+
 # === 경로 설정 ===
 TICKER_CSV_PATH = Path("data/tickers.csv")
 GROUPS_XLSX_PATH = Path("data/groups.xlsx")    # 엑셀 확장자(.xlsx) 가정
 
-def load_mapping() -> list[tuple[str, str]]:
+# === 쿼리 (모듈 로드 시 한 번만 구성, 실행 시 파라미터만 바인딩) ===
+CURRENT_CLASSES_STMT = select(Asset.ticker, Asset.asset_class).where(
+    Asset.ticker.in_(bindparam('tickers', expanding=True))
+)
+UPDATE_ASSET_CLASS_STMT = (
+    update(Asset)
+    .where(Asset.ticker.in_(bindparam('tickers', expanding=True)))
+    .values(asset_class=bindparam('group'))
+)
+
+def load_mapping() -> pd.DataFrame:
     """
-    tickers.csv와 groups.xlsx를 읽어 (ticker, group) 리스트 반환.
+    tickers.csv와 groups.xlsx를 읽어 ticker, group 두 컬럼의 DataFrame 반환.
     groups.xlsx 이 없거나 행 수가 다르면 예외 발생.
     """
     if not TICKER_CSV_PATH.exists():
@@ -25,8 +40,9 @@ def load_mapping() -> list[tuple[str, str]]:
     if not GROUPS_XLSX_PATH.exists():
         raise FileNotFoundError(f"groups.xlsx not found: {GROUPS_XLSX_PATH}")
 
-    tickers_df = pd.read_csv(TICKER_CSV_PATH)
-    groups_df = pd.read_excel(GROUPS_XLSX_PATH)
+    # 모두 문자열로 읽음 (타입 추론 생략)
+    tickers_df = pd.read_csv(TICKER_CSV_PATH, dtype=str)
+    groups_df = read_excel(GROUPS_XLSX_PATH, dtype=str)
 
     # 컬럼명 유연 처리: 'ticker' / 'group' 없으면 첫 컬럼 사용
     if 'ticker' not in tickers_df.columns:
@@ -39,12 +55,11 @@ def load_mapping() -> list[tuple[str, str]]:
             f"Row count mismatch: tickers({len(tickers_df)}) vs groups({len(groups_df)})"
         )
 
-    mapping: list[tuple[str, str]] = []
-    for i in range(len(tickers_df)):
-        t = str(tickers_df.iloc[i]['ticker']).strip()
-        g = str(groups_df.iloc[i]['group']).strip()
-        mapping.append((t, g))
-    return mapping
+    # 행 단위 iloc 접근 대신 컬럼 전체를 한 번에 문자열 변환/공백 제거
+    return pd.DataFrame({
+        'ticker': tickers_df['ticker'].astype(str).str.strip().to_numpy(),
+        'group': groups_df['group'].astype(str).str.strip().to_numpy(),
+    })
 
 def validate_group(group: str) -> None:
     if group not in ASSET_CLASS_ENUM:
@@ -54,41 +69,31 @@ def backfill():
     mapping = load_mapping()
     session = SessionLocal()
 
-    updated = 0
-    missing = []
-    skipped = []
-    invalid = []
-
     try:
-        for ticker, group in mapping:
-            # ENUM 검증
-            try:
-                validate_group(group)
-            except ValueError as e:
-                print(f"[INVALID ENUM] {ticker}: {e}")
-                invalid.append(ticker)
-                continue
-
-            # 자산 조회
-            stmt = select(Asset).where(Asset.ticker == ticker)
-            asset = session.execute(stmt).scalar_one_or_none()
-
-            if asset is None:
-                print(f"[MISSING] {ticker}: assets 테이블에 없음")
-                missing.append(ticker)
-                continue
-
-            # 동일 값이면 스킵
-            if asset.asset_class == group:
-                print(f"[SKIP SAME] {ticker}: already '{group}'")
-                skipped.append(ticker)
-                continue
-
-            # 업데이트
-            asset.asset_class = group
-            session.add(asset)
-            updated += 1
-            print(f"[UPDATE] {ticker}: set asset_class -> {group}")
+        # 대상 자산의 현재 자산군을 한 번에 조회 (티커별 SELECT 없음)
+        current_classes = dict(session.execute(
+            CURRENT_CLASSES_STMT, {'tickers': mapping['ticker'].tolist()}
+        ).all())
+
+        # 행 반복 없이 컬럼 단위로 분류: ENUM 검증 → 자산 존재 여부 → 동일 값 여부
+        invalid_mask = ~mapping['group'].isin(ASSET_CLASS_ENUM)
+        missing_mask = ~invalid_mask & ~mapping['ticker'].isin(current_classes.keys())
+        skip_mask = ~invalid_mask & ~missing_mask & (mapping['ticker'].map(current_classes) == mapping['group'])
+        update_mask = ~(invalid_mask | missing_mask | skip_mask)
+
+        invalid = mapping.loc[invalid_mask, 'ticker'].tolist()
+        missing = mapping.loc[missing_mask, 'ticker'].tolist()
+        skipped = mapping.loc[skip_mask, 'ticker'].tolist()
+        to_update = mapping[update_mask]
+        logger.debug("[INVALID ENUM] %s", invalid)
+        logger.debug("[MISSING] assets 테이블에 없음: %s", missing)
+        logger.debug("[SKIP SAME] %s", skipped)
+
+        # 자산군마다 UPDATE 한 번 (최대 len(ASSET_CLASS_ENUM)개 문장)
+        for group, group_tickers in to_update.groupby('group')['ticker']:
+            session.execute(UPDATE_ASSET_CLASS_STMT, {'tickers': group_tickers.tolist(), 'group': group})
+            logger.debug("[UPDATE] asset_class -> %s: %s", group, group_tickers.tolist())
+        updated = len(to_update)
 
         session.commit()
         print("\n=== Backfill Summary ===")
@@ -1,10 +1,80 @@
+import logging
 import yfinance as yf
-from datetime import datetime, timedelta
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import numpy as np
 import pandas as pd
-from pm.db.models import Asset, Price, engine, SessionLocal, Base
+from sqlalchemy import Date, func, text
+from pm.db.models import Asset, Price, SessionLocal, upsert_prices
 
-# 테이블 생성: 없으면 생성
-Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
+
+# 티커 진행 상황 출력 간격 (티커별 상세 로그는 DEBUG 레벨)
+PROGRESS_EVERY = 50
+
+# yf.download는 모듈 전역 상태를 공유하므로 다운로드 호출은 한 번에 하나씩만 실행
+# (묶음 내부 티커들은 yfinance threads=True로 병렬 요청)
+DOWNLOAD_WORKERS = 1
+
+def _extract_closes(data, ticker):
+    """다운로드 결과에서 해당 티커의 종가 배열 추출 (없으면 None)
+
+    group_by='ticker' 다중 컬럼((ticker, 필드))과 단일 컬럼 결과를 모두 처리합니다.
+    """
+    if data.empty:
+        return None
+    if isinstance(data.columns, pd.MultiIndex):
+        if ticker not in data.columns.get_level_values(0):
+            return None
+        return data[ticker]['Close'].to_numpy(dtype=float)
+    return data['Close'].to_numpy(dtype=float)
+
+def _download_bucket(bucket, start_date, end_date):
+    """같은 시작일의 티커 묶음을 다중 티커 요청 한 번으로 다운로드"""
+    bucket_tickers = [ticker for ticker, _ in bucket]
+    print(f"[DOWNLOAD] {len(bucket_tickers)}개 티커: yfinance에서 데이터 다운로드 중... ({start_date} ~ {end_date})")
+    return yf.download(
+        bucket_tickers,
+        start=start_date.isoformat(),
+        end=end_date.isoformat(),
+        group_by='ticker',
+        threads=True,
+        progress=False
+    )
+
+def _save_bucket(session, data, bucket, start_date, end_date):
+    """다운로드한 묶음에서 티커별 종가를 추출해 UPSERT, 저장한 행 수 반환"""
+    total_saved = 0
+    for ticker, asset_id in bucket:
+        closes = _extract_closes(data, ticker)
+        if closes is None:
+            logger.debug("[NO_DATA] %s: 새로운 데이터 없음 (%s~%s)", ticker, start_date, end_date)
+            continue
+        # 결측치 스킵 (행 반복 없이 마스크로 한 번에 걸러냄, 다른 티커만 거래된 날짜도 함께 제외)
+        mask = ~np.isnan(closes)
+        if not mask.any():
+            logger.debug("[NO_DATA] %s: 새로운 데이터 없음 (%s~%s)", ticker, start_date, end_date)
+            continue
+
+        # 가격 정보 저장 (행별 merge 대신 배치 UPSERT)
+        rows = [
+            {'asset_id': asset_id, 'date': date, 'close': close_price}
+            for date, close_price in zip(data.index.date[mask], closes[mask].tolist())
+        ]
+        saved_count = upsert_prices(session, rows)
+        total_saved += saved_count
+        logger.debug("[COMPLETE] %s (Asset ID: %s): %d개 데이터 저장 완료 (%s~%s)",
+                     ticker, asset_id, saved_count, start_date, end_date)
+    return total_saved
+
+def _next_day_after_max_date(session):
+    """MAX(prices.date) + 1일 SQL 식 (DB에서 업데이트 시작일까지 계산)"""
+    last_date = func.max(Price.date)
+    if session.get_bind().dialect.name == 'postgresql':
+        # PostgreSQL: date + integer = date
+        return last_date + 1
+    return func.date_add(last_date, text("INTERVAL 1 DAY"), type_=Date)
 
 def fetch_initial_and_update(tickers, default_start="2020-01-01", force_start_date=None):
     """
@@ -15,94 +85,81 @@ def fetch_initial_and_update(tickers, default_start="2020-01-01", force_start_da
     """
     session = SessionLocal()
     try:
-        # 성능 최적화: force_start_date가 지정되지 않은 경우에만 배치로 마지막 날짜 조회
-        asset_last_dates = {}
-        if not force_start_date:
-            # 모든 관련 자산의 마지막 가격 날짜를 한 번에 조회
-            from sqlalchemy import func
-            last_dates_query = (
-                session.query(
-                    Asset.ticker,
-                    func.max(Price.date).label('last_date')
-                )
-                .join(Price, Asset.id == Price.asset_id)
-                .filter(Asset.ticker.in_(tickers))
-                .group_by(Asset.ticker)
+        total_tickers = len(tickers)
+        # 시작/종료일은 date 객체로 다룸 (티커마다 문자열 변환/비교하지 않음)
+        end_date = date.today()
+        default_start_date = date.fromisoformat(str(default_start))
+        forced_start_date = date.fromisoformat(str(force_start_date)) if force_start_date else None
+
+        # 자산을 한 번에 조회 (루프 안에서 티커별 조회하지 않음)
+        assets = {
+            asset.ticker: asset
+            for asset in session.query(Asset).filter(Asset.ticker.in_(tickers)).all()
+        }
+
+        # 성능 최적화: force_start_date가 지정되지 않은 경우에만 배치로 업데이트 시작일(마지막 저장일 + 1일) 조회
+        next_start_dates = {}
+        if not force_start_date and assets:
+            # 모든 관련 자산의 업데이트 시작일을 DB에서 한 번에 계산
+            # (prices만 asset_id로 GROUP BY해 UNIQUE (asset_id, date) 인덱스만으로 처리, assets 조인 없음)
+            tickers_by_id = {asset.id: ticker for ticker, asset in assets.items()}
+            next_dates_query = (
+                session.query(Price.asset_id, _next_day_after_max_date(session).label('next_date'))
+                .filter(Price.asset_id.in_(tickers_by_id))
+                .group_by(Price.asset_id)
             ).all()
-            
-            asset_last_dates = {ticker: last_date for ticker, last_date in last_dates_query}
-            print(f"[BATCH] {len(asset_last_dates)}개 자산의 마지막 날짜 조회 완료")
 
-        total_tickers = len(tickers)
+            next_start_dates = {tickers_by_id[asset_id]: next_date for asset_id, next_date in next_dates_query}
+            print(f"[BATCH] {len(next_start_dates)}개 자산의 업데이트 시작일 조회 완료")
+
+        # 없는 티커는 한꺼번에 생성
+        new_tickers = {ticker for ticker in tickers if ticker not in assets}
+        if new_tickers:
+            new_assets = [Asset(ticker=ticker, name=ticker) for ticker in new_tickers]
+            session.add_all(new_assets)
+            session.commit()
+            assets.update((asset.ticker, asset) for asset in new_assets)
+
+        # 1단계: 티커별 시작일 결정 후 같은 시작일끼리 묶기 (다운로드를 묶음 단위로 한 번에 요청)
+        buckets = defaultdict(list)  # start_date -> [(ticker, asset_id), ...]
         for idx, ticker in enumerate(tickers, 1):
-            # 진행상황 표시
-            print(f"\n=== [{idx}/{total_tickers}] {ticker} 처리 중 (진행률: {idx/total_tickers*100:.1f}%) ===")
+            # 진행상황 표시 (PROGRESS_EVERY개마다 한 번)
+            if idx % PROGRESS_EVERY == 0 or idx == total_tickers:
+                print(f"[PROGRESS] {idx}/{total_tickers} 티커 확인 (진행률: {idx/total_tickers*100:.1f}%)")
             
-            # Asset 조회 또는 생성
-            asset = session.query(Asset).filter_by(ticker=ticker).first()
-            if not asset:
-                asset = Asset(ticker=ticker, name=ticker)
-                session.add(asset)
-                session.commit()
-                start_date = force_start_date or default_start
-                print(f"[INIT] {ticker} (Asset ID: {asset.id}): 시작일 {start_date}로 초기 로드")
+            asset = assets[ticker]
+            if ticker in new_tickers:
+                start_date = forced_start_date or default_start_date
+                logger.debug("[INIT] %s (Asset ID: %s): 시작일 %s로 초기 로드", ticker, asset.id, start_date)
             else:
-                print(f"[INFO] {ticker} (Asset ID: {asset.id}): 기존 자산 확인")
+                logger.debug("[INFO] %s (Asset ID: %s): 기존 자산 확인", ticker, asset.id)
                 if force_start_date:
-                    start_date = force_start_date
-                    print(f"[FORCE] {ticker}: 강제 시작일 {start_date} 사용")
-                elif ticker in asset_last_dates:
-                    last_date = asset_last_dates[ticker]
-                    next_day = last_date + timedelta(days=1)
-                    start_date = next_day.strftime("%Y-%m-%d")
-                    print(f"[UPDATE] {ticker}: 마지막 저장일 {last_date} 이후로 업데이트")
+                    start_date = forced_start_date
+                    logger.debug("[FORCE] %s: 강제 시작일 %s 사용", ticker, start_date)
+                elif ticker in next_start_dates:
+                    start_date = next_start_dates[ticker]
+                    logger.debug("[UPDATE] %s: %s부터 업데이트 (마지막 저장일 다음 날)", ticker, start_date)
                 else:
-                    start_date = default_start
-                    print(f"[INIT] {ticker}: 데이터는 있으나 가격 기록이 없어 {start_date}부터 초기 로드")
+                    start_date = default_start_date
+                    logger.debug("[INIT] %s: 데이터는 있으나 가격 기록이 없어 %s부터 초기 로드", ticker, start_date)
                     
-            end_date = datetime.today().strftime("%Y-%m-%d")
             if start_date > end_date:
-                print(f"[SKIP] {ticker}: 이미 최신 (마지막 날짜 {start_date})")
-                continue
-
-            # 데이터 다운로드
-            print(f"[DOWNLOAD] {ticker}: yfinance에서 데이터 다운로드 중... ({start_date} ~ {end_date})")
-            data = yf.download(
-                ticker,
-                start=start_date,
-                end=end_date,
-                progress=False
-            )
-            if data.empty:
-                print(f"[NO_DATA] {ticker}: 새로운 데이터 없음 ({start_date}~{end_date})")
+                logger.debug("[SKIP] %s: 이미 최신 (마지막 날짜 %s)", ticker, start_date)
                 continue
+            buckets[start_date].append((ticker, asset.id))
 
-            # 가격 정보 저장
-            print(f"[SAVING] {ticker}: 데이터베이스에 저장 중... ({len(data)}개 데이터)")
-            saved_count = 0
-            # 가격 정보 저장
-            print(f"[SAVING] {ticker}: 데이터베이스에 저장 중... ({len(data)}개 데이터)")
-            saved_count = 0
-            for date, row in data.iterrows():
-                close_data = row['Close']
-                # 다중 티커 다운로드 시 Series 반환 처리
-                if isinstance(close_data, pd.Series):
-                    close_price = close_data.get(ticker)
-                else:
-                    close_price = close_data
-                # 결측치 스킵
-                if pd.isna(close_price):
-                    continue
-                price = Price(
-                    asset_id=asset.id,
-                    date=date.date(),
-                    close=float(close_price)
-                )
-                session.merge(price)
-                saved_count += 1
-            session.commit()
-            print(f"[COMPLETE] {ticker} (Asset ID: {asset.id}): {saved_count}개 데이터 저장 완료 ({start_date}~{end_date})")
-            print(f"[PROGRESS] 전체 진행률: {idx}/{total_tickers} 완료 ({idx/total_tickers*100:.1f}%)")
+        total_saved = 0
+        # 2단계: 시작일 묶음마다 다중 티커 다운로드 한 번 (yfinance 내부 스레드로 병렬 요청)
+        # 다운로드는 백그라운드 스레드에서 순서대로 진행하고, 메인 스레드는 완료된 묶음을 DB에 저장해
+        # 네트워크 대기와 DB 쓰기가 겹치도록 함 (세션은 메인 스레드에서만 사용)
+        with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+            downloads = [
+                (start_date, bucket, executor.submit(_download_bucket, bucket, start_date, end_date))
+                for start_date, bucket in buckets.items()
+            ]
+            for start_date, bucket, future in downloads:
+                total_saved += _save_bucket(session, future.result(), bucket, start_date, end_date)
+        print(f"[SAVED] 총 {total_saved}개 가격 데이터 저장")
     finally:
         session.close()
         print(f"\n=== 전체 작업 완료 ===")
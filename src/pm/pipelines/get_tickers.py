@@ -5,6 +5,8 @@ import argparse
 from pathlib import Path
 from typing import Union, Optional
 import pandas as pd
+from pm.data.utils.csv_io import write_csv
+from pm.data.utils.excel import read_excel
 
 def convert_excel_to_csv(
     excel_path: Union[str, Path],
@@ -15,7 +17,7 @@ def convert_excel_to_csv(
     엑셀 파일에 들어 있는 AXXXXXX 형태의 한국 주식 티커를
     XXXXXX.KS 형태로 변환해 CSV로 저장합니다.
     """
-    df = pd.read_excel(excel_path, dtype=str)
+    df = read_excel(excel_path, dtype=str)
 
     # 티커 열 결정
     col = ticker_col if (ticker_col and ticker_col in df.columns) else df.columns[0]
@@ -25,12 +27,10 @@ def convert_excel_to_csv(
         df[col]
         .str.strip()
         .str.upper()
-        .str.replace(r"^A", "", regex=True)
-        .str.cat([".KS"] * len(df), na_rep="")
-    )
+        .str.removeprefix("A")
+    ) + ".KS"
 
-    tickers.to_frame(name="Ticker") \
-           .to_csv(csv_path, index=False, encoding="utf-8-sig")
+    write_csv(tickers.to_frame(name="Ticker"), csv_path)
     print(f"✔ {csv_path} 저장 완료 ({len(tickers)}개)")
 
 if __name__ == "__main__":
@@ -3,6 +3,8 @@
 
 import argparse
 import pandas as pd
+from pm.data.utils.csv_io import write_csv
+from pm.data.utils.excel import read_excel
 
 def extract_base_ticker(
     excel_path: str,
@@ -23,7 +25,7 @@ def extract_base_ticker(
         티커 열 이름. None이면 첫 번째 열을 사용.
     """
     # 1) 엑셀 읽기 (모든 값을 문자열로)
-    df = pd.read_excel(excel_path, dtype=str)
+    df = read_excel(excel_path, dtype=str)
 
     # 2) 티커가 담긴 열 찾기
     if ticker_col and ticker_col in df.columns:
@@ -39,7 +41,7 @@ def extract_base_ticker(
     )
 
     # 4) CSV 저장
-    base.to_frame(name="Ticker").to_csv(output_csv, index=False, encoding="utf-8-sig")
+    write_csv(base.to_frame(name="Ticker"), output_csv)
     print(f"✔ {output_csv} 저장 완료 ({len(base)}개)")
 
 if __name__ == "__main__":
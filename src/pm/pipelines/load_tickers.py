@@ -6,10 +6,11 @@ def load_tickers(csv_path: str) -> list[str]:
     """
     CSV 파일에서 'ticker' 컬럼을 읽어 리스트로 반환합니다.
     """
-    df = pd.read_csv(csv_path)
+    # 'ticker' 컬럼만 문자열로 읽음 (다른 컬럼 파싱/타입 추론 생략)
+    df = pd.read_csv(csv_path, usecols=lambda col: col == 'ticker', dtype=str)
     if 'ticker' not in df.columns:
         raise ValueError("CSV에 'ticker' 컬럼이 없습니다.")
-    return df['ticker'].dropna().astype(str).tolist()
+    return df['ticker'].dropna().tolist()
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
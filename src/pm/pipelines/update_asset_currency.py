@@ -1,52 +1,55 @@
-from pm.db.models import SessionLocal, Asset, Portfolio
+from sqlalchemy import update, case, func
+from pm.db.models import SessionLocal, Asset, Portfolio, session_scope
 
 """
 Script to update the `currency` field on each Asset based on its ticker pattern:
 - If ticker ends with '.KS' (numeric.KS), assign 'KRW'
 - Otherwise, assign 'USD'
+
+Both functions accept an optional session so several updates can share one
+session/connection; without one they open their own and commit on success.
 """
 
-def update_asset_currency():
-    session = SessionLocal()
+def update_asset_currency(session=None):
     try:
-        assets = session.query(Asset).all()
-        for asset in assets:
-            ticker = asset.ticker.upper()
-            # KRW assets: numeric.KS pattern
-            if ticker.endswith('.KS'):
-                asset.currency = 'KRW'
-            else:
-                asset.currency = 'USD'
-            session.add(asset)
-        session.commit()
-        print(f"✅ Updated currency for {len(assets)} assets.")
+        with session_scope(session) as s:
+            # KRW assets: numeric.KS pattern (classified in SQL with a single UPDATE)
+            result = s.execute(
+                update(Asset).values(
+                    currency=case((func.upper(Asset.ticker).like('%.KS'), 'KRW'), else_='USD')
+                )
+            )
     except Exception as e:
-        session.rollback()
+        if session is not None:
+            raise
         print(f"❌ Failed to update asset currency: {e}")
-    finally:
-        session.close()
+        return 0
+    print(f"✅ Updated currency for {result.rowcount} assets.")
+    return result.rowcount
 
 
 
-def update_portfolio_currency():
-    session = SessionLocal()
+def update_portfolio_currency(session=None):
     try:
-        portfolios = session.query(Portfolio).all()
-        for pf in portfolios:
-            name_upper = pf.name.strip().upper()
-            if name_upper.startswith('USD'):
-                pf.currency = 'USD'
-            else:
-                pf.currency = 'KRW'
-            session.add(pf)
-        session.commit()
-        print(f"✅ Updated currency for {len(portfolios)} portfolios.")
+        with session_scope(session) as s:
+            result = s.execute(
+                update(Portfolio).values(
+                    currency=case((func.upper(func.trim(Portfolio.name)).like('USD%'), 'USD'), else_='KRW')
+                )
+            )
     except Exception as e:
-        session.rollback()
+        if session is not None:
+            raise
         print(f"❌ Failed to update portfolio currency: {e}")
-    finally:
-        session.close()
+        return 0
+    print(f"✅ Updated currency for {result.rowcount} portfolios.")
+    return result.rowcount
 
 if __name__ == '__main__':
-    update_portfolio_currency()
-    update_asset_currency()
+    # 두 업데이트를 한 세션(커넥션)·한 트랜잭션으로 처리
+    try:
+        with SessionLocal.begin() as session:
+            update_portfolio_currency(session)
+            update_asset_currency(session)
+    except Exception as e:
+        print(f"❌ Failed to update currency: {e}")
@@ -1,24 +1,28 @@
 # src/db/init_portfolios.py
 
 from datetime import date
-from pm.db.models import SessionLocal, Portfolio
+from pm.db.models import Portfolio, init_db, session_scope
 
-def init_portfolios():
-    session = SessionLocal()
+def init_portfolios(session=None):
+    """기본 포트폴리오 추가 (session을 주면 호출 측 트랜잭션에 포함, 없으면 새 세션에서 커밋)"""
     try:
-        # 이미 같은 이름의 포트폴리오가 있으면 스킵할 수도 있고, 
-        # 이 예시는 무조건 추가하는 방식입니다.
-        p1 = Portfolio(name='USDCore',      created_at=date.today())
-        p2 = Portfolio(name='USDSatellite', created_at=date.today())
+        with session_scope(session) as s:
+            # 이미 같은 이름의 포트폴리오가 있으면 스킵할 수도 있고, 
+            # 이 예시는 무조건 추가하는 방식입니다.
+            p1 = Portfolio(name='USDCore',      created_at=date.today())
+            p2 = Portfolio(name='USDSatellite', created_at=date.today())
 
-        session.add_all([p1, p2])
-        session.commit()
-        print(f"✅ 추가된 포트폴리오: {p1.id}({p1.name}), {p2.id}({p2.name})")
+            s.add_all([p1, p2])
+            s.flush()  # id 할당
     except Exception as e:
-        session.rollback()
+        if session is not None:
+            raise
         print("❌ 포트폴리오 초기화 실패:", e)
-    finally:
-        session.close()
+        return []
+    print(f"✅ 추가된 포트폴리오: {p1.id}({p1.name}), {p2.id}({p2.name})")
+    return [p1.id, p2.id]
 
 if __name__ == "__main__":
+    # 테이블 생성 (없을 경우)
+    init_db()
     init_portfolios()
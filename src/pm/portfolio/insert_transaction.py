@@ -1,10 +1,24 @@
+import functools
 from datetime import date, datetime
 from decimal import Decimal, ROUND_HALF_UP, InvalidOperation
-from pm.db.models import SessionLocal, Transaction
+from typing import Iterable
+from pm.db.models import Transaction, bulk_insert_transactions, session_scope
 
 # 8자리 소수 정밀도 (Numeric(20,8) 대응)
 _SCALE = Decimal("0.00000001")
 
+@functools.lru_cache(maxsize=4096)
+def _dec8_from_str(s: str) -> Decimal:
+    """정규화된 숫자 문자열 → Decimal(소수 8자리)
+
+    CSV 일괄 입력 시 fee=0, tax=0, 정수 수량처럼 같은 값이 반복되므로 결과를 캐시합니다.
+    (Decimal은 불변 객체라 캐시된 값을 그대로 공유해도 안전)
+    """
+    try:
+        return Decimal(s).quantize(_SCALE, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, ValueError) as e:
+        raise ValueError(f"Decimal(20,8)로 변환 실패: {s!r}") from e
+
 def _to_dec8(x) -> Decimal:
     """
     임의 입력 x를 Decimal(소수 8자리)로 정규화.
@@ -13,17 +27,11 @@ def _to_dec8(x) -> Decimal:
     """
     if x is None:
         raise ValueError("값이 None 입니다. Decimal로 변환할 수 없습니다.")
-    if isinstance(x, Decimal):
-        return x.quantize(_SCALE, rounding=ROUND_HALF_UP)
-    if isinstance(x, (int, float)):
-        # float의 이진 오차를 줄이기 위해 str로 감싼 뒤 Decimal 생성
-        return Decimal(str(x)).quantize(_SCALE, rounding=ROUND_HALF_UP)
+    if isinstance(x, (Decimal, int, float)):
+        # float의 이진 오차를 줄이기 위해 str로 감싼 뒤 Decimal 생성 (Decimal/int의 str은 값 그대로)
+        return _dec8_from_str(str(x))
     # 문자열 등
-    s = str(x).strip().replace(",", "")
-    try:
-        return Decimal(s).quantize(_SCALE, rounding=ROUND_HALF_UP)
-    except (InvalidOperation, ValueError) as e:
-        raise ValueError(f"Decimal(20,8)로 변환 실패: {x!r}") from e
+    return _dec8_from_str(str(x).strip().replace(",", ""))
 
 def _to_date(d):
     """date 또는 'YYYY-MM-DD' 문자열 허용."""
@@ -37,30 +45,59 @@ def _to_date(d):
             return datetime.fromisoformat(d).date()
     raise ValueError(f"날짜 형식이 올바르지 않습니다: {d!r}")
 
-def add_transaction(portfolio_id, asset_id, trans_date, quantity, price, fee, tax, type_):
+def add_transaction(portfolio_id, asset_id, trans_date, quantity, price, fee, tax, type_, session=None):
     """
     모든 숫자 인자(quantity, price, fee, tax)를 Decimal(20,8)로 정규화 후 저장.
     trans_date는 date 또는 'YYYY-MM-DD' 문자열 허용.
+    session을 주면 호출 측 트랜잭션에 포함되고(커밋은 호출 측), 없으면 새 세션에서 커밋합니다.
     """
-    session = SessionLocal()
     try:
-        tx = Transaction(
-            portfolio_id = int(portfolio_id),
-            asset_id     = int(asset_id),
-            trans_date   = _to_date(trans_date),
-            quantity     = _to_dec8(quantity),
-            price        = _to_dec8(price),
-            fee          = _to_dec8(fee),
-            tax          = _to_dec8(tax),
-            type         = type_,
-        )
-        session.add(tx)
-        session.commit()
-        print(f"거래 입력 완료: {tx.id}")
-        return tx.id
+        with session_scope(session) as s:
+            tx = Transaction(
+                portfolio_id = int(portfolio_id),
+                asset_id     = int(asset_id),
+                trans_date   = _to_date(trans_date),
+                quantity     = _to_dec8(quantity),
+                price        = _to_dec8(price),
+                fee          = _to_dec8(fee),
+                tax          = _to_dec8(tax),
+                type         = type_,
+            )
+            s.add(tx)
+            s.flush()  # id 할당
     except Exception as e:
-        session.rollback()
         print("거래 입력 실패:", e)
         raise
-    finally:
-        session.close()
+    print(f"거래 입력 완료: {tx.id}")
+    return tx.id
+
+def add_transactions(rows: Iterable[dict], session=None) -> int:
+    """
+    여러 거래를 한 트랜잭션으로 일괄 저장 (과거 이력/백테스트 대량 입력용).
+    rows의 각 dict는 add_transaction과 같은 키를 가집니다:
+    portfolio_id, asset_id, trans_date, quantity, price, fee, tax, type
+    (type 대신 type_ 키도 허용). 저장한 거래 수를 반환합니다.
+    """
+    mappings = [
+        {
+            'portfolio_id': int(row['portfolio_id']),
+            'asset_id':     int(row['asset_id']),
+            'trans_date':   _to_date(row['trans_date']),
+            'quantity':     _to_dec8(row['quantity']),
+            'price':        _to_dec8(row['price']),
+            'fee':          _to_dec8(row.get('fee', 0)),
+            'tax':          _to_dec8(row.get('tax', 0)),
+            'type':         row['type'] if 'type' in row else row['type_'],
+        }
+        for row in rows
+    ]
+
+    try:
+        # 행마다 커밋하지 않고 executemany INSERT 후 한 번만 커밋 (session_scope 종료 시)
+        with session_scope(session) as s:
+            count = bulk_insert_transactions(s, mappings, commit=False)
+    except Exception as e:
+        print("거래 일괄 입력 실패:", e)
+        raise
+    print(f"거래 일괄 입력 완료: {count}건")
+    return count
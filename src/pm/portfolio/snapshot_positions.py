@@ -1,201 +1,173 @@
 from datetime import date
-from decimal import Decimal
-from sqlalchemy import select, func, Numeric, and_
+from sqlalchemy import select, func, case, literal, literal_column, and_, Date, Integer, Numeric
 from pm.db.models import (
-    SessionLocal,
+    session_scope,
     Portfolio,
     Transaction,
     Price,
     PortfolioPositionDaily,
-    PortfolioNavDaily
+    PortfolioNavDaily,
+    upsert_from_select
 )
 
-def snapshot_portfolio_date(portfolio_id: int, as_of_date: date):
-    session = SessionLocal()
-    try:
-        # ── 1) cash_balance 계산 (fee, tax 반영) - 최적화: 거래 유형별 한 번에 계산 ──
-        p = session.get(Portfolio, portfolio_id)
-        initial_cash = getattr(p, 'initial_cash', Decimal('0'))
-
-        # 거래 유형별 금액을 한 번에 계산
-        cash_flows = session.execute(
+# SQL 본문에 그대로 들어가는 0 (COALESCE/CASE 기본값을 매 쿼리 바인드 파라미터로 보내지 않음)
+_ZERO = literal_column('0')
+
+def snapshot_portfolio_date(portfolio_id: int, as_of_date: date, session=None, roll_forward: bool = False):
+    """as_of_date 기준 포지션/NAV 스냅샷 저장
+
+    수량·단가·평가액·현금 계산을 모두 SQL로 표현해 INSERT ... SELECT 두 번으로 처리합니다.
+    (거래/가격 행을 Python으로 가져오거나 Decimal 연산을 하지 않음)
+    session을 주면 호출 측 세션에서 실행하고 커밋은 호출 측에 맡깁니다
+    (여러 날짜를 백필할 때 같은 커넥션과 캐시된 SQL/prepared statement를 재사용).
+
+    현금잔고는 기본적으로 initial_cash + 전체 거래 이력으로 다시 계산하므로,
+    소급 입력/수정된 거래가 있어도 해당 날짜를 다시 실행하면 바로잡힙니다.
+    roll_forward=True면 직전 NAV 스냅샷의 현금잔고에 이후 거래분만 더합니다.
+    직전 스냅샷이 같은 실행에서 방금 계산된 경우에만 사용해야 합니다
+    (직전 스냅샷 날짜 이전의 거래 변경은 반영되지 않고, 저장된 잔고의 소수점 4자리 반올림이 누적됨).
+    """
+    with session_scope(session) as session:
+        is_buy = Transaction.type == 'BUY'
+        is_sell = Transaction.type == 'SELL'
+        principal = Transaction.quantity * Transaction.price
+        tx_until = and_(
+            Transaction.portfolio_id == portfolio_id,
+            Transaction.trans_date <= as_of_date
+        )
+
+        # ── 1) 거래된 자산 리스트 ──
+        traded = select(Transaction.asset_id).where(tx_until).distinct().subquery('traded')
+
+        # ── 2) 자산별 BUY/SELL 합계 (유형별 합계를 CASE로 펼쳐 자산당 한 행) ──
+        # (거래가 없는 유형의 NULL은 아래 포지션 계산의 COALESCE에서 한 번에 0 처리)
+        agg = (
             select(
-                Transaction.type,
-                func.coalesce(func.sum(Transaction.quantity * Transaction.price), Decimal('0')).label('principal'),
-                func.coalesce(func.sum(Transaction.fee), Decimal('0')).label('total_fee'),
-                func.coalesce(func.sum(Transaction.tax), Decimal('0')).label('total_tax')
+                Transaction.asset_id,
+                func.sum(case((is_buy, Transaction.quantity))).label('buy_qty'),
+                func.sum(case((is_sell, Transaction.quantity))).label('sell_qty'),
+                func.sum(case((is_buy, principal))).label('buy_cost')
             )
+            .where(tx_until, Transaction.type.in_(['BUY', 'SELL']))
+            .group_by(Transaction.asset_id)
+            .subquery('agg')
+        )
+
+        # ── 3) 각 자산별 as_of_date 기준 최신 종가 (당일 가격이 없으면 직전 영업일 가격) ──
+        # ROW_NUMBER()로 자산별 최신 행만 남김
+        rn = func.row_number().over(
+            partition_by=Price.asset_id,
+            order_by=Price.date.desc()
+        ).label('rn')
+        ranked_prices = (
+            select(Price.asset_id, Price.close, rn)
             .where(
-                Transaction.portfolio_id == portfolio_id,
-                Transaction.trans_date <= as_of_date,
-                Transaction.type.in_(['BUY', 'SELL', 'DEPOSIT'])
+                Price.date <= as_of_date,
+                Price.asset_id.in_(select(traded.c.asset_id))
             )
-            .group_by(Transaction.type)
-        ).all()
-
-        # 결과를 딕셔너리로 변환하고 cash_balance 계산
-        cash_balance = initial_cash
-        for transaction_type, principal, total_fee, total_tax in cash_flows:
-            if transaction_type == 'BUY':
-                cash_balance -= (principal + total_fee + total_tax)
-            elif transaction_type in ['SELL', 'DEPOSIT']:
-                cash_balance += (principal - total_fee - total_tax)
-
-        # ── 2) 거래된 자산 리스트 ──
-        asset_ids = session.execute(
-            select(Transaction.asset_id)
-            .where(
-                Transaction.portfolio_id == portfolio_id,
-                Transaction.trans_date   <= as_of_date
+            .subquery('ranked_prices')
+        )
+        latest_px = (
+            select(ranked_prices.c.asset_id, ranked_prices.c.close)
+            .where(ranked_prices.c.rn == 1)
+            .subquery('latest_px')
+        )
+
+        # ── 4) portfolio_positions_daily upsert ──
+        # (a) 보유 수량 = BUY 합 − SELL 합
+        buy_qty = func.coalesce(agg.c.buy_qty, _ZERO)
+        quantity = buy_qty - func.coalesce(agg.c.sell_qty, _ZERO)
+        # (b) 평균 매입단가 (BUY 만 반영)
+        avg_price = case((buy_qty != _ZERO, agg.c.buy_cost / buy_qty), else_=_ZERO)
+        # (c) market_value (가격이 없는 자산은 0)
+        market_value = quantity * func.coalesce(latest_px.c.close, _ZERO)
+
+        positions = (
+            select(
+                literal(portfolio_id, Integer),
+                literal(as_of_date, Date),
+                traded.c.asset_id,
+                quantity,
+                avg_price,
+                market_value
             )
-            .distinct()
-        ).scalars().all()
+            .select_from(traded)
+            .outerjoin(agg, agg.c.asset_id == traded.c.asset_id)
+            .outerjoin(latest_px, latest_px.c.asset_id == traded.c.asset_id)
+        )
+        upsert_from_select(
+            session, PortfolioPositionDaily,
+            ['portfolio_id', 'as_of_date', 'asset_id'],
+            ['quantity', 'avg_price', 'market_value'],
+            ['portfolio_id', 'as_of_date', 'asset_id', 'quantity', 'avg_price', 'market_value'],
+            positions
+        )
 
-        # ── 3) 각 자산별 as_of_date 종가 조회 (최적화: 해당 날짜만 조회) ──
-        latest_prices = session.execute(
-            select(Price.asset_id, Price.close)
-            .where(
-                and_(
-                    Price.date == as_of_date,
-                    Price.asset_id.in_(asset_ids)
-                )
-            )
-        ).all()
-        
-        # price_map 생성
-        price_map = {asset_id: close for asset_id, close in latest_prices}
-        
-        # 가격이 없는 자산들에 대해 이전 영업일 가격 조회
-        missing_assets = [aid for aid in asset_ids if aid not in price_map]
-        if missing_assets:
-            # 각 자산별 이전 영업일 최신 가격 조회
-            fallback_date_subq = select(
-                Price.asset_id,
-                func.max(Price.date).label('latest_date')
-            ).where(
-                and_(
-                    Price.date < as_of_date,
-                    Price.asset_id.in_(missing_assets)
-                )
-            ).group_by(Price.asset_id).subquery()
-            
-            fallback_prices = session.execute(
-                select(Price.asset_id, Price.close)
-                .join(
-                    fallback_date_subq,
-                    and_(
-                        Price.asset_id == fallback_date_subq.c.asset_id,
-                        Price.date == fallback_date_subq.c.latest_date
-                    )
+        # ── 5) portfolio_nav_daily upsert ──
+        # cash_balance = 기준 현금 + 이후 순현금흐름 (fee, tax 반영)
+        # (BUY는 원금+수수료+세금만큼 유출, SELL/DEPOSIT은 원금-수수료-세금만큼 유입)
+        # roll_forward이고 직전 NAV 스냅샷이 있으면 그 현금잔고에 이후 거래분만 더하고(일별 백필 시 전체 이력 재집계 방지),
+        # 아니면 initial_cash에 전체 거래 이력을 더함
+        prev_nav = None
+        if roll_forward:
+            prev_nav = session.execute(
+                select(PortfolioNavDaily.as_of_date, PortfolioNavDaily.cash_balance)
+                .where(
+                    PortfolioNavDaily.portfolio_id == portfolio_id,
+                    PortfolioNavDaily.as_of_date < as_of_date
                 )
-            ).all()
-            
-            # fallback 가격을 price_map에 추가
-            for asset_id, close in fallback_prices:
-                price_map[asset_id] = close
-        
-        # 여전히 가격이 없는 자산은 0으로 설정
-        for aid in asset_ids:
-            if aid not in price_map:
-                price_map[aid] = Decimal('0')
+                .order_by(PortfolioNavDaily.as_of_date.desc())
+                .limit(1)
+            ).first()
+
+        cash_filter = [tx_until, Transaction.type.in_(['BUY', 'SELL', 'DEPOSIT'])]
+        if prev_nav is not None:
+            cash_filter.append(Transaction.trans_date > prev_nav.as_of_date)
+            base_cash = literal(prev_nav.cash_balance, Numeric(20, 4))
+        else:
+            base_cash = Portfolio.initial_cash
 
-        # ── 4) 자산별 상세 스냅샷 + total_market_value 집계 (최적화: 배치 쿼리) ──
-        
-        # 모든 자산의 거래 데이터를 한 번에 조회
-        asset_transactions = session.execute(
+        net_cash_flow = (
             select(
-                Transaction.asset_id,
-                Transaction.type,
-                func.coalesce(func.sum(Transaction.quantity), Decimal('0')).label('total_quantity'),
-                func.coalesce(func.sum(Transaction.quantity * Transaction.price), Decimal('0')).label('total_cost')
-            )
-            .where(
-                Transaction.portfolio_id == portfolio_id,
-                Transaction.asset_id.in_(asset_ids),
-                Transaction.type.in_(['BUY', 'SELL']),
-                Transaction.trans_date <= as_of_date
+                func.coalesce(
+                    func.sum(
+                        case(
+                            (is_buy, -(principal + Transaction.fee + Transaction.tax)),
+                            else_=principal - Transaction.fee - Transaction.tax
+                        )
+                    ),
+                    _ZERO
+                )
             )
-            .group_by(Transaction.asset_id, Transaction.type)
-        ).all()
-
-        # 자산별 거래 데이터를 딕셔너리로 정리
-        asset_data = {}
-        for asset_id, trans_type, total_quantity, total_cost in asset_transactions:
-            if asset_id not in asset_data:
-                asset_data[asset_id] = {'BUY': {'qty': Decimal('0'), 'cost': Decimal('0')}, 
-                                       'SELL': {'qty': Decimal('0'), 'cost': Decimal('0')}}
-            asset_data[asset_id][trans_type]['qty'] = total_quantity
-            asset_data[asset_id][trans_type]['cost'] = total_cost
-
-        # 기존 포지션 데이터를 한 번에 조회
-        existing_positions = session.execute(
-            select(PortfolioPositionDaily)
+            .where(*cash_filter)
+            .scalar_subquery()
+        )
+        # total_market_value = 위에서 저장한 당일 포지션 평가액 합계
+        total_market_value = (
+            select(func.coalesce(func.sum(PortfolioPositionDaily.market_value), _ZERO))
             .where(
                 PortfolioPositionDaily.portfolio_id == portfolio_id,
-                PortfolioPositionDaily.as_of_date == as_of_date,
-                PortfolioPositionDaily.asset_id.in_(asset_ids)
+                PortfolioPositionDaily.as_of_date == as_of_date
             )
-        ).scalars().all()
-        
-        existing_positions_map = {pos.asset_id: pos for pos in existing_positions}
-
-        total_market_value = Decimal('0')
-
-        for aid in asset_ids:
-            # 거래 데이터 가져오기 (없으면 기본값)
-            buy_data = asset_data.get(aid, {}).get('BUY', {'qty': Decimal('0'), 'cost': Decimal('0')})
-            sell_data = asset_data.get(aid, {}).get('SELL', {'qty': Decimal('0'), 'cost': Decimal('0')})
-            
-            # (a) 보유 수량 = BUY 합 − SELL 합
-            total_qty = buy_data['qty'] - sell_data['qty']
-
-            # (b) 평균 매입단가 (BUY 만 반영)
-            avg_price = (buy_data['cost'] / buy_data['qty']) if buy_data['qty'] else Decimal('0')
-
-            # (c) market_value 계산
-            mv = total_qty * price_map.get(aid, Decimal('0'))
-            total_market_value += mv
+            .scalar_subquery()
+        )
+        cash_balance = base_cash + net_cash_flow
 
-            # (d) portfolio_positions_daily upsert
-            existing = existing_positions_map.get(aid)
-            if existing:
-                existing.quantity = total_qty
-                existing.avg_price = avg_price
-                existing.market_value = mv
-            else:
-                session.add(PortfolioPositionDaily(
-                    portfolio_id = portfolio_id,
-                    as_of_date   = as_of_date,
-                    asset_id     = aid,
-                    quantity     = total_qty,
-                    avg_price    = avg_price,
-                    market_value = mv
-                ))
-
-        # ── 5) portfolio_nav_daily upsert ──
-        total_nav = cash_balance + total_market_value
-
-        existing_nav = session.execute(
-            select(PortfolioNavDaily)
-            .where(
-                PortfolioNavDaily.portfolio_id == portfolio_id,
-                PortfolioNavDaily.as_of_date   == as_of_date
+        nav = (
+            select(
+                Portfolio.id,
+                literal(as_of_date, Date),
+                cash_balance,
+                total_market_value,
+                cash_balance + total_market_value
             )
-        ).scalar_one_or_none()
-
-        if existing_nav:
-            existing_nav.cash_balance       = cash_balance
-            existing_nav.total_market_value = total_market_value
-            existing_nav.nav                = total_nav
-        else:
-            session.add(PortfolioNavDaily(
-                portfolio_id        = portfolio_id,
-                as_of_date          = as_of_date,
-                cash_balance        = cash_balance,
-                total_market_value  = total_market_value,
-                nav                 = total_nav
-            ))
+            .where(Portfolio.id == portfolio_id)
+        )
+        upsert_from_select(
+            session, PortfolioNavDaily,
+            ['portfolio_id', 'as_of_date'],
+            ['cash_balance', 'total_market_value', 'nav'],
+            ['portfolio_id', 'as_of_date', 'cash_balance', 'total_market_value', 'nav'],
+            nav
+        )
 
-        session.commit()
-    finally:
-        session.close()
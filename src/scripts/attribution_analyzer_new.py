@@ -5,13 +5,26 @@ from sqlalchemy import select
 
 from pm.db.models import SessionLocal, Portfolio, PortfolioNavDaily
 from pm.data.utils.trading_calendar import TradingCalendar_KRX, TradingCalendar_NYSE
-from scripts.attribution_visualization import period_attribution  # 기존 기여도 계산 함수 활용
+from scripts.attribution_visualization import period_attribution, period_attribution_batch  # 기존 기여도 계산 함수 활용
+
+# 시장 코드 → 거래일 캘린더 클래스 (각 캘린더는 프로세스 내 단일 인스턴스)
+_CALENDARS = {
+    'KRX': TradingCalendar_KRX,
+    'NYSE': TradingCalendar_NYSE,
+}
 
 class AttributionAnalyzer:
     """기여도 분석 계산 (DB 저장 없이 분석만 수행)"""
     
     def __init__(self):
         self.calendar = None
+
+    def _set_calendar(self, market: str):
+        """시장에 맞는 거래일 캘린더를 self.calendar에 설정"""
+        try:
+            self.calendar = _CALENDARS[market.upper()]()
+        except KeyError:
+            raise ValueError(f"Unsupported market: {market}") from None
         
     def compute_period_attribution(
         self,
@@ -34,12 +47,7 @@ class AttributionAnalyzer:
             tuple: (asset_df, class_df) - 자산별, 자산군별 기여도 데이터프레임
         """
         # 시장별 캘린더 설정
-        if market.upper() == 'KRX':
-            self.calendar = TradingCalendar_KRX()
-        elif market.upper() == 'NYSE':
-            self.calendar = TradingCalendar_NYSE()
-        else:
-            raise ValueError(f"Unsupported market: {market}")
+        self._set_calendar(market)
 
         print(f"Computing attribution for {portfolio_name}: {start_date} ~ {end_date}")
         
@@ -74,22 +82,16 @@ class AttributionAnalyzer:
             list: [(period_start, period_end, asset_df, class_df), ...] 주간별 분석 결과
         """
         # 시장별 캘린더 설정
-        if market.upper() == 'KRX':
-            self.calendar = TradingCalendar_KRX()
-        elif market.upper() == 'NYSE':
-            self.calendar = TradingCalendar_NYSE()
-        else:
-            raise ValueError(f"Unsupported market: {market}")
+        self._set_calendar(market)
 
         # 주간 기간 생성
         weekly_ranges = self.calendar.get_week_ranges(start_date, end_date)
         
+        # 전체 weekly_ranges를 한 세션·한 번의 포지션/NAV 조회로 계산
+        period_results = period_attribution_batch(portfolio_name, weekly_ranges, top_n)
+
         results = []
-        for week_start, week_end in weekly_ranges:
-            print(f"Processing week: {week_start} ~ {week_end}")
-            asset_df, class_df = self.compute_period_attribution(
-                market, portfolio_name, week_start, week_end, top_n
-            )
+        for (week_start, week_end), (asset_df, class_df) in zip(weekly_ranges, period_results):
             results.append((week_start, week_end, asset_df, class_df))
             
         return results
@@ -115,22 +117,16 @@ class AttributionAnalyzer:
             list: [(period_start, period_end, asset_df, class_df), ...] 월간별 분석 결과
         """
         # 시장별 캘린더 설정
-        if market.upper() == 'KRX':
-            self.calendar = TradingCalendar_KRX()
-        elif market.upper() == 'NYSE':
-            self.calendar = TradingCalendar_NYSE()
-        else:
-            raise ValueError(f"Unsupported market: {market}")
+        self._set_calendar(market)
 
         # 월간 기간 생성
         monthly_ranges = self.calendar.get_month_ranges(start_date, end_date)
         
+        # 전체 monthly_ranges를 한 세션·한 번의 포지션/NAV 조회로 계산
+        period_results = period_attribution_batch(portfolio_name, monthly_ranges, top_n)
+
         results = []
-        for month_start, month_end in monthly_ranges:
-            print(f"Processing month: {month_start} ~ {month_end}")
-            asset_df, class_df = self.compute_period_attribution(
-                market, portfolio_name, month_start, month_end, top_n
-            )
+        for (month_start, month_end), (asset_df, class_df) in zip(monthly_ranges, period_results):
             results.append((month_start, month_end, asset_df, class_df))
             
         return results
@@ -1,7 +1,9 @@
+import bisect
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from datetime import date
-from sqlalchemy import select, func
+from sqlalchemy import select, func, case, and_
 from pm.db.models import (
     SessionLocal,
     Portfolio,
@@ -101,51 +103,39 @@ def analyze_specific_asset(portfolio_name: str, asset_name: str, start_date: dat
             print(f"자산 '{asset_name}'은 분석 기간 {start_snap} ~ {end_snap} 동안 포지션이 없었습니다.")
             return
         
-        # 4) 포트폴리오 NAV 조회
-        start_nav = session.execute(
-            select(PortfolioNavDaily.nav)
+        # 4) 포트폴리오 NAV 조회 (시작/종료일을 IN 한 번으로 조회)
+        navs = dict(session.execute(
+            select(PortfolioNavDaily.as_of_date, PortfolioNavDaily.nav)
             .where(
                 PortfolioNavDaily.portfolio_id == pid,
-                PortfolioNavDaily.as_of_date == start_snap
+                PortfolioNavDaily.as_of_date.in_([start_snap, end_snap])
             )
-        ).scalar()
-        
-        end_nav = session.execute(
-            select(PortfolioNavDaily.nav)
-            .where(
-                PortfolioNavDaily.portfolio_id == pid,
-                PortfolioNavDaily.as_of_date == end_snap
-            )
-        ).scalar()
+        ).all())
+        start_nav = navs.get(start_snap)
+        end_nav = navs.get(end_snap)
         
         print(f"포트폴리오 NAV: {float(start_nav):,.0f} → {float(end_nav):,.0f}")
         portfolio_return = (float(end_nav) - float(start_nav)) / float(start_nav)
         print(f"포트폴리오 수익률: {portfolio_return:.4f} ({portfolio_return*100:.2f}%)")
         
-        # 5) 자산 포지션 조회
-        start_pos = session.execute(
-            select(
-                PortfolioPositionDaily.market_value,
-                PortfolioPositionDaily.quantity,
-                PortfolioPositionDaily.avg_price
-            ).where(
-                PortfolioPositionDaily.portfolio_id == pid,
-                PortfolioPositionDaily.asset_id == aid,
-                PortfolioPositionDaily.as_of_date == start_snap
-            )
-        ).first()
-        
-        end_pos = session.execute(
-            select(
-                PortfolioPositionDaily.market_value,
-                PortfolioPositionDaily.quantity,
-                PortfolioPositionDaily.avg_price
-            ).where(
-                PortfolioPositionDaily.portfolio_id == pid,
-                PortfolioPositionDaily.asset_id == aid,
-                PortfolioPositionDaily.as_of_date == end_snap
+        # 5) 자산 포지션 조회 (시작/종료일을 IN 한 번으로 조회)
+        asset_positions = {
+            pos.as_of_date: pos
+            for pos in session.execute(
+                select(
+                    PortfolioPositionDaily.as_of_date,
+                    PortfolioPositionDaily.market_value,
+                    PortfolioPositionDaily.quantity,
+                    PortfolioPositionDaily.avg_price
+                ).where(
+                    PortfolioPositionDaily.portfolio_id == pid,
+                    PortfolioPositionDaily.asset_id == aid,
+                    PortfolioPositionDaily.as_of_date.in_([start_snap, end_snap])
+                )
             )
-        ).first()
+        }
+        start_pos = asset_positions.get(start_snap)
+        end_pos = asset_positions.get(end_snap)
         
         start_mv = float(start_pos.market_value) if start_pos else 0
         end_mv = float(end_pos.market_value) if end_pos else 0
@@ -406,42 +396,29 @@ def debug_contribution_calculation(portfolio_name: str, start_date: date, end_da
         ).scalar_one()
         pid = pf.id
         
-        # 기간 내 스냅샷 조회
-        start_snap = session.execute(
-            select(func.min(PortfolioPositionDaily.as_of_date))
-            .where(
-                PortfolioPositionDaily.portfolio_id == pid,
-                PortfolioPositionDaily.as_of_date >= start_date
-            )
-        ).scalar()
-        
-        end_snap = session.execute(
-            select(func.max(PortfolioPositionDaily.as_of_date))
-            .where(
-                PortfolioPositionDaily.portfolio_id == pid,
-                PortfolioPositionDaily.as_of_date <= end_date
+        # 기간 내 스냅샷 조회 (시작/종료 스냅샷을 조건부 MIN/MAX 한 번의 쿼리로)
+        snap_date = PortfolioPositionDaily.as_of_date
+        start_snap, end_snap = session.execute(
+            select(
+                func.min(case((snap_date >= start_date, snap_date))),
+                func.max(case((snap_date <= end_date, snap_date)))
             )
-        ).scalar()
+            .where(PortfolioPositionDaily.portfolio_id == pid)
+        ).one()
         
         print(f"=== 기여도 계산 디버그: {portfolio_name} ===")
         print(f"분석 기간: {start_snap} ~ {end_snap}")
         
-        # NAV 조회
-        start_nav = session.execute(
-            select(PortfolioNavDaily.nav)
-            .where(
-                PortfolioNavDaily.portfolio_id == pid,
-                PortfolioNavDaily.as_of_date == start_snap
-            )
-        ).scalar()
-        
-        end_nav = session.execute(
-            select(PortfolioNavDaily.nav)
+        # NAV 조회 (시작/종료일을 IN 한 번으로 조회)
+        navs = dict(session.execute(
+            select(PortfolioNavDaily.as_of_date, PortfolioNavDaily.nav)
             .where(
                 PortfolioNavDaily.portfolio_id == pid,
-                PortfolioNavDaily.as_of_date == end_snap
+                PortfolioNavDaily.as_of_date.in_([start_snap, end_snap])
             )
-        ).scalar()
+        ).all())
+        start_nav = navs.get(start_snap)
+        end_nav = navs.get(end_snap)
         
         total_return = (float(end_nav) - float(start_nav)) / float(start_nav)
         print(f"포트폴리오 전체 수익률: {total_return:.4f} ({total_return*100:.2f}%)")
@@ -463,26 +440,10 @@ def debug_contribution_calculation(portfolio_name: str, start_date: date, end_da
             # 전체 자산
             asset_filter = Asset.id.isnot(None)
         
-        # 시작 포지션
-        start_positions = session.execute(
-            select(
-                PortfolioPositionDaily.asset_id,
-                PortfolioPositionDaily.market_value,
-                PortfolioPositionDaily.quantity,
-                PortfolioPositionDaily.avg_price,
-                Asset.name
-            )
-            .join(Asset, PortfolioPositionDaily.asset_id == Asset.id)
-            .where(
-                PortfolioPositionDaily.portfolio_id == pid,
-                PortfolioPositionDaily.as_of_date == start_snap,
-                asset_filter
-            )
-        ).all()
-        
-        # 종료 포지션
-        end_positions = session.execute(
+        # 시작/종료 포지션 (두 날짜를 IN 한 번으로 조회한 뒤 날짜별로 분리)
+        positions = session.execute(
             select(
+                PortfolioPositionDaily.as_of_date,
                 PortfolioPositionDaily.asset_id,
                 PortfolioPositionDaily.market_value,
                 PortfolioPositionDaily.quantity,
@@ -492,14 +453,14 @@ def debug_contribution_calculation(portfolio_name: str, start_date: date, end_da
             .join(Asset, PortfolioPositionDaily.asset_id == Asset.id)
             .where(
                 PortfolioPositionDaily.portfolio_id == pid,
-                PortfolioPositionDaily.as_of_date == end_snap,
+                PortfolioPositionDaily.as_of_date.in_([start_snap, end_snap]),
                 asset_filter
             )
         ).all()
         
         # 분석
-        start_dict = {pos.asset_id: pos for pos in start_positions}
-        end_dict = {pos.asset_id: pos for pos in end_positions}
+        start_dict = {pos.asset_id: pos for pos in positions if pos.as_of_date == start_snap}
+        end_dict = {pos.asset_id: pos for pos in positions if pos.as_of_date == end_snap}
         all_assets = set(start_dict.keys()) | set(end_dict.keys())
         
         print(f"\n=== 자산별 상세 분석 ===")
@@ -637,312 +598,327 @@ def debug_contribution_calculation(portfolio_name: str, start_date: date, end_da
         session.close()
 
 
-def period_attribution(
-    portfolio_name: str,
-    start_date: date,
-    end_date: date,
-    top_n: int = 5
-):
-    """
-    Simple allocation-based attribution over ANY date range.
-    
-    Args:
-      portfolio_name: name of your portfolio in the DB.
-      start_date, end_date: period to analyze (inclusive).
-      top_n: how many top/bottom assets to show.
-    
-    Returns:
-      asset_df, class_df: 자산별, 자산군별 기여도 데이터프레임
+def _return_note(row) -> str:
+    """디버그 출력용 수익률 표기 (신규 편입은 편입일, 가격 정보 유무 표시)"""
+    ret = row.ret
+    if row.start_mv > 0:
+        return f"{ret:.4f}"
+    if row.end_mv > 0:
+        if pd.isna(row.entry_date):
+            return "NEW(No Entry Date)"
+        if row.entry_avg > 0 and row.qty_end > 0:
+            return f"{ret:.4f}(NEW@{row.entry_date})"
+        return f"NEW@{row.entry_date}(No Price)"
+    return "SOLD"
+
+
+def _snapshot_bounds(snap_dates: list, start_date: date, end_date: date) -> tuple:
+    """정렬된 스냅샷 날짜 목록에서 start_date 이후 첫 날짜, end_date 이전 마지막 날짜 반환"""
+    i = bisect.bisect_left(snap_dates, start_date)
+    j = bisect.bisect_right(snap_dates, end_date)
+    start_snap = snap_dates[i] if i < len(snap_dates) else None
+    end_snap = snap_dates[j - 1] if j > 0 else None
+    return start_snap, end_snap
+
+
+def _attribution_from_snapshots(session, pid: int, start_snap: date, end_snap: date,
+                                 start_pos: list, end_pos: list, start_nav, end_nav,
+                                 asset_map: dict):
+    """시작/종료 스냅샷 포지션과 NAV로 자산별·자산군별 기여도 계산
+
+    asset_map: {asset_id: {'name': ..., 'asset_class': ...}}
     """
-    session = SessionLocal()
-    try:
-        # 1) find portfolio id
-        pf = session.execute(
-            select(Portfolio).where(Portfolio.name == portfolio_name)
-        ).scalar_one()
-        pid = pf.id
+    print(f"Using snapshots: {start_snap} -> {end_snap}")
+    print(f"NAV: {start_nav:,.0f} -> {end_nav:,.0f}")
 
-        # 2) locate the nearest snapshots on or after start_date,
-        #    and on or before end_date
-        start_snap = session.execute(
-            select(func.min(PortfolioPositionDaily.as_of_date))
-            .where(
-                PortfolioPositionDaily.portfolio_id == pid,
-                PortfolioPositionDaily.as_of_date >= start_date
-            )
-        ).scalar()
-        end_snap = session.execute(
-            select(func.max(PortfolioPositionDaily.as_of_date))
-            .where(
-                PortfolioPositionDaily.portfolio_id == pid,
-                PortfolioPositionDaily.as_of_date <= end_date
-            )
-        ).scalar()
+    # 5) build asset-level data (시작/종료 포지션을 자산 기준으로 병합해 열 단위로 계산)
+    pos_cols = ['asset_id', 'mv', 'qty', 'avg_price']
+    start_df = pd.DataFrame(start_pos, columns=pos_cols)
+    end_df = pd.DataFrame(end_pos, columns=pos_cols)
+    asset_df = start_df.merge(end_df, on='asset_id', how='outer', suffixes=('_start', '_end'))
+    if asset_df.empty:
+        print("No assets found in the position data")
+        return pd.DataFrame(), pd.DataFrame()
 
-        if not start_snap or not end_snap:
-            print(f"No position data in range {start_date} ~ {end_date}")
-            return pd.DataFrame(), pd.DataFrame()
+    num_cols = [c for c in asset_df.columns if c != 'asset_id']
+    asset_df[num_cols] = asset_df[num_cols].astype(float).fillna(0.0)
+    asset_df = asset_df.rename(columns={'mv_start': 'start_mv', 'mv_end': 'end_mv'})
+    start_nav_f = float(start_nav)
+
+    start_mv = asset_df['start_mv']
+    end_mv = asset_df['end_mv']
+    held = start_mv > 0                 # 기존 포지션
+    new = ~held & (end_mv > 0)          # 신규 편입 (시작 시점 미보유)
+
+    # 더 정확한 기여도 계산 방식
+    # 기여도 = (종료 시장가치 - 시작 시장가치) / 시작 NAV
+    asset_df['contrib_pct'] = (end_mv - start_mv) / start_nav_f
+    # 비중은 시작 시점 보유분만 (신규 편입/매도 완료는 0)
+    asset_df['weight'] = np.where(held, start_mv / start_nav_f, 0.0)
+    # 기존 포지션: 일반적인 수익률 계산
+    asset_df['return'] = np.where(held, (end_mv - start_mv) / start_mv.where(held, 1.0), 0.0)
 
-        # 3) starting positions and NAV
-        start_pos = session.execute(
+    # 신규 편입: 편입 시점(분석 기간 내에서 처음 포지션이 생긴 날)의 평균가격 대비 수익률
+    # (자산마다 조회하지 않고 편입일/편입 시점 평균가격을 한 번에 조회)
+    asset_df['entry_date'] = None
+    asset_df['entry_avg'] = np.nan
+    new_ids = asset_df.loc[new, 'asset_id'].tolist()
+    if new_ids:
+        entry_sub = (
             select(
                 PortfolioPositionDaily.asset_id,
-                PortfolioPositionDaily.market_value,
-                PortfolioPositionDaily.quantity,
-                PortfolioPositionDaily.avg_price
-            ).where(
+                func.min(PortfolioPositionDaily.as_of_date).label('entry_date')
+            )
+            .where(
                 PortfolioPositionDaily.portfolio_id == pid,
-                PortfolioPositionDaily.as_of_date == start_snap
+                PortfolioPositionDaily.asset_id.in_(new_ids),
+                PortfolioPositionDaily.as_of_date >= start_snap,
+                PortfolioPositionDaily.as_of_date <= end_snap,
+                PortfolioPositionDaily.market_value > 0
+            )
+            .group_by(PortfolioPositionDaily.asset_id)
+            .subquery()
+        )
+        entry_rows = session.execute(
+            select(entry_sub.c.asset_id, entry_sub.c.entry_date, PortfolioPositionDaily.avg_price)
+            .join(
+                PortfolioPositionDaily,
+                and_(
+                    PortfolioPositionDaily.portfolio_id == pid,
+                    PortfolioPositionDaily.asset_id == entry_sub.c.asset_id,
+                    PortfolioPositionDaily.as_of_date == entry_sub.c.entry_date
+                )
             )
         ).all()
+        entry_idx = asset_df.index[new]
+        entry_map = {aid: (d, float(avg) if avg else np.nan) for aid, d, avg in entry_rows}
+        asset_df.loc[entry_idx, 'entry_date'] = asset_df.loc[entry_idx, 'asset_id'].map(
+            lambda aid: entry_map.get(aid, (None, np.nan))[0])
+        asset_df.loc[entry_idx, 'entry_avg'] = asset_df.loc[entry_idx, 'asset_id'].map(
+            lambda aid: entry_map.get(aid, (None, np.nan))[1]).astype(float)
 
-        start_nav = session.execute(
-            select(PortfolioNavDaily.nav)
-            .where(
-                PortfolioNavDaily.portfolio_id == pid,
-                PortfolioNavDaily.as_of_date == start_snap
-            )
-        ).scalar()
+        priced = new & (asset_df['entry_avg'] > 0) & (asset_df['qty_end'] > 0)
+        current_price = end_mv / asset_df['qty_end'].where(priced, 1.0)
+        asset_df['return'] = np.where(
+            priced,
+            (current_price - asset_df['entry_avg']) / asset_df['entry_avg'].where(priced, 1.0),
+            asset_df['return']
+        )
 
-        if not start_nav or start_nav == 0:
-            print(f"No valid starting NAV at {start_snap}")
-            return pd.DataFrame(), pd.DataFrame()
+    # 디버그 출력 (상위/하위 기여자만, 0.1% 이상인 경우)
+    print(f"\n=== 자산별 계산 디버그 ===")
+    # ('return'은 예약어라 itertuples 필드명으로 쓸 수 없어 ret으로 바꿔 순회)
+    debug_rows = asset_df[asset_df['contrib_pct'].abs() > 0.001].rename(columns={'return': 'ret'})
+    for row in debug_rows.itertuples(index=False):
+        print(f"Asset {row.asset_id}: start_mv={row.start_mv:,.0f}, end_mv={row.end_mv:,.0f}, "
+              f"return={_return_note(row)}, weight={row.weight:.4f}, contrib={row.contrib_pct:.4f}")
 
-        # 4) ending positions and NAV
-        end_pos = session.execute(
-            select(
-                PortfolioPositionDaily.asset_id,
-                PortfolioPositionDaily.market_value,
-                PortfolioPositionDaily.quantity,
-                PortfolioPositionDaily.avg_price
-            ).where(
-                PortfolioPositionDaily.portfolio_id == pid,
-                PortfolioPositionDaily.as_of_date == end_snap
-            )
-        ).all()
+    asset_df = asset_df[['asset_id', 'start_mv', 'end_mv', 'weight', 'return', 'contrib_pct']]
 
-        end_nav = session.execute(
-            select(PortfolioNavDaily.nav)
-            .where(
-                PortfolioNavDaily.portfolio_id == pid,
-                PortfolioNavDaily.as_of_date == end_snap
-            )
-        ).scalar()
+    # 6) asset names and classes (asset_map은 배치 전체에서 한 번 조회한 것을 재사용)
+    asset_df['name'] = asset_df['asset_id'].map(lambda x: asset_map.get(x, {}).get('name', f'Asset_{x}'))
+    asset_df['asset_class'] = asset_df['asset_id'].map(lambda x: asset_map.get(x, {}).get('asset_class', 'UNKNOWN'))
 
-        if not end_nav or end_nav == 0:
-            print(f"No valid ending NAV at {end_snap}")
-            return pd.DataFrame(), pd.DataFrame()
+    # 디버그: 이상한 수익률을 보이는 자산들 찾기
+    print(f"\n=== 수익률 검증 ===")
+    suspicious_assets = asset_df[
+        (asset_df['return'].abs() > 2) |  # 200% 이상 수익률
+        (asset_df['return'] < -0.9) |     # -90% 이하 손실률
+        (asset_df['contrib_pct'].abs() > 0.05)  # 5% 이상 기여도
+    ].sort_values('contrib_pct', ascending=False).rename(columns={'return': 'ret'})
 
-        print(f"Using snapshots: {start_snap} -> {end_snap}")
-        print(f"NAV: {start_nav:,.0f} -> {end_nav:,.0f}")
+    if not suspicious_assets.empty:
+        print("의심스러운 자산들:")
+        for row in suspicious_assets.itertuples(index=False):
+            print(f"  {row.name}: return={row.ret:.4f}, contrib={row.contrib_pct:.4f}, "
+                  f"weight={row.weight:.4f}")
 
-        # 5) build asset-level data
-        start_dict = {row.asset_id: {'mv': float(row.market_value), 'qty': float(row.quantity or 0), 'avg_price': float(row.avg_price or 0)} for row in start_pos}
-        end_dict = {row.asset_id: {'mv': float(row.market_value), 'qty': float(row.quantity or 0), 'avg_price': float(row.avg_price or 0)} for row in end_pos}
+    # Top/Bottom 기여자 출력
+    print(f"\n=== Top 5 기여자 ===")
+    top_5 = asset_df.nlargest(5, 'contrib_pct')
+    for name, contrib, ret in zip(top_5['name'], top_5['contrib_pct'], top_5['return']):
+        print(f"  {name}: {contrib:.4f} ({ret:.4f})")
 
-        all_assets = set(start_dict.keys()) | set(end_dict.keys())
-        if not all_assets:
-            print("No assets found in the position data")
-            return pd.DataFrame(), pd.DataFrame()
+    print(f"\n=== Bottom 5 기여자 ===")
+    bottom_5 = asset_df.nsmallest(5, 'contrib_pct')
+    for name, contrib, ret in zip(bottom_5['name'], bottom_5['contrib_pct'], bottom_5['return']):
+        print(f"  {name}: {contrib:.4f} ({ret:.4f})")
 
-        asset_data = []
-        print(f"\n=== 자산별 계산 디버그 ===")
-        for aid in all_assets:
-            start_info = start_dict.get(aid, {'mv': 0, 'qty': 0, 'avg_price': 0})
-            end_info = end_dict.get(aid, {'mv': 0, 'qty': 0, 'avg_price': 0})
-            
-            start_mv = start_info['mv']
-            end_mv = end_info['mv']
-            
-            # 더 정확한 기여도 계산 방식
-            # 기여도 = (종료 시장가치 - 시작 시장가치) / 시작 NAV
-            contrib_pct = (end_mv - start_mv) / float(start_nav)
-            
-            # 자산 수익률 계산 (정확한 방식)
-            if start_mv > 0:
-                # 기존 포지션: 일반적인 수익률 계산
-                asset_return = (end_mv - start_mv) / start_mv
-                weight = start_mv / float(start_nav)
-                return_str = f"{asset_return:.4f}"
-            elif end_mv > 0:
-                # 신규 편입: 편입 시점을 찾아서 정확한 수익률 계산
-                # 편입 시점 찾기 (분석 기간 내에서 처음 포지션이 생긴 날)
-                entry_date = session.execute(
-                    select(func.min(PortfolioPositionDaily.as_of_date))
-                    .where(
-                        PortfolioPositionDaily.portfolio_id == pid,
-                        PortfolioPositionDaily.asset_id == aid,
-                        PortfolioPositionDaily.as_of_date >= start_snap,
-                        PortfolioPositionDaily.as_of_date <= end_snap,
-                        PortfolioPositionDaily.market_value > 0
-                    )
-                ).scalar()
-                
-                if entry_date:
-                    # 편입 시점의 평균가격 조회
-                    entry_pos = session.execute(
-                        select(
-                            PortfolioPositionDaily.avg_price,
-                            PortfolioPositionDaily.quantity
-                        ).where(
-                            PortfolioPositionDaily.portfolio_id == pid,
-                            PortfolioPositionDaily.asset_id == aid,
-                            PortfolioPositionDaily.as_of_date == entry_date
-                        )
-                    ).first()
-                    
-                    if entry_pos and entry_pos.avg_price and end_info['qty'] > 0:
-                        current_price = end_mv / end_info['qty']
-                        asset_return = (current_price - float(entry_pos.avg_price)) / float(entry_pos.avg_price)
-                        return_str = f"{asset_return:.4f}(NEW@{entry_date})"
-                    else:
-                        asset_return = 0
-                        return_str = f"NEW@{entry_date}(No Price)"
-                else:
-                    asset_return = 0
-                    return_str = "NEW(No Entry Date)"
-                weight = 0
-            else:
-                # 매도된 포지션 - 매도 시점의 가격으로 수익률 계산
-                if start_mv > 0:
-                    # 매도 시점 찾기
-                    exit_date = session.execute(
-                        select(func.max(PortfolioPositionDaily.as_of_date))
-                        .where(
-                            PortfolioPositionDaily.portfolio_id == pid,
-                            PortfolioPositionDaily.asset_id == aid,
-                            PortfolioPositionDaily.as_of_date >= start_snap,
-                            PortfolioPositionDaily.as_of_date <= end_snap,
-                            PortfolioPositionDaily.market_value > 0
-                        )
-                    ).scalar()
-                    
-                    if exit_date:
-                        # 매도 시점 포지션 조회
-                        exit_pos = session.execute(
-                            select(
-                                PortfolioPositionDaily.market_value,
-                                PortfolioPositionDaily.quantity
-                            ).where(
-                                PortfolioPositionDaily.portfolio_id == pid,
-                                PortfolioPositionDaily.asset_id == aid,
-                                PortfolioPositionDaily.as_of_date == exit_date
-                            )
-                        ).first()
-                        
-                        if exit_pos and start_info['avg_price'] > 0:
-                            exit_mv = float(exit_pos.market_value)
-                            exit_qty = float(exit_pos.quantity)
-                            exit_price = exit_mv / exit_qty if exit_qty > 0 else 0
-                            start_price = start_info['avg_price']
-                            
-                            asset_return = (exit_price - start_price) / start_price if start_price > 0 else 0
-                            return_str = f"{asset_return:.4f}(SOLD@{exit_date})"
-                        else:
-                            asset_return = 0
-                            return_str = f"SOLD@{exit_date}(No Price)"
-                    else:
-                        asset_return = 0
-                        return_str = "SOLD(No Exit Date)"
-                else:
-                    asset_return = 0
-                    return_str = "SOLD"
-                    
-                weight = start_mv / float(start_nav) if start_mv > 0 else 0
+    # 기여도 합계 검증
+    total_contrib = asset_df['contrib_pct'].sum()
+    actual_return = (float(end_nav) - float(start_nav)) / float(start_nav)
+    print(f"\n=== 기여도 검증 ===")
+    print(f"기여도 합계: {total_contrib:.6f}")
+    print(f"실제 수익률: {actual_return:.6f}")
+    print(f"차이: {abs(total_contrib - actual_return):.6f}")
 
-            # 디버그 출력 (상위/하위 기여자만)
-            if abs(contrib_pct) > 0.001:  # 0.1% 이상인 경우만 출력
-                print(f"Asset {aid}: start_mv={start_mv:,.0f}, end_mv={end_mv:,.0f}, "
-                      f"return={return_str}, weight={weight:.4f}, contrib={contrib_pct:.4f}")
+    if abs(total_contrib - actual_return) > 0.001:
+        print("⚠️  기여도 합계와 실제 수익률에 차이가 있습니다!")
 
-            asset_data.append({
-                'asset_id': aid,
-                'start_mv': start_mv,
-                'end_mv': end_mv,
-                'weight': weight,
-                'return': asset_return,
-                'contrib_pct': contrib_pct
-            })
+    # 7) aggregate by asset class
+    # 자산군 코드별 가중치/기여도 합계를 bincount 한 번씩으로 계산 (groupby + 자산군별 재필터링 없이)
+    # 자산군 수익률 = 기여도 합 / 가중치 합 (가중치 합이 0이면 0)
+    # (asset_class가 NULL인 자산은 groupby와 같이 집계에서 제외)
+    codes, classes = pd.factorize(asset_df['asset_class'], sort=True)
+    valid = codes >= 0
+    class_weight = np.bincount(codes[valid], weights=asset_df['weight'].to_numpy(dtype=float)[valid],
+                               minlength=len(classes))
+    class_contrib = np.bincount(codes[valid], weights=asset_df['contrib_pct'].to_numpy(dtype=float)[valid],
+                                minlength=len(classes))
+    class_return = np.divide(class_contrib, class_weight,
+                             out=np.zeros_like(class_contrib), where=class_weight > 0)
+    class_df = pd.DataFrame({
+        'asset_class': classes,
+        'weight': class_weight,
+        'contrib_pct': class_contrib,
+        'return': class_return
+    })
 
-        asset_df = pd.DataFrame(asset_data)
-        if asset_df.empty:
-            print("No asset data computed")
-            return pd.DataFrame(), pd.DataFrame()
+    print(f"Analysis complete: {len(asset_df)} assets, {len(class_df)} asset classes")
 
-        # 6) get asset names and classes
-        asset_info = session.execute(
-            select(Asset.id, Asset.name, Asset.asset_class)
-            .where(Asset.id.in_(list(all_assets)))
-        ).all()
+    return asset_df.sort_values('contrib_pct', ascending=False), class_df.sort_values('contrib_pct', ascending=False)
 
-        asset_map = {row.id: {'name': row.name, 'asset_class': row.asset_class} 
-                    for row in asset_info}
 
-        asset_df['name'] = asset_df['asset_id'].map(lambda x: asset_map.get(x, {}).get('name', f'Asset_{x}'))
-        asset_df['asset_class'] = asset_df['asset_id'].map(lambda x: asset_map.get(x, {}).get('asset_class', 'UNKNOWN'))
+def period_attribution_batch(
+    portfolio_name: str,
+    ranges,
+    top_n: int = 5
+) -> list:
+    """
+    여러 기간(주간/월간 등)의 기여도를 한 세션에서 계산.
 
-        # 디버그: 이상한 수익률을 보이는 자산들 찾기
-        print(f"\n=== 수익률 검증 ===")
-        suspicious_assets = asset_df[
-            (asset_df['return'].abs() > 2) |  # 200% 이상 수익률
-            (asset_df['return'] < -0.9) |     # -90% 이하 손실률
-            (asset_df['contrib_pct'].abs() > 0.05)  # 5% 이상 기여도
-        ].sort_values('contrib_pct', ascending=False)
-        
-        if not suspicious_assets.empty:
-            print("의심스러운 자산들:")
-            for _, row in suspicious_assets.iterrows():
-                print(f"  {row['name']}: return={row['return']:.4f}, contrib={row['contrib_pct']:.4f}, "
-                      f"weight={row['weight']:.4f}")
-        
-        # Top/Bottom 기여자 출력
-        print(f"\n=== Top 5 기여자 ===")
-        top_5 = asset_df.nlargest(5, 'contrib_pct')
-        for _, row in top_5.iterrows():
-            print(f"  {row['name']}: {row['contrib_pct']:.4f} ({row['return']:.4f})")
-            
-        print(f"\n=== Bottom 5 기여자 ===")
-        bottom_5 = asset_df.nsmallest(5, 'contrib_pct')
-        for _, row in bottom_5.iterrows():
-            print(f"  {row['name']}: {row['contrib_pct']:.4f} ({row['return']:.4f})")
-            
-        # 기여도 합계 검증
-        total_contrib = asset_df['contrib_pct'].sum()
-        actual_return = (float(end_nav) - float(start_nav)) / float(start_nav)
-        print(f"\n=== 기여도 검증 ===")
-        print(f"기여도 합계: {total_contrib:.6f}")
-        print(f"실제 수익률: {actual_return:.6f}")
-        print(f"차이: {abs(total_contrib - actual_return):.6f}")
-        
-        if abs(total_contrib - actual_return) > 0.001:
-            print("⚠️  기여도 합계와 실제 수익률에 차이가 있습니다!")
+    포트폴리오 id, 스냅샷 날짜, 필요한 날짜의 포지션/NAV를 기간마다 따로 조회하지 않고
+    한 번씩만 조회한 뒤 기간별로 나눠 계산합니다.
 
-        # 7) aggregate by asset class
-        class_df = asset_df.groupby('asset_class').agg({
-            'weight': 'sum',
-            'contrib_pct': 'sum',
-            'return': lambda x: (asset_df[asset_df['asset_class'] == x.name]['contrib_pct'].sum() / 
-                               asset_df[asset_df['asset_class'] == x.name]['weight'].sum()
-                               if asset_df[asset_df['asset_class'] == x.name]['weight'].sum() > 0 else 0)
-        }).reset_index()
+    Args:
+      portfolio_name: name of your portfolio in the DB.
+      ranges: [(start_date, end_date), ...] 분석 기간 목록 (inclusive).
+      top_n: how many top/bottom assets to show.
 
-        # Fix the return calculation for asset classes
-        for i, row in class_df.iterrows():
-            class_assets = asset_df[asset_df['asset_class'] == row['asset_class']]
-            if row['weight'] > 0:
-                class_df.at[i, 'return'] = class_assets['contrib_pct'].sum() / row['weight']
+    Returns:
+      list of (asset_df, class_df): ranges와 같은 순서의 기간별 결과
+    """
+    ranges = list(ranges)
+    empty = (pd.DataFrame(), pd.DataFrame())
+    if not ranges:
+        return []
 
-        print(f"Analysis complete: {len(asset_df)} assets, {len(class_df)} asset classes")
-        
-        return asset_df.sort_values('contrib_pct', ascending=False), class_df.sort_values('contrib_pct', ascending=False)
+    session = SessionLocal()
+    try:
+        # 1) find portfolio id
+        pid = session.execute(
+            select(Portfolio.id).where(Portfolio.name == portfolio_name)
+        ).scalar_one()
+
+        # 2) 스냅샷 날짜 전체를 한 번 조회해 기간별로
+        #    start_date 이후 첫 스냅샷, end_date 이전 마지막 스냅샷을 찾음
+        snap_dates = session.execute(
+            select(PortfolioPositionDaily.as_of_date)
+            .where(PortfolioPositionDaily.portfolio_id == pid)
+            .distinct()
+            .order_by(PortfolioPositionDaily.as_of_date)
+        ).scalars().all()
+        bounds = [_snapshot_bounds(snap_dates, start, end) for start, end in ranges]
+        needed = sorted({d for pair in bounds for d in pair if d is not None})
+
+        # 3) 필요한 스냅샷 날짜의 포지션과 NAV를 한 번에 조회
+        positions_by_date = {d: [] for d in needed}
+        navs = {}
+        if needed:
+            pos_rows = session.execute(
+                select(
+                    PortfolioPositionDaily.as_of_date,
+                    PortfolioPositionDaily.asset_id,
+                    PortfolioPositionDaily.market_value,
+                    PortfolioPositionDaily.quantity,
+                    PortfolioPositionDaily.avg_price
+                ).where(
+                    PortfolioPositionDaily.portfolio_id == pid,
+                    PortfolioPositionDaily.as_of_date.in_(needed)
+                )
+            ).all()
+            for as_of_date, *row in pos_rows:
+                positions_by_date[as_of_date].append(tuple(row))
+
+            navs = dict(session.execute(
+                select(PortfolioNavDaily.as_of_date, PortfolioNavDaily.nav)
+                .where(
+                    PortfolioNavDaily.portfolio_id == pid,
+                    PortfolioNavDaily.as_of_date.in_(needed)
+                )
+            ).all())
+
+        # 자산명/자산군은 기간마다 다시 조회하지 않고, 배치에 등장하는 자산 전체를 한 번에 조회
+        # (신규 편입 자산도 종료 스냅샷에 포함되므로 여기서 모두 포함됨)
+        asset_ids = {row[0] for rows in positions_by_date.values() for row in rows}
+        asset_map = {}
+        if asset_ids:
+            asset_map = {
+                row.id: {'name': row.name, 'asset_class': row.asset_class}
+                for row in session.execute(
+                    select(Asset.id, Asset.name, Asset.asset_class)
+                    .where(Asset.id.in_(sorted(asset_ids)))
+                )
+            }
+
+        results = []
+        for (start_date, end_date), (start_snap, end_snap) in zip(ranges, bounds):
+            print(f"Computing attribution for {portfolio_name}: {start_date} ~ {end_date}")
+            if not start_snap or not end_snap:
+                print(f"No position data in range {start_date} ~ {end_date}")
+                results.append(empty)
+                continue
+
+            start_nav = navs.get(start_snap)
+            if not start_nav or start_nav == 0:
+                print(f"No valid starting NAV at {start_snap}")
+                results.append(empty)
+                continue
+
+            end_nav = navs.get(end_snap)
+            if not end_nav or end_nav == 0:
+                print(f"No valid ending NAV at {end_snap}")
+                results.append(empty)
+                continue
+
+            try:
+                results.append(_attribution_from_snapshots(
+                    session, pid, start_snap, end_snap,
+                    positions_by_date[start_snap], positions_by_date[end_snap],
+                    start_nav, end_nav, asset_map
+                ))
+            except Exception as e:
+                print(f"Error in period_attribution ({start_date} ~ {end_date}): {e}")
+                results.append(empty)
+        return results
 
     except Exception as e:
         print(f"Error in period_attribution: {e}")
-        return pd.DataFrame(), pd.DataFrame()
+        return [empty for _ in ranges]
     finally:
         session.close()
 
 
+def period_attribution(
+    portfolio_name: str,
+    start_date: date,
+    end_date: date,
+    top_n: int = 5
+):
+    """
+    Simple allocation-based attribution over ANY date range.
+    
+    Args:
+      portfolio_name: name of your portfolio in the DB.
+      start_date, end_date: period to analyze (inclusive).
+      top_n: how many top/bottom assets to show.
+    
+    Returns:
+      asset_df, class_df: 자산별, 자산군별 기여도 데이터프레임
+    """
+    return period_attribution_batch(portfolio_name, [(start_date, end_date)], top_n)[0]
+
+
 def plot_attribution_summary(asset_df: pd.DataFrame, class_df: pd.DataFrame, 
                            portfolio_name: str, start_date: date, end_date: date):
     """기여도 분석 결과 종합 시각화
@@ -1060,11 +1036,10 @@ def plot_attribution_waterfall(asset_df: pd.DataFrame, top_n: int = 10):
     
     asset_df['contrib_pct'] = asset_df['contrib_pct'].astype(float)
     
-    # Top N과 Bottom N 선택
-    sorted_df = asset_df.sort_values('contrib_pct', ascending=False)
+    # Top N과 Bottom N 선택 (전체 정렬 없이 부분 선택, Bottom은 기여도 내림차순으로 뒤집어 차트 순서 유지)
     top_bottom = pd.concat([
-        sorted_df.head(top_n//2),
-        sorted_df.tail(top_n//2)
+        asset_df.nlargest(top_n//2, 'contrib_pct'),
+        asset_df.nsmallest(top_n//2, 'contrib_pct').iloc[::-1]
     ])
     
     # 기타 항목 추가
@@ -1084,8 +1059,7 @@ def plot_attribution_waterfall(asset_df: pd.DataFrame, top_n: int = 10):
     heights = []
     colors = []
     
-    for i, (_, row) in enumerate(top_bottom.iterrows()):
-        contrib = row['contrib_pct'] * 100
+    for i, contrib in enumerate(top_bottom['contrib_pct'].to_numpy() * 100):
         x_pos.append(i)
         heights.append(contrib)
         colors.append('green' if contrib >= 0 else 'red')
@@ -1131,9 +1105,9 @@ if __name__ == '__main__':
         
         # 기여도가 낮은 상위 3개 자산 분석
         bottom_assets = asset_df.nsmallest(3, 'contrib_pct')
-        for _, row in bottom_assets.iterrows():
-            print(f"\n### {row['name']} 분석 ###")
-            analyze_specific_asset(portfolio_name, row['name'], start_date, end_date)
+        for name in bottom_assets['name']:
+            print(f"\n### {name} 분석 ###")
+            analyze_specific_asset(portfolio_name, name, start_date, end_date)
         
         # 종합 시각화
         plot_attribution_summary(asset_df, class_df, portfolio_name, start_date, end_date)
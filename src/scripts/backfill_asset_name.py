@@ -57,7 +57,6 @@ def backfill_asset_names(mapping: list[tuple[str, str]]):
                 print(f"[SKIP]    {ticker}: name already '{name}'")
                 continue
             asset.name = name
-            session.add(asset)
             updated += 1
             print(f"[UPDATE]  {ticker}: set name -> {name}")
         session.commit()
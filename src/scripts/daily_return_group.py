@@ -4,7 +4,10 @@ import numpy as np
 import matplotlib.pyplot as plt
 from sqlalchemy import select, func
 from decimal import Decimal
-from pm.db.models import SessionLocal, Portfolio, PortfolioPositionDaily, Price, Asset, AssetClassReturnDaily
+from pm.db.models import (
+    SessionLocal, Portfolio, PortfolioPositionDaily, Price, Asset, AssetClassReturnDaily,
+    upsert_asset_class_returns, init_db
+)
 
 def plot_asset_class_daily_returns_twr(
     portfolio_name: str,
@@ -44,6 +47,9 @@ def plot_asset_class_daily_returns_twr(
         pos = pd.DataFrame(pos_rows, columns=['date','asset_id','mv'])
         if use_decimal:
             pos['mv'] = pos['mv'].apply(lambda x: Decimal(str(x)) if pd.notna(x) else x)
+        else:
+            # Numeric 컬럼은 Decimal(object)로 조회되므로 벡터 연산을 위해 float64로 변환
+            pos['mv'] = pos['mv'].astype(float)
         if pos.empty:
             print("해당 기간에 포지션 데이터가 없습니다.")
             return pd.DataFrame()
@@ -200,42 +206,34 @@ def compute_and_save_asset_class_returns(
             select(Portfolio.id).where(Portfolio.name == portfolio_name)
         ).scalar_one()
 
-        # Calculate returns using Decimal arithmetic
+        # 자산군 수익률 계산 (float64 벡터 연산 경로)
+        # daily_return 컬럼은 NUMERIC(10,6)이라 Decimal로 셀 단위 계산해도 저장 정밀도 이득이 없음
         class_ret = plot_asset_class_daily_returns_twr(
             portfolio_name=portfolio_name,
             start_date=start_date,
             end_date=end_date,
             annotate_last=False,  # Don't show plot
-            use_decimal=True      # Use Decimal for calculations
+            use_decimal=False
         )
 
         if class_ret.empty:
             print("수익률 계산 결과가 비었습니다.")
             return pd.DataFrame()
 
-        # Convert to records for DB
-        records = []
-        for dt in class_ret.index:
-            for asset_class in class_ret.columns:
-                daily_return = class_ret.loc[dt, asset_class]
-                if pd.notna(daily_return):
-                    records.append(
-                        AssetClassReturnDaily(
-                            portfolio_id=pid,
-                            date=dt,
-                            asset_class=asset_class,
-                            daily_return=Decimal(str(daily_return))  # Convert float to Decimal
-                        )
-                    )
+        # (date, asset_class) 행으로 펼쳐 DB 적재용 dict 목록 생성 (NaN 제외)
+        records = (
+            class_ret.rename_axis(index='date', columns='asset_class')
+            .stack()
+            .dropna()
+            .rename('daily_return')
+            .reset_index()
+            .assign(portfolio_id=pid)
+            .to_dict('records')
+        )
 
         # Upsert to DB
-        session.query(AssetClassReturnDaily).filter(
-            AssetClassReturnDaily.portfolio_id == pid,
-            AssetClassReturnDaily.date.between(start_date, end_date)
-        ).delete()
-
-        session.bulk_save_objects(records)
-        session.commit()
+        # (portfolio_id, date, asset_class) UNIQUE 키 충돌 시 수익률만 갱신 (기간 DELETE 후 재적재하지 않음)
+        upsert_asset_class_returns(session, records)
 
         print(f"{len(records)}개의 자산군 일일 수익률 기록이 저장되었습니다.")
         return class_ret
@@ -244,6 +242,9 @@ def compute_and_save_asset_class_returns(
         session.close()
 
 if __name__ == '__main__':
+    # 테이블 생성 (없을 경우)
+    init_db()
+
     # Example usage
     compute_and_save_asset_class_returns(
         portfolio_name="Core",
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, timedelta
 from typing import Iterable, Optional, Sequence
 
@@ -9,13 +10,16 @@ from sqlalchemy import select, func
 import pandas as pd
 import pandas_market_calendars as mcal
 
-from pm.db.models import SessionLocal, Portfolio, Transaction
+from pm.db.models import SessionLocal, Portfolio, Transaction, init_db
 from pm.portfolio.snapshot_positions import snapshot_portfolio_date
 
 # 거래소 캘린더
 krx = mcal.get_calendar("XKRX")
 nyse = mcal.get_calendar("XNYS")
 
+# 포트폴리오 병렬 스냅샷 워커 수 (엔진 커넥션 풀 pool_size=10 이내로 유지)
+SNAPSHOT_WORKERS = 4
+
 
 def _ensure_date(d: Optional[date | str]) -> Optional[date]:
     if d is None:
@@ -73,6 +77,56 @@ def get_trading_days_nyse(start: date, end: date) -> list[date]:
     return [ts.date() for ts in schedule.index.normalize()]
 
 
+def _snapshot_days(pid: int, trading_days: Sequence[date]) -> int:
+    """한 포트폴리오의 영업일 스냅샷을 날짜 순서대로 실행 (성공한 날짜 수 반환)
+
+    첫 날짜(및 실패 직후 날짜)는 전체 거래 이력으로 현금을 다시 계산해 소급 수정된 거래를 반영하고,
+    이후 날짜는 이번 실행에서 방금 저장한 전일 NAV를 기준으로 현금을 이어 계산합니다.
+    그래서 같은 포트폴리오의 날짜는 순서대로 처리하고,
+    한 세션(커넥션)으로 모든 날짜를 처리해 캐시된 SQL/prepared statement를 재사용합니다.
+    (포트폴리오, 날짜)마다 커밋해 실패한 건만 롤백합니다.
+    """
+    done = 0
+    roll_forward = False
+    with SessionLocal() as session:
+        for d in trading_days:
+            try:
+                snapshot_portfolio_date(pid, d, session=session, roll_forward=roll_forward)
+                session.commit()
+                done += 1
+                roll_forward = True
+            except Exception as e:
+                session.rollback()
+                roll_forward = False
+                print(f"[ERROR] PID={pid}, DATE={d}: {e}")
+    return done
+
+
+def _run_snapshots(trading_days: Sequence[date], pids: Sequence[int]) -> None:
+    """영업일 × 포트폴리오 스냅샷 실행
+
+    포트폴리오끼리는 서로 독립이므로 포트폴리오 단위로 병렬 실행합니다.
+    계산은 모두 DB에서 이루어지고 워커는 쿼리 응답을 기다리기만 하므로 스레드로 충분하며,
+    워커마다 자기 세션을 엽니다.
+    """
+    trading_days = list(trading_days)
+    workers = max(1, min(SNAPSHOT_WORKERS, len(pids)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(_snapshot_days, pid, trading_days): pid for pid in pids}
+        for future in as_completed(futures):
+            pid = futures[future]
+            print(f"[SNAPSHOT] PID={pid}: {future.result()}/{len(trading_days)} 영업일 완료")
+
+
+def snapshot_all(as_of_date: date | str, portfolio_ids: Optional[Sequence[int]] = None) -> None:
+    """as_of_date 하루에 대해 전체(또는 지정) 포트폴리오 스냅샷을 병렬 실행 (일일 배치용)"""
+    pids = get_all_portfolio_ids() if portfolio_ids is None else get_valid_portfolio_ids(portfolio_ids)
+    if not pids:
+        print("[INFO] 실행할 포트폴리오가 없습니다.")
+        return
+    _run_snapshots([_ensure_date(as_of_date)], pids)
+
+
 def run_full_snapshot_krx(
     start_date: date | str | None = None,
     end_date: date | str | None = None,
@@ -104,13 +158,7 @@ def run_full_snapshot_krx(
         print("[INFO] 실행할 포트폴리오가 없습니다.")
         return
 
-    for d in trading_days:
-        for pid in pids:
-            try:
-                snapshot_portfolio_date(pid, d)
-            except Exception as e:
-                print(f"[ERROR] PID={pid}, DATE={d}: {e}")
-        print(f"[SNAPSHOT] Completed for trading day: {d}")
+    _run_snapshots(trading_days, pids)
 
 
 def run_full_snapshot_nyse(
@@ -144,15 +192,11 @@ def run_full_snapshot_nyse(
         print("[INFO] 실행할 포트폴리오가 없습니다.")
         return
 
-    for d in trading_days:
-        for pid in pids:
-            try:
-                snapshot_portfolio_date(pid, d)
-            except Exception as e:
-                print(f"[ERROR] PID={pid}, DATE={d}: {e}")
-        print(f"[SNAPSHOT] Completed for trading day: {d}")
+    _run_snapshots(trading_days, pids)
 
 
 if __name__ == "__main__":
+    # 테이블 생성 (없을 경우)
+    init_db()
 
     run_full_snapshot_krx('2025-08-07', '2025-08-26', [3])
@@ -16,9 +16,11 @@ import time
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
+from sqlalchemy import select
+
 from src.pm.db.models import (
     MarketInstrument, MarketPriceDaily, RiskFreeRateDaily, MarketDataHelper,
-    SessionLocal, engine, Base
+    SessionLocal, init_db, bulk_insert_market_prices, bulk_insert_risk_free_rates
 )
 
 class ProgressBar:
@@ -59,7 +61,7 @@ class ImprovedMarketDataCollector:
     
     def __init__(self):
         # 테이블 생성 (없을 경우)
-        Base.metadata.create_all(bind=engine)
+        init_db()
         
         # 초기 마켓 인스트루먼트 데이터 생성
         db = SessionLocal()
@@ -73,7 +75,7 @@ class ImprovedMarketDataCollector:
         """심볼로 마켓 인스트루먼트 조회"""
         return db.query(MarketInstrument).filter(
             MarketInstrument.symbol == symbol,
-            MarketInstrument.is_active == 'Yes'
+            MarketInstrument.is_active.is_(True)
         ).first()
 
     def collect_price_data(self, start_date: str, end_date: str = None) -> None:
@@ -86,7 +88,7 @@ class ImprovedMarketDataCollector:
             # 가격 데이터가 있는 모든 인스트루먼트 조회
             instruments = db.query(MarketInstrument).filter(
                 MarketInstrument.market_type.in_(['STOCK_INDEX', 'CURRENCY']),
-                MarketInstrument.is_active == 'Yes'
+                MarketInstrument.is_active.is_(True)
             ).all()
             
             print(f"\n💰 가격 데이터 수집 시작 ({len(instruments)}개 상품)")
@@ -111,19 +113,22 @@ class ImprovedMarketDataCollector:
                     previous_close = None
                     new_records = 0
                     existing_records = 0
+                    new_rows = []
                     
                     # 날짜별 데이터 처리 진행률 바
                     date_progress = ProgressBar(len(hist), f"  📅 {instrument.symbol} 데이터 처리")
                     
-                    # 데이터베이스에 저장
-                    for date_idx, row in hist.iterrows():
-                        # 기존 데이터 확인
-                        existing = db.query(MarketPriceDaily).filter(
+                    # 기존 데이터 날짜를 한 번에 조회 (행마다 존재 여부 SELECT 하지 않음)
+                    existing_dates = set(db.execute(
+                        select(MarketPriceDaily.date).where(
                             MarketPriceDaily.instrument_id == instrument.id,
-                            MarketPriceDaily.date == date_idx.date()
-                        ).first()
-                        
-                        if existing:
+                            MarketPriceDaily.date >= hist.index[0].date(),
+                            MarketPriceDaily.date <= hist.index[-1].date()
+                        )
+                    ).scalars())
+                    
+                    for date_idx, row in hist.iterrows():
+                        if date_idx.date() in existing_dates:
                             previous_close = row['Close']
                             existing_records += 1
                             date_progress.update(1, f"존재: {existing_records}")
@@ -135,23 +140,23 @@ class ImprovedMarketDataCollector:
                             daily_return = ((row['Close'] - previous_close) / previous_close) * 100
                         
                         # 새 데이터 추가
-                        price_data = MarketPriceDaily(
-                            instrument_id=instrument.id,
-                            date=date_idx.date(),
-                            open_price=row.get('Open'),
-                            high_price=row.get('High'),
-                            low_price=row.get('Low'),
-                            close_price=row['Close'],
-                            volume=row.get('Volume') if pd.notna(row.get('Volume')) else None,
-                            daily_return=daily_return
-                        )
-                        db.add(price_data)
+                        new_rows.append({
+                            'instrument_id': instrument.id,
+                            'date': date_idx.date(),
+                            'open_price': row.get('Open'),
+                            'high_price': row.get('High'),
+                            'low_price': row.get('Low'),
+                            'close_price': row['Close'],
+                            'volume': row.get('Volume') if pd.notna(row.get('Volume')) else None,
+                            'daily_return': daily_return
+                        })
                         new_records += 1
                         previous_close = row['Close']
                         
                         date_progress.update(1, f"신규: {new_records}")
                     
-                    db.commit()
+                    # 데이터베이스에 저장 (ORM 객체 add 대신 executemany INSERT 후 커밋)
+                    bulk_insert_market_prices(db, new_rows)
                     total_new_records += new_records
                     total_existing_records += existing_records
                     
@@ -183,7 +188,7 @@ class ImprovedMarketDataCollector:
             # 무위험 이자율 인스트루먼트 조회
             rate_instruments = db.query(MarketInstrument).filter(
                 MarketInstrument.market_type == 'RATE',
-                MarketInstrument.is_active == 'Yes'
+                MarketInstrument.is_active.is_(True)
             ).all()
             
             print(f"\n📊 무위험 이자율 데이터 수집 시작 ({len(rate_instruments)}개 금리)")
@@ -224,6 +229,17 @@ class ImprovedMarketDataCollector:
         finally:
             db.close()
 
+    @staticmethod
+    def _existing_rate_dates(db, instrument_id: int, start_dt: date, end_dt: date) -> set:
+        """기간 내 이미 저장된 이자율 데이터의 날짜 집합"""
+        return set(db.execute(
+            select(RiskFreeRateDaily.date).where(
+                RiskFreeRateDaily.instrument_id == instrument_id,
+                RiskFreeRateDaily.date >= start_dt,
+                RiskFreeRateDaily.date <= end_dt
+            )
+        ).scalars())
+
     def _collect_us_treasury_rate(self, db, instrument: MarketInstrument, start_date: str, end_date: str):
         """미국 국채 이자율 수집"""
         try:
@@ -235,32 +251,29 @@ class ImprovedMarketDataCollector:
                 print(f"⚠️  {instrument.symbol}: Yahoo Finance에서 데이터를 찾을 수 없습니다.")
                 return 0, 0  # 신규 0건, 기존 0건
             
-            new_records = 0
             existing_records = 0
+            new_rows = []
+            
+            # 기존 데이터 날짜를 한 번에 조회 (행마다 존재 여부 SELECT 하지 않음)
+            existing_dates = self._existing_rate_dates(
+                db, instrument.id, hist.index[0].date(), hist.index[-1].date()
+            )
             
-            # 데이터베이스에 저장
             for date_idx, row in hist.iterrows():
-                # 기존 데이터 확인
-                existing = db.query(RiskFreeRateDaily).filter(
-                    RiskFreeRateDaily.instrument_id == instrument.id,
-                    RiskFreeRateDaily.date == date_idx.date()
-                ).first()
-                
-                if existing:
+                if date_idx.date() in existing_dates:
                     existing_records += 1
                     continue  # 이미 존재하는 데이터는 스킵
                 
                 # 새 데이터 추가 (Yahoo Finance에서는 이자율이 Close 값으로 제공됨)
-                rate_data = RiskFreeRateDaily(
-                    instrument_id=instrument.id,
-                    date=date_idx.date(),
-                    rate=row['Close'],
-                    rate_type='TREASURY_RATE'
-                )
-                db.add(rate_data)
-                new_records += 1
+                new_rows.append({
+                    'instrument_id': instrument.id,
+                    'date': date_idx.date(),
+                    'rate': row['Close'],
+                    'rate_type': 'TREASURY_RATE'
+                })
             
-            db.commit()
+            # 데이터베이스에 저장 (executemany INSERT 후 커밋)
+            new_records = bulk_insert_risk_free_rates(db, new_rows)
             return new_records, existing_records
             
         except Exception as e:
@@ -292,8 +305,11 @@ class ImprovedMarketDataCollector:
             
             start_dt = datetime.strptime(start_date, '%Y-%m-%d').date()
             end_dt = datetime.strptime(end_date, '%Y-%m-%d').date()
-            new_records = 0
             existing_records = 0
+            new_rows = []
+            
+            # 기존 데이터 날짜를 한 번에 조회
+            existing_dates = self._existing_rate_dates(db, instrument.id, start_dt, end_dt)
             
             for rate_info in sample_rates:
                 rate_date = datetime.strptime(rate_info['date'], '%Y-%m-%d').date()
@@ -302,27 +318,20 @@ class ImprovedMarketDataCollector:
                 if rate_date < start_dt or rate_date > end_dt:
                     continue
                 
-                # 기존 데이터 확인
-                existing = db.query(RiskFreeRateDaily).filter(
-                    RiskFreeRateDaily.instrument_id == instrument.id,
-                    RiskFreeRateDaily.date == rate_date
-                ).first()
-                
-                if existing:
+                if rate_date in existing_dates:
                     existing_records += 1
                     continue  # 이미 존재하는 데이터는 스킵
                 
                 # 새 데이터 추가
-                rate_data = RiskFreeRateDaily(
-                    instrument_id=instrument.id,
-                    date=rate_date,
-                    rate=rate_info['rate'],
-                    rate_type='CENTRAL_BANK_RATE'
-                )
-                db.add(rate_data)
-                new_records += 1
+                new_rows.append({
+                    'instrument_id': instrument.id,
+                    'date': rate_date,
+                    'rate': rate_info['rate'],
+                    'rate_type': 'CENTRAL_BANK_RATE'
+                })
             
-            db.commit()
+            # 데이터베이스에 저장 (executemany INSERT 후 커밋)
+            new_records = bulk_insert_risk_free_rates(db, new_rows)
             return new_records, existing_records
             
         except Exception as e:
@@ -114,8 +114,8 @@ def main():
     txs = load_transactions(EXCEL_FILE)
     print(f"Loaded {len(txs)} transactions")
     txs.reverse()
-    session = SessionLocal()
-    try:
+    # 모든 거래를 한 세션(커넥션)·한 트랜잭션으로 입력하고 마지막에 한 번만 커밋
+    with SessionLocal.begin() as session:
         portfolio = session.query(Portfolio)\
                            .filter_by(name=PORTFOLIO_NAME)\
                            .one_or_none()
@@ -131,16 +131,14 @@ def main():
                 price       =tx['price'],
                 fee         =tx['fee'],
                 tax         =tx['tax'],
-                type_       =tx['type']
+                type_       =tx['type'],
+                session     =session
             )
             print(f"[INSERT] {tx['trans_dt']} {tx['type']} "
                   f"asset_id={tx['asset_id']} qty={tx['quantity']} "
                   f"price={tx['price']} fee={tx['fee']} tax={tx['tax']} type_kr={tx['type_kr']}")
 
-        print("Batch insert complete.")
-    finally:
-        session.close()
-
+    print("Batch insert complete.")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,158 @@
+"""
+기존 MySQL 테이블을 현재 모델 정의에 맞게 변경하는 마이그레이션.
+
+init_db()(create_all)는 없는 테이블만 만들고 이미 있는 테이블의 컬럼 타입이나 인덱스는 바꾸지 않으므로,
+모델의 컬럼 타입/인덱스가 바뀐 버전을 배포하기 전에 기존 DB에서 한 번 실행해야 합니다.
+이미 적용된 단계는 information_schema로 확인해 건너뛰므로 여러 번 실행해도 안전합니다.
+
+Usage:
+    python -m src.scripts.migrate_schema
+"""
+from sqlalchemy import text
+from pm.db.models import Base, engine, MARKET_TYPES, COUNTRIES, RATE_TYPES
+
+
+def _column_type(conn, table: str, column: str):
+    """현재 DB의 컬럼 타입(COLUMN_TYPE, 예: 'varchar(10)', 'tinyint(1)') 반환, 테이블/컬럼이 없으면 None"""
+    return conn.execute(text(
+        "SELECT COLUMN_TYPE FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND COLUMN_NAME = :column"
+    ), {'table': table, 'column': column}).scalar()
+
+
+def _drop_checks(conn, table: str, names: list):
+    """남아 있는 CHECK 제약조건만 제거 (타입 변경 전에 값 목록 CHECK를 먼저 없앰)"""
+    existing = set(conn.execute(text(
+        "SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND CONSTRAINT_TYPE = 'CHECK'"
+    ), {'table': table}).scalars())
+    for name in names:
+        if name in existing:
+            conn.execute(text(f"ALTER TABLE {table} DROP CHECK {name}"))
+
+
+def _enum_sql(values) -> str:
+    return "ENUM(" + ", ".join(f"'{v}'" for v in values) + ")"
+
+
+def migrate_market_instruments(conn) -> list:
+    """market_instruments: is_active 'Yes'/'No' 문자열 → BOOLEAN, market_type/country → ENUM
+
+    is_active가 문자열인 채로 새 코드(is_active IS TRUE)를 실행하면
+    MarketDataHelper 조회에서 모든 상품이 오류 없이 빠지므로 반드시 배포 전에 실행합니다.
+    """
+    is_active_type = _column_type(conn, 'market_instruments', 'is_active')
+    if is_active_type is None:
+        return []
+
+    _drop_checks(conn, 'market_instruments', ['chk_market_type', 'chk_country', 'chk_is_active'])
+
+    modify = []
+    if not is_active_type.startswith('tinyint'):
+        # 중간에 실패해 다시 실행해도 이미 '1'로 바뀐 값이 유지되도록 '1'도 활성으로 취급
+        conn.execute(text(
+            "UPDATE market_instruments SET is_active = IF(is_active IN ('Yes', '1'), '1', '0')"
+        ))
+        modify.append("MODIFY is_active BOOLEAN NOT NULL DEFAULT TRUE")
+    if not _column_type(conn, 'market_instruments', 'market_type').startswith('enum'):
+        modify.append(f"MODIFY market_type {_enum_sql(MARKET_TYPES)} NOT NULL")
+    if not _column_type(conn, 'market_instruments', 'country').startswith('enum'):
+        modify.append(f"MODIFY country {_enum_sql(COUNTRIES)} NOT NULL")
+
+    if modify:
+        conn.execute(text("ALTER TABLE market_instruments " + ", ".join(modify)))
+    return [f"market_instruments: {m}" for m in modify]
+
+
+def migrate_risk_free_rates(conn) -> list:
+    """risk_free_rate_daily: rate_type 문자열 → ENUM"""
+    rate_type = _column_type(conn, 'risk_free_rate_daily', 'rate_type')
+    if rate_type is None or rate_type.startswith('enum'):
+        return []
+
+    _drop_checks(conn, 'risk_free_rate_daily', ['chk_rate_type'])
+    modify = f"MODIFY rate_type {_enum_sql(RATE_TYPES)} NOT NULL"
+    conn.execute(text(f"ALTER TABLE risk_free_rate_daily {modify}"))
+    return [f"risk_free_rate_daily: {modify}"]
+
+
+def migrate_price_close(conn) -> list:
+    """prices/prices_staging: close DECIMAL(20,8)(또는 단정밀도 FLOAT) → DOUBLE"""
+    applied = []
+    for table in ('prices', 'prices_staging'):
+        close_type = _column_type(conn, table, 'close')
+        if close_type is None or close_type == 'double':
+            continue
+        conn.execute(text(f"ALTER TABLE {table} MODIFY close DOUBLE NOT NULL"))
+        applied.append(f"{table}: MODIFY close DOUBLE NOT NULL")
+    return applied
+
+
+def _table_exists(conn, table: str) -> bool:
+    return conn.execute(text(
+        "SELECT COUNT(*) FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+    ), {'table': table}).scalar() > 0
+
+
+def _index_names(conn, table: str) -> set:
+    """현재 DB에 있는 테이블의 인덱스 이름 집합"""
+    return set(conn.execute(text(
+        "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+    ), {'table': table}).scalars())
+
+
+def migrate_indexes(conn) -> list:
+    """모델에 선언된 Index(ix_price_asset_date_close, ix_tx_pf_date_type 등) 중 기존 테이블에 없는 것 생성
+
+    스냅샷 INSERT ... SELECT/최신 종가 ROW_NUMBER 조회 등이 이 인덱스를 전제로 하므로
+    컬럼 타입 변경 뒤에 실행합니다 (변경되는 컬럼을 포함한 인덱스를 두 번 재구성하지 않도록).
+    """
+    applied = []
+    for table in Base.metadata.sorted_tables:
+        if not _table_exists(conn, table.name):
+            continue  # 아직 없는 테이블은 init_db()가 인덱스와 함께 생성
+        existing = _index_names(conn, table.name)
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            if index.name in existing:
+                continue
+            index.create(conn)
+            columns = ", ".join(c.name for c in index.columns)
+            applied.append(f"{table.name}: CREATE INDEX {index.name} ({columns})")
+    return applied
+
+
+# 실행 순서대로 나열한 마이그레이션 단계
+MIGRATIONS = [
+    migrate_market_instruments,
+    migrate_risk_free_rates,
+    migrate_price_close,
+    migrate_indexes,
+]
+
+
+def migrate():
+    """모든 마이그레이션 단계를 순서대로 실행하고 적용된 변경 목록 반환"""
+    if engine.dialect.name != 'mysql':
+        raise RuntimeError(f"MySQL 전용 마이그레이션입니다 (현재 DB: {engine.dialect.name})")
+
+    applied = []
+    # MySQL의 ALTER TABLE은 암묵적으로 커밋되므로 각 단계는 재실행 가능하게 작성
+    with engine.begin() as conn:
+        for step in MIGRATIONS:
+            applied.extend(step(conn))
+    return applied
+
+
+def main():
+    applied = migrate()
+    if not applied:
+        print("스키마가 이미 최신입니다.")
+        return
+    for change in applied:
+        print(f"[APPLIED] {change}")
+
+
+if __name__ == '__main__':
+    main()
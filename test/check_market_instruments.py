@@ -12,9 +12,23 @@ project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import text
+from sqlalchemy import text, func
 from src.pm.db.models import SessionLocal, MarketInstrument, MarketPriceDaily, RiskFreeRateDaily
 
+# 반복 사용되는 SQL 문은 모듈 로드 시 한 번만 생성
+DUPLICATE_SYMBOLS_SQL = text("""
+    SELECT symbol, COUNT(*) as count 
+    FROM market_instruments 
+    GROUP BY symbol 
+    HAVING COUNT(*) > 1
+""")
+
+PRICE_DATE_RANGE_SQL = text("""
+    SELECT MIN(date) as min_date, MAX(date) as max_date 
+    FROM market_price_daily 
+    WHERE instrument_id = :instrument_id
+""")
+
 def check_market_instruments():
     """Market Instruments 데이터 확인"""
     db = SessionLocal()
@@ -44,7 +58,7 @@ def check_market_instruments():
             print(f"📊 {market_type} ({len(inst_list)}개)")
             print("-" * 60)
             for inst in inst_list:
-                status = "🟢" if inst.is_active == "Yes" else "🔴"
+                status = "🟢" if inst.is_active else "🔴"
                 print(f"  {status} [{inst.symbol:12}] {inst.name} ({inst.country}, {inst.currency})")
             print()
         
@@ -52,9 +66,14 @@ def check_market_instruments():
         print("💰 가격 데이터 확인")
         print("-" * 60)
         
-        # 각 인스트루먼트별로 가격 데이터 개수 확인
+        # 각 인스트루먼트별로 가격 데이터 개수 확인 (GROUP BY 한 번으로 집계)
+        price_counts = dict(
+            db.query(MarketPriceDaily.instrument_id, func.count())
+            .group_by(MarketPriceDaily.instrument_id)
+            .all()
+        )
         for inst in instruments:
-            price_count = db.query(MarketPriceDaily).filter(MarketPriceDaily.instrument_id == inst.id).count()
+            price_count = price_counts.get(inst.id, 0)
             print(f"  📈 {inst.symbol:12} | {inst.name:30} | 가격 데이터: {price_count:,}개")
         
         # 4. 최신 가격 데이터 확인
@@ -80,8 +99,13 @@ def check_market_instruments():
         # RATE 타입 인스트루먼트만 필터링해서 확인
         rate_instruments = [inst for inst in instruments if inst.market_type == 'RATE']
         
+        rate_counts = dict(
+            db.query(RiskFreeRateDaily.instrument_id, func.count())
+            .group_by(RiskFreeRateDaily.instrument_id)
+            .all()
+        )
         for inst in rate_instruments:
-            rate_count = db.query(RiskFreeRateDaily).filter(RiskFreeRateDaily.instrument_id == inst.id).count()
+            rate_count = rate_counts.get(inst.id, 0)
             print(f"  💱 {inst.symbol:12} | {inst.name:30} | 이자율 데이터: {rate_count:,}개")
         
         # 6. 데이터 품질 체크
@@ -89,12 +113,7 @@ def check_market_instruments():
         print("-" * 60)
         
         # 중복 심볼 체크
-        duplicate_symbols = db.execute(text("""
-            SELECT symbol, COUNT(*) as count 
-            FROM market_instruments 
-            GROUP BY symbol 
-            HAVING COUNT(*) > 1
-        """)).fetchall()
+        duplicate_symbols = db.execute(DUPLICATE_SYMBOLS_SQL).fetchall()
         
         if duplicate_symbols:
             print("  ⚠️  중복된 심볼이 발견되었습니다:")
@@ -104,7 +123,7 @@ def check_market_instruments():
             print("  ✅ 중복된 심볼이 없습니다.")
         
         # 비활성 인스트루먼트 체크
-        inactive_count = db.query(MarketInstrument).filter(MarketInstrument.is_active != 'Yes').count()
+        inactive_count = db.query(MarketInstrument).filter(MarketInstrument.is_active.is_(False)).count()
         if inactive_count > 0:
             print(f"  ⚠️  비활성 상태인 인스트루먼트: {inactive_count}개")
         else:
@@ -159,11 +178,7 @@ def check_specific_instrument(symbol: str):
             print(f"  - 최신 데이터: {latest_price.date} | 종가: {latest_price.close_price:,.4f}")
             
             # 날짜 범위
-            date_range = db.execute(text("""
-                SELECT MIN(date) as min_date, MAX(date) as max_date 
-                FROM market_price_daily 
-                WHERE instrument_id = :instrument_id
-            """), {"instrument_id": instrument.id}).fetchone()
+            date_range = db.execute(PRICE_DATE_RANGE_SQL, {"instrument_id": instrument.id}).fetchone()
             
             print(f"  - 데이터 범위: {date_range.min_date} ~ {date_range.max_date}")
         
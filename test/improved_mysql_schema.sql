@@ -10,16 +10,11 @@ CREATE TABLE IF NOT EXISTS market_instruments (
     id INT AUTO_INCREMENT PRIMARY KEY,
     symbol VARCHAR(20) UNIQUE NOT NULL COMMENT '^GSPC, USDKRW=X 등',
     name VARCHAR(100) NOT NULL COMMENT 'S&P 500, USD/KRW 등',
-    market_type VARCHAR(20) NOT NULL COMMENT '상품 타입: STOCK_INDEX, CURRENCY, RATE 등',
-    country VARCHAR(10) NOT NULL COMMENT '국가 코드: US, KR, GLOBAL 등',
+    market_type ENUM('STOCK_INDEX', 'BOND_INDEX', 'COMMODITY', 'CURRENCY', 'RATE') NOT NULL COMMENT '상품 타입: STOCK_INDEX, CURRENCY, RATE 등',
+    country ENUM('US', 'KR', 'GLOBAL') NOT NULL COMMENT '국가 코드: US, KR, GLOBAL 등',
     currency VARCHAR(3) NOT NULL COMMENT 'USD, KRW 등',
     description VARCHAR(200) DEFAULT NULL COMMENT '상품 설명',
-    is_active VARCHAR(10) DEFAULT 'Yes' COMMENT '활성 상태',
-    
-    -- 데이터 무결성을 위한 CHECK 제약조건 (MySQL 8.0+)
-    CONSTRAINT chk_market_type CHECK (market_type IN ('STOCK_INDEX', 'BOND_INDEX', 'COMMODITY', 'CURRENCY', 'RATE')),
-    CONSTRAINT chk_country CHECK (country IN ('US', 'KR', 'GLOBAL')),
-    CONSTRAINT chk_is_active CHECK (is_active IN ('Yes', 'No')),
+    is_active BOOLEAN NOT NULL DEFAULT TRUE COMMENT '활성 상태',
     
     -- 인덱스
     INDEX idx_market_type (market_type),
@@ -64,10 +59,9 @@ CREATE TABLE IF NOT EXISTS risk_free_rate_daily (
     instrument_id INT NOT NULL COMMENT '마켓 인스트루먼트 ID',
     date DATE NOT NULL COMMENT '데이터 날짜',
     rate DECIMAL(8, 4) NOT NULL COMMENT '이자율 (%)',
-    rate_type VARCHAR(30) NOT NULL COMMENT '금리 유형: CENTRAL_BANK_RATE, TREASURY_RATE 등',
+    rate_type ENUM('CENTRAL_BANK_RATE', 'TREASURY_RATE', 'CORPORATE_BOND_RATE') NOT NULL COMMENT '금리 유형: CENTRAL_BANK_RATE, TREASURY_RATE 등',
     
     -- 데이터 무결성을 위한 CHECK 제약조건
-    CONSTRAINT chk_rate_type CHECK (rate_type IN ('CENTRAL_BANK_RATE', 'TREASURY_RATE', 'CORPORATE_BOND_RATE')),
     CONSTRAINT chk_rate_range CHECK (rate >= -10.0 AND rate <= 50.0),
     
     -- 외래키 및 제약조건
@@ -120,7 +114,7 @@ SELECT
     mpd.daily_return
 FROM market_price_daily mpd
 JOIN market_instruments mi ON mpd.instrument_id = mi.id
-WHERE mi.market_type = 'STOCK_INDEX' AND mi.is_active = 'Yes';
+WHERE mi.market_type = 'STOCK_INDEX' AND mi.is_active = TRUE;
 
 -- 환율 뷰 (기존 exchange_rates 테이블 대체)
 CREATE OR REPLACE VIEW exchange_rates_view AS
@@ -132,7 +126,7 @@ SELECT
     mpd.daily_return
 FROM market_price_daily mpd
 JOIN market_instruments mi ON mpd.instrument_id = mi.id
-WHERE mi.market_type = 'CURRENCY' AND mi.is_active = 'Yes';
+WHERE mi.market_type = 'CURRENCY' AND mi.is_active = TRUE;
 
 -- 무위험 이자율 뷰 (기존 risk_free_rates 테이블 대체)
 CREATE OR REPLACE VIEW risk_free_rates_view AS
@@ -147,7 +141,7 @@ SELECT
     mi.currency
 FROM risk_free_rate_daily rfd
 JOIN market_instruments mi ON rfd.instrument_id = mi.id
-WHERE mi.market_type = 'RATE' AND mi.is_active = 'Yes';
+WHERE mi.market_type = 'RATE' AND mi.is_active = TRUE;
 
 -- =====================================================
 -- 6. 테이블 생성 확인 쿼리
@@ -180,6 +174,42 @@ ORDER BY TABLE_NAME;
 -- ALTER TABLE market_price_daily ADD INDEX idx_date_instrument (date, instrument_id);
 -- ALTER TABLE risk_free_rate_daily ADD INDEX idx_date_instrument (date, instrument_id);
 
+-- 벤치마크 비교 차트(포트폴리오 NAV ⨝ 벤치마크 종가)용 커버링 인덱스
+-- (portfolio_id, as_of_date), (instrument_id, date)는 UNIQUE 키가 이미 있으므로 조회 컬럼만 추가
+ALTER TABLE portfolio_nav_daily ADD INDEX ix_navdaily_port_date_nav (portfolio_id, as_of_date, nav);
+ALTER TABLE market_price_daily ADD INDEX ix_mpd_instr_date_close (instrument_id, date, close_price);
+
+-- 상품 마스터 필터(market_type, is_active) 및 날짜 단위 가격 조회용 인덱스
+ALTER TABLE market_instruments ADD INDEX ix_mi_active_type (market_type, is_active);
+ALTER TABLE prices ADD INDEX ix_price_date (date);
+
+-- 포지션/NAV 스냅샷 집계용 인덱스 (거래 필터, 자산별 최신 종가)
+-- 이 섹션의 인덱스는 기존 DB에서 python -m src.scripts.migrate_schema 로 생성 (없는 인덱스만 생성)
+ALTER TABLE transactions ADD INDEX ix_tx_pf_date_type (portfolio_id, trans_date, type);
+ALTER TABLE prices ADD INDEX ix_price_asset_date_close (asset_id, date, close);
+-- PostgreSQL:
+-- CREATE INDEX CONCURRENTLY ix_tx_pf_date_type ON transactions (portfolio_id, trans_date, type)
+--     INCLUDE (asset_id, quantity, price, fee, tax);
+-- CREATE INDEX CONCURRENTLY ix_price_asset_date_close ON prices (asset_id, date, close);
+
+-- prices.close: DECIMAL(20,8) → DOUBLE (분석용 시세는 float로 충분, 조회/적재 시 Decimal 변환 제거)
+-- 배포 전 필수: python -m src.scripts.migrate_schema 로 실행 (아래 SQL은 참고용)
+-- ALTER TABLE prices MODIFY close DOUBLE NOT NULL;
+-- ALTER TABLE prices_staging MODIFY close DOUBLE NOT NULL;
+
+-- 기존 테이블 마이그레이션: is_active 'Yes'/'No' 문자열 → BOOLEAN, 타입 컬럼 → ENUM
+-- (is_active는 값 변환 후 타입 변경, 기존 CHECK 제약조건은 먼저 제거)
+-- 배포 전 필수: python -m src.scripts.migrate_schema 로 실행 (아래 SQL은 참고용, 적용된 단계는 자동으로 건너뜀)
+-- ALTER TABLE market_instruments DROP CHECK chk_market_type, DROP CHECK chk_country, DROP CHECK chk_is_active;
+-- ALTER TABLE risk_free_rate_daily DROP CHECK chk_rate_type;
+-- UPDATE market_instruments SET is_active = IF(is_active = 'Yes', '1', '0');
+-- ALTER TABLE market_instruments
+--     MODIFY is_active BOOLEAN NOT NULL DEFAULT TRUE,
+--     MODIFY market_type ENUM('STOCK_INDEX', 'BOND_INDEX', 'COMMODITY', 'CURRENCY', 'RATE') NOT NULL,
+--     MODIFY country ENUM('US', 'KR', 'GLOBAL') NOT NULL;
+-- ALTER TABLE risk_free_rate_daily
+--     MODIFY rate_type ENUM('CENTRAL_BANK_RATE', 'TREASURY_RATE', 'CORPORATE_BOND_RATE') NOT NULL;
+
 -- =====================================================
 -- 완료: 개선된 시장 데이터 테이블 생성 완료
 -- =====================================================